@@ -1,77 +1,92 @@
--- DROP PROCEDURE public.process_accounts_and_transaction_from_json(json);
+-- Replaced by process_accounts_and_transaction below, which takes only the valid rows as typed arrays
+DROP PROCEDURE IF EXISTS public.process_accounts_and_transaction_from_json(json, uuid);
 
-CREATE OR REPLACE PROCEDURE public.process_accounts_and_transaction_from_json(IN p_json_data json, IN p_correlation_id uuid)
+-- Placement (1): insert new accounts, skipping ones the client already has.
+-- Transaction (2): subtract each payment from the client's account balance and record an account_transaction.
+-- Returns per-row outcome counts as jsonb.
+CREATE OR REPLACE FUNCTION public.process_accounts_and_transaction(
+    p_client_id integer,
+    p_process_type integer,
+    p_account_numbers text[],
+    p_account_names text[],
+    p_balance_amounts numeric[],
+    p_amounts_paid numeric[],
+    p_correlation_id uuid
+)
+ RETURNS jsonb
  LANGUAGE plpgsql
-AS $procedure$
+AS $function$
 DECLARE
-    -- Generate a single UUID for all records in this batch insertion for traceability
-    v_correlation_id uuid := p_correlation_id;
-    v_client_id integer;
-	v_process_type integer;
+    v_rows integer := coalesce(cardinality(p_account_numbers), 0);
+    v_applied integer := 0;
 BEGIN
-    -- 1. Extract the top-level client_id and process_type
-    v_client_id := (p_json_data ->> 'client_id')::integer;
-	v_process_type := (p_json_data ->> 'process_type')::integer;
+    -- Apply each correlation ID at most once: serialise concurrent calls and skip ones already applied
+    PERFORM pg_advisory_xact_lock(hashtext(p_correlation_id::text));
+    IF EXISTS (SELECT 1 FROM public.account WHERE correlation_id = p_correlation_id)
+       OR EXISTS (SELECT 1 FROM public.account_transaction WHERE correlation_id = p_correlation_id) THEN
+        RETURN jsonb_build_object('rows', v_rows, 'already_processed', true);
+    END IF;
 
-    -- A record is considered valid if the 'field_validations' array is an empty JSON array '[]'.
-
-	IF v_process_type = 1 THEN
+	IF p_process_type = 1 THEN
 		-- --- PROCESS TYPE 1: INSERT NEW ACCOUNT ---
-	    WITH valid_fields AS (
-	        -- Select only the valid records (where field_validations is empty)
-	        SELECT
-	            field ->> 'customer_name' AS customer_name,
-	            field ->> 'customer_account' AS customer_account,
-	            (field ->> 'balance_amount')::numeric(10, 2) AS balance_amount,
-	            (field ->> 'amount_paid')::numeric(10, 2) AS transaction_amount
-	        FROM
-	            json_array_elements(p_json_data -> 'extracted_fields') AS field
-	        WHERE
-	            json_array_length(field -> 'field_validations') = 0
-	    )
         INSERT INTO public.account (
             client_id, account_name, account_number, account_balance, account_fee_balance, correlation_id
         )
         SELECT
-            v_client_id, vf.customer_name, vf.customer_account, vf.balance_amount, 0.00, v_correlation_id
-        FROM valid_fields vf;
+            p_client_id, r.account_name, r.account_number, r.balance_amount::numeric(10, 2), 0.00, p_correlation_id
+        FROM unnest(p_account_numbers, p_account_names, p_balance_amounts)
+             WITH ORDINALITY AS r(account_number, account_name, balance_amount, ord)
+        ORDER BY r.ord
+        ON CONFLICT (client_id, account_number) DO NOTHING;
+        GET DIAGNOSTICS v_applied = ROW_COUNT;
+
+        RETURN jsonb_build_object(
+            'rows', v_rows,
+            'accounts_created', v_applied,
+            'accounts_existing', v_rows - v_applied,
+            'already_processed', false
+        );
 
-	ELSIF v_process_type = 2 THEN
+	ELSIF p_process_type = 2 THEN
 		-- --- PROCESS TYPE 2: UPDATE ACCOUNT AND INSERT TRANSACTION (Payment) ---
-	    WITH valid_fields AS (
-	        -- Select valid records and get the account number and amount paid
-	        SELECT
-	            field ->> 'customer_account' AS account_number_match,
-	            (field ->> 'amount_paid')::numeric(10, 2) AS transaction_amount
-	        FROM
-	            json_array_elements(p_json_data -> 'extracted_fields') AS field
-	        WHERE
-	            json_array_length(field -> 'field_validations') = 0
+	    WITH payments AS (
+	        SELECT r.account_number, r.amount_paid::numeric(10, 2) AS amount_paid, r.ord
+	        FROM unnest(p_account_numbers, p_amounts_paid) WITH ORDINALITY AS r(account_number, amount_paid, ord)
+	    ),
+	    totals AS (
+	        -- Several payments to one account in the same email are applied together
+	        SELECT account_number, sum(amount_paid) AS amount_paid
+	        FROM payments
+	        GROUP BY account_number
 	    ),
 	    updated_accounts AS (
-	        -- UPDATE 1: Update the existing account balance
 	        UPDATE public.account a
-	        SET account_balance = a.account_balance - vf.transaction_amount -- Apply the payment (subtract amount_paid)
-	        FROM valid_fields vf
+	        SET account_balance = a.account_balance - t.amount_paid
+	        FROM totals t
 	        WHERE
-	            a.client_id = v_client_id
-	            AND a.account_number = vf.account_number_match
-	        RETURNING
-	            a.id, a.account_name, vf.transaction_amount, v_correlation_id AS correlation_id
+	            a.client_id = p_client_id
+	            AND a.account_number = t.account_number
+	        RETURNING a.id, a.account_number
 	    )
-	    -- INSERT 2: Insert into the account_transaction table
 	    INSERT INTO public.account_transaction (
 	        account_id, transaction_amount, fee_amount, correlation_id
 	    )
-	    SELECT
-	        ua.id,
-	        ua.transaction_amount,
-	        0.00,
-	        ua.correlation_id
-	    FROM updated_accounts ua;
-        -- The final CTE's SELECT is implicitly executed for its DML (INSERT)
+	    SELECT ua.id, p.amount_paid, 0.00, p_correlation_id
+	    FROM payments p
+	    JOIN updated_accounts ua ON ua.account_number = p.account_number
+	    ORDER BY p.ord;
+        GET DIAGNOSTICS v_applied = ROW_COUNT;
+
+        RETURN jsonb_build_object(
+            'rows', v_rows,
+            'transactions_created', v_applied,
+            'accounts_not_found', v_rows - v_applied,
+            'already_processed', false
+        );
 
 	END IF;
+
+    RAISE EXCEPTION 'Unknown process_type %', p_process_type;
 END;
-$procedure$
+$function$
 ;
@@ -43,11 +43,69 @@ CREATE TABLE process_log (
     id SERIAL PRIMARY KEY,
     correlation_id uuid,
 	process_type int, -- 1 - Placement 2 - Transaction
-	error_detail text
+	details jsonb
 );
 
+-- Queue of emails submitted to /process; workers claim rows with FOR UPDATE SKIP LOCKED
+CREATE TABLE process_job (
+    id SERIAL PRIMARY KEY,
+    correlation_id uuid NOT NULL UNIQUE,
+    from_address varchar(255),
+    subject text,
+    content text,
+    content_hash char(64),         -- sha256 of (from_address, subject, content), used to drop resent emails
+    status varchar(20) NOT NULL DEFAULT 'queued', -- queued, running, done, failed
+    attempts int NOT NULL DEFAULT 0,
+    error_detail text,
+    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS process_job_queued_idx ON process_job (id) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS process_job_content_hash_idx ON process_job (content_hash, created_date);
+CREATE INDEX IF NOT EXISTS process_log_correlation_id_idx ON process_log (correlation_id);
+-- One account per client and account number; placements upsert against it
+CREATE UNIQUE INDEX IF NOT EXISTS account_client_id_account_number_key ON account (client_id, account_number);
+CREATE INDEX IF NOT EXISTS account_correlation_id_idx ON account (correlation_id);
+CREATE INDEX IF NOT EXISTS account_transaction_correlation_id_idx ON account_transaction (correlation_id);
+
 CREATE TABLE table_details (
     id SERIAL PRIMARY KEY,
     table_description TEXT,             -- The actual text of the rule
     embedding vector(3072)         -- The vector (size depends on model, e.g., Gemeni is 768)
 );
+
+-- Embeddings already fetched from the model, keyed by sha256 of (model, kind, text); read when embedding_cache_persist is on
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    content_hash char(64) PRIMARY KEY,
+    model varchar(100) NOT NULL,
+    embedding vector(3072) NOT NULL,
+    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Model that produced each embedding; rows with another model (or none) are picked up by src/api/genai/reembed.py
+ALTER TABLE client_rule ADD COLUMN IF NOT EXISTS embedding_model varchar(100);
+ALTER TABLE table_details ADD COLUMN IF NOT EXISTS embedding_model varchar(100);
+
+-- process_log.error_detail text was replaced by details jsonb; earlier text is kept under "error_detail"
+ALTER TABLE process_log ADD COLUMN IF NOT EXISTS details jsonb;
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.columns
+               WHERE table_schema = current_schema() AND table_name = 'process_log' AND column_name = 'error_detail') THEN
+        UPDATE process_log SET details = jsonb_build_object('error_detail', error_detail)
+        WHERE details IS NULL AND error_detail IS NOT NULL;
+        ALTER TABLE process_log DROP COLUMN error_detail;
+    END IF;
+END $$;
+
+-- Column layout of each client's email tables, learned from LLM extractions; lets table emails skip the LLM
+CREATE TABLE IF NOT EXISTS client_table_layout (
+    id SERIAL PRIMARY KEY,
+    client_id INT NOT NULL REFERENCES client(id) ON DELETE CASCADE,
+    process_type int NOT NULL,          -- 1 - Placement 2 - Transaction
+    signature text NOT NULL,            -- header text, or delimiter, column count and numeric columns for header-less tables
+    mapping jsonb NOT NULL,             -- {"customer_name": 0, "customer_account": 1, "amount_paid": null, ...}
+    updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (client_id, process_type, signature)
+);
@@ -1,7 +1,6 @@
 from mcp.server.fastmcp import FastMCP
 from api.chat_bot.service import ChatBotService
-from api.chat_bot.table_detail_repository import TableDetailsRepository
-from api.repository.database import SessionLocal
+from api.chat_bot.table_catalog import table_catalog
 import asyncio
 
 # Create a separate MCP server instance for chat bot or reuse existing one
@@ -26,15 +25,8 @@ def search_table_details(query: str, limit: int = 5) -> list[dict]:
     Search table details by semantic similarity.
     Returns: List of table details.
     """
-    try:
-        db = SessionLocal()
-        repo = TableDetailsRepository(db)
-        results = repo.search(query, limit)
-        return [item.model_dump() for item in results]
-    except Exception as e:
-        raise e
-    finally:
-        db.close()
+    results = table_catalog.search(query, limit)
+    return [item.model_dump() for item in results]
 
 if __name__ == "__main__":
     mcp.run()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Text
+from sqlalchemy import Column, Integer, String, Text
 from sqlalchemy.orm import declarative_base
 from pgvector.sqlalchemy import Vector
 from pydantic import BaseModel, ConfigDict
@@ -11,6 +11,7 @@ class TableDetailsTable(Base):
     id = Column(Integer, primary_key=True, index=True)
     table_description = Column(Text, nullable=False)
     embedding = Column(Vector(3072), nullable=True)
+    embedding_model = Column(String(100), nullable=True)
 
 class TableDetails(BaseModel):
     id: Optional[int] = None
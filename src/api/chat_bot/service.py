@@ -2,17 +2,19 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from api.config import config
 from langchain.agents import create_agent
 from api.chat_bot.tools import search_table_details_tool, execute_sql_tool
+from api.genai.structured_output import agent_output
+from api.tracing import Trace
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
 import logging
-import json
-import re
-from typing import Dict, Any
 
 logger = logging.getLogger(__name__)
 
 class ChatBotResponse(BaseModel):
-    generated_sql: Optional[str] = Field(description="The SQL query generated by the agent")
+    generated_sql: Optional[str] = Field(None, description="The SQL query generated by the agent")
+    # The /chat response passed through whatever JSON the model returned, including sql_result
+    # (tests/test_chat_bot_agent.py relies on it), so the schema keeps the field
+    sql_result: Optional[List[Dict[str, Any]]] = Field(None, description="Rows returned by the query, only when the question asks to list them")
     final_answer: Optional[str] = Field(..., description="Formatted answer with \n for line breaks")
 
 class ChatBotService:
@@ -57,27 +59,24 @@ class ChatBotService:
                 
                 **IMPORTANT:** If the SQL result is empty, provide a helpful explanation (e.g., "All fees are currently paid") rather than "No results found."
 
-                Return ONLY valid JSON:
-                {
-                    "generated_sql": "SELECT ...",
-                    "final_answer": "Adaptive response text with \\n"
-                }
+                Return the answer as the structured ChatBotResponse (generated_sql and final_answer; sql_result only when the user asks to list rows).
                 """
         
         self.agent = create_agent(self.llm,
                                   tools=self.tools,
-                                  system_prompt=self.system_message
+                                  system_prompt=self.system_message,
+                                  response_format=ChatBotResponse
                     )
 
 
 
     async def process_query(self, query: str) -> Dict[str, Any]:
+        trace = Trace("chat")
         try:
-            result = await self.agent.ainvoke({"messages": [{"role": "user", "content": query}]})
-            final_response = result["messages"][-1].content
-            raw_response = final_response[0]["text"][7:-3]
-            formatedresponse : ChatBotResponse = json.loads(raw_response)
-            return     formatedresponse
+            result = await self.agent.ainvoke({"messages": [{"role": "user", "content": query}]},
+                                              config={"callbacks": trace.callbacks()})
+            response = agent_output(result, ChatBotResponse)
+            return response.model_dump() if isinstance(response, ChatBotResponse) else response
                 
         except Exception as e:
             logger.error(f"Error processing query: {e}")
@@ -85,6 +84,8 @@ class ChatBotService:
                 "generated_sql": None,
                 "final_answer": f"Error: {str(e)}"
             }
+        finally:
+            trace.finish()
 
 
 # --- Usage Example ---
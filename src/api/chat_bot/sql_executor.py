@@ -1,39 +1,43 @@
-from typing import List, Dict, Any
-from sqlalchemy import create_engine, text
+from functools import lru_cache
+from itertools import islice
+from typing import List, Dict, Any, Iterator, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
 from api.config import config
+from api.genai.embeddings import get_embeddings
+from api.repository.database import read_only_engine
 import logging
 import re
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
 logger = logging.getLogger(__name__)
 
+# Whole words only, so a SELECT over updated_date or created_date is not taken for a write
+FORBIDDEN_KEYWORDS = re.compile(r"\b(?:INSERT|UPDATE|DELETE|DROP|ALTER|TRUNCATE)\b", re.IGNORECASE)
+
 class SQLExecutor:
-    def __init__(self):
-        self.engine = create_engine(config.database_url)
-        self.embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/gemini-embedding-001",
-            google_api_key=config.google_api_key
-        )
+    """
+    Runs the chat bot's generated SELECTs on the read-only pool.
 
-    def execute_query(self, query: str) -> List[Dict[str, Any]]:
-        """
-        Execute a read-only SQL query.
-        
-        Args:
-            query: SQL query to execute.
-            
-        Returns:
-            List of dictionaries representing the result rows.
-        """
-        # Basic safety check (should be handled by database permissions ideally)
-        forbidden_keywords = ["INSERT", "UPDATE", "DELETE", "DROP", "ALTER", "TRUNCATE"]
-        if any(keyword in query.upper() for keyword in forbidden_keywords):
+    Results are read through a server-side cursor in `fetch_size` batches and capped at
+    `max_rows`, so a runaway query cannot pull a whole table into memory; the server's
+    statement timeout bounds how long it can run.
+    """
+
+    def __init__(self, engine: Optional[Engine] = None, max_rows: Optional[int] = None, fetch_size: Optional[int] = None):
+        self.engine = engine or read_only_engine
+        self.embeddings = get_embeddings()
+        self.max_rows = max_rows or config.sql_max_rows
+        self.fetch_size = fetch_size or config.sql_fetch_size
+
+    def _prepare(self, query: str) -> str:
+        # Basic safety check; the read-only session is what actually enforces it
+        if FORBIDDEN_KEYWORDS.search(query):
             raise ValueError("Only read-only queries are allowed.")
 
         # Handle EMBEDDING_FUNCTION
         # Regex to find EMBEDDING_FUNCTION('text') or EMBEDDING_FUNCTION("text")
         embedding_pattern = r"EMBEDDING_FUNCTION\((['\"])(.*?)\1\)"
-        
+
         def replace_embedding(match):
             text_content = match.group(2)
             logger.info(f"Generating embedding for: {text_content}")
@@ -44,12 +48,42 @@ class SQLExecutor:
         if "EMBEDDING_FUNCTION" in query:
             query = re.sub(embedding_pattern, replace_embedding, query)
             logger.info("Query with embeddings injected")
+        return query
+
+    def stream_query(self, query: str) -> Iterator[Dict[str, Any]]:
+        """
+        Yield result rows as dictionaries, at most `max_rows` of them.
 
+        The connection goes back to the pool when the iterator is exhausted or closed.
+        """
+        query = self._prepare(query)
         try:
             with self.engine.connect() as connection:
-                result = connection.execute(text(query))
-                keys = result.keys()
-                return [dict(zip(keys, row)) for row in result.fetchall()]
+                result = connection.execution_options(stream_results=True, max_row_buffer=self.fetch_size).execute(text(query))
+                keys = list(result.keys())
+                for row in islice(result, self.max_rows):
+                    yield dict(zip(keys, row))
         except Exception as e:
             logger.error(f"Error executing query: {query}. Error: {e}")
             raise e
+
+    def execute_query(self, query: str) -> List[Dict[str, Any]]:
+        """
+        Execute a read-only SQL query.
+
+        Args:
+            query: SQL query to execute.
+
+        Returns:
+            List of dictionaries representing the result rows (at most `max_rows`).
+        """
+        rows = list(self.stream_query(query))
+        if len(rows) == self.max_rows:
+            logger.warning(f"Query result truncated to {self.max_rows} rows")
+        return rows
+
+
+@lru_cache(maxsize=1)
+def get_sql_executor() -> SQLExecutor:
+    """Return the process-wide executor, so chat queries reuse the warm read-only pool."""
+    return SQLExecutor()
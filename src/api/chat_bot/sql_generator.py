@@ -1,8 +1,7 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
 from api.config import config
 from langchain_core.prompts import ChatPromptTemplate
-from api.chat_bot.table_detail_repository import TableDetailsRepository
-from api.repository.database import SessionLocal
+from api.chat_bot.table_catalog import table_catalog
 
 class SQLGenerator:
     def __init__(self):
@@ -40,21 +39,15 @@ class SQLGenerator:
         Returns:
             Generated SQL query.
         """
-        # Retrieve relevant table details
-        db = SessionLocal()
-        try:
-            repo = TableDetailsRepository(db)
-            # Search for relevant tables
-            table_details = repo.search(query, limit=5)
-            
-            if not table_details:
-                return "ERROR: No relevant tables found for the query."
-                
-            # Construct schema string from descriptions
-            schema = "\n\n".join([td.table_description for td in table_details])
+        # Retrieve relevant table details from the in-memory catalog
+        table_details = await table_catalog.asearch(query, limit=5)
+        
+        if not table_details:
+            return "ERROR: No relevant tables found for the query."
             
-            chain = self.prompt | self.llm
-            response = await chain.ainvoke({"schema": schema, "query": query})
-            return response.content.strip().replace("```sql", "").replace("```", "").strip()
-        finally:
-            db.close()
+        # Construct schema string from descriptions
+        schema = "\n\n".join([td.table_description for td in table_details])
+        
+        chain = self.prompt | self.llm
+        response = await chain.ainvoke({"schema": schema, "query": query})
+        return response.content.strip().replace("```sql", "").replace("```", "").strip()
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from api.config import config
+from api.chat_bot.models import TableDetails
+from api.genai.embeddings import get_embeddings
+from api.repository.database import get_raw_connection
+from api.repository.rule_index import decode_vector
+
+logger = logging.getLogger(__name__)
+
+
+class TableCatalog:
+    """
+    In-memory copy of table_details and its embeddings for the chat bot's schema retrieval.
+
+    The catalog is small and rarely changes, so questions are scored locally against one
+    float32 matrix instead of scanning table_details in Postgres. It reloads after a write
+    through the /table-details routes (`invalidate`) and, for writes made by another
+    process, once it is older than `table_catalog_ttl_seconds`.
+    """
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items: List[TableDetails] = []
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._squared_norms = np.zeros(0, dtype=np.float32)
+        self._loaded_at: Optional[float] = None
+        # Bumped by invalidate so a load that raced with a write is not treated as fresh
+        self._generation = 0
+        self.loads = 0
+        self.searches = 0
+
+    def load(self) -> int:
+        """Read the whole catalog from table_details; returns the number of tables loaded."""
+        with self._lock:
+            generation = self._generation
+        conn = get_raw_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id, table_description, vector_send(embedding) FROM table_details WHERE embedding IS NOT NULL ORDER BY id"
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+        finally:
+            conn.close()
+
+        items = [TableDetails(id=row[0], table_description=row[1]) for row in rows]
+        vectors = np.stack([decode_vector(row[2]) for row in rows]) if rows else np.zeros((0, 0), dtype=np.float32)
+        with self._lock:
+            self._items = items
+            self._vectors = vectors
+            self._squared_norms = np.einsum("ij,ij->i", vectors, vectors)
+            self._loaded_at = time.monotonic() if generation == self._generation else None
+            self.loads += 1
+        logger.info(f"Loaded table catalog with {len(items)} tables")
+        return len(items)
+
+    def invalidate(self) -> None:
+        """Reload on the next search."""
+        with self._lock:
+            self._generation += 1
+            self._loaded_at = None
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            fresh = self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+        if not fresh:
+            self.load()
+
+    def rank(self, query_vector, limit: int = 5, include_embeddings: bool = False) -> List[TableDetails]:
+        """Return the `limit` tables nearest to an embedded question by L2 distance, nearest first."""
+        self._ensure_loaded()
+        with self._lock:
+            items, vectors, squared_norms = self._items, self._vectors, self._squared_norms
+            self.searches += 1
+        if not items or limit <= 0:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        # ||v - q||^2 without the constant ||q||^2, which does not change the order
+        distances = squared_norms - 2 * (vectors @ query)
+        order = np.argsort(distances, kind="stable")[:limit]
+        if include_embeddings:
+            return [items[i].model_copy(update={"embedding": vectors[i].tolist()}) for i in order]
+        return [items[i] for i in order]
+
+    def search(self, query: str, limit: int = 5, include_embeddings: bool = False) -> List[TableDetails]:
+        """Embed a question (through the shared embedding cache) and rank the catalog against it."""
+        return self.rank(get_embeddings().embed_query(query), limit, include_embeddings)
+
+    async def asearch(self, query: str, limit: int = 5, include_embeddings: bool = False) -> List[TableDetails]:
+        await asyncio.to_thread(self._ensure_loaded)
+        return self.rank(await get_embeddings().aembed_query(query), limit, include_embeddings)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tables": len(self._items),
+                "loaded": self._loaded_at is not None,
+                "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at is not None else None,
+                "ttl_seconds": self.ttl,
+                "loads": self.loads,
+                "searches": self.searches
+            }
+
+
+table_catalog = TableCatalog(ttl=config.table_catalog_ttl_seconds)
@@ -1,8 +1,9 @@
 from typing import List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import select
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from api.config import config
+from api.genai.embeddings import EMBEDDING_MODEL, get_embeddings
+from api.genai.embedding_pipeline import EmbeddingPipeline
+from api.repository.bulk import bulk_insert
 from api.chat_bot.models import TableDetailsTable, TableDetails
 import logging
 
@@ -11,10 +12,7 @@ logger = logging.getLogger(__name__)
 class TableDetailsRepository:
     def __init__(self, db: Session):
         self.db = db
-        self.embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/gemini-embedding-001",
-            google_api_key=config.google_api_key
-        )
+        self.embeddings = get_embeddings()
 
     def add(self, table_description: str) -> TableDetails:
         """
@@ -26,7 +24,8 @@ class TableDetailsRepository:
             
             db_item = TableDetailsTable(
                 table_description=table_description,
-                embedding=embedding
+                embedding=embedding,
+                embedding_model=EMBEDDING_MODEL
             )
             self.db.add(db_item)
             self.db.commit()
@@ -37,6 +36,23 @@ class TableDetailsRepository:
             logger.error(f"Error adding table details: {e}")
             raise e
 
+    def add_many(self, table_descriptions: List[str]) -> List[TableDetails]:
+        """
+        Add many table details, embedding them in rate-limited chunks and inserting in bulk.
+        """
+        try:
+            embeddings = EmbeddingPipeline(self.embeddings).embed(table_descriptions)
+            created = bulk_insert(self.db, TableDetailsTable, [
+                TableDetailsTable(table_description=description, embedding=embedding, embedding_model=EMBEDDING_MODEL)
+                for description, embedding in zip(table_descriptions, embeddings)
+            ])
+            self.db.commit()
+            return [TableDetails.model_validate(item) for item in created]
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error adding table details: {e}")
+            raise e
+
     def get_all(self) -> List[TableDetails]:
         """
         Get all table details.
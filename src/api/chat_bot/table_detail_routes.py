@@ -4,6 +4,7 @@ from typing import List
 from api.repository.database import get_db
 from api.chat_bot.table_detail_repository import TableDetailsRepository
 from api.chat_bot.models import TableDetails
+from api.chat_bot.table_catalog import table_catalog
 
 router = APIRouter(prefix="/table-details", tags=["table-details"])
 
@@ -19,7 +20,24 @@ def create_table_detail(
     Create a new table detail.
     """
     try:
-        return repository.add(table_description)
+        item = repository.add(table_description)
+        table_catalog.invalidate()
+        return item
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/bulk", response_model=List[TableDetails])
+def create_table_details(
+    table_descriptions: List[str],
+    repository: TableDetailsRepository = Depends(get_repository)
+):
+    """
+    Create many table details in one request.
+    """
+    try:
+        items = repository.add_many(table_descriptions)
+        table_catalog.invalidate()
+        return items
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -35,6 +53,13 @@ def get_all_table_details(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/catalog/stats")
+def get_table_catalog_stats():
+    """
+    Size and age of the in-memory table catalog used by the chat bot.
+    """
+    return table_catalog.stats()
+
 @router.get("/{id}", response_model=TableDetails)
 def get_table_detail(
     id: int,
@@ -63,6 +88,7 @@ def delete_table_detail(
     """
     try:
         success = repository.delete(id)
+        table_catalog.invalidate()
         if not success:
             raise HTTPException(status_code=404, detail=f"Table detail with id {id} not found")
         return {"detail": "Table detail deleted"}
@@ -74,13 +100,12 @@ def delete_table_detail(
 @router.post("/search", response_model=List[TableDetails])
 def search_table_details(
     query: str,
-    limit: int = 5,
-    repository: TableDetailsRepository = Depends(get_repository)
+    limit: int = 5
 ):
     """
     Search table details by semantic similarity.
     """
     try:
-        return repository.search(query, limit)
+        return table_catalog.search(query, limit, include_embeddings=True)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,7 +1,6 @@
 from langchain_core.tools import tool
-from api.chat_bot.table_detail_repository import TableDetailsRepository
-from api.repository.database import SessionLocal
-from api.chat_bot.sql_executor import SQLExecutor
+from api.chat_bot.table_catalog import table_catalog
+from api.chat_bot.sql_executor import get_sql_executor
 from typing import List, Dict, Any
 
 @tool
@@ -10,19 +9,14 @@ def search_table_details_tool(query: str) -> List[Dict[str, Any]]:
     Search for relevant table schemas based on a natural language query.
     Use this tool to find out which tables and columns are available to answer the user's question.
     """
-    db = SessionLocal()
-    try:
-        repo = TableDetailsRepository(db)
-        results = repo.search(query, limit=5)
-        return [
-            {
-                "table_description": item.table_description,
-                "id": item.id
-            } 
-            for item in results
-        ]
-    finally:
-        db.close()
+    results = table_catalog.search(query, limit=5)
+    return [
+        {
+            "table_description": item.table_description,
+            "id": item.id
+        } 
+        for item in results
+    ]
 
 @tool
 def execute_sql_tool(sql_query: str) -> List[Dict[str, Any]]:
@@ -34,8 +28,7 @@ def execute_sql_tool(sql_query: str) -> List[Dict[str, Any]]:
     if not sql_query.strip().upper().startswith("SELECT"):
         return [{"error": "Only SELECT queries are allowed."}]
     
-    executor = SQLExecutor()
     try:
-        return executor.execute_query(sql_query)
+        return get_sql_executor().execute_query(sql_query)
     except Exception as e:
         return [{"error": str(e)}]
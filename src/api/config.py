@@ -104,6 +104,140 @@ class Config:
     def mcp_server_url(self) -> str:
         return self._config.get("mcp_server_url")
 
+    @property
+    def mcp_session_pool_size(self) -> int:
+        return int(self._config.get("mcp_session_pool_size", 4))
+
+    @property
+    def mcp_health_check_interval(self) -> float:
+        return float(self._config.get("mcp_health_check_interval", 30))
+
+    @property
+    def rule_cache_size(self) -> int:
+        return int(self._config.get("rule_cache_size", 256))
+
+    @property
+    def rule_cache_ttl_seconds(self) -> float:
+        return float(self._config.get("rule_cache_ttl_seconds", 300))
+
+    @property
+    def rule_cache_listen(self) -> bool:
+        return str(self._config.get("rule_cache_listen", False)).lower() in ("1", "true", "yes")
+
+    @property
+    def db_pool_size(self) -> int:
+        return int(self._config.get("db_pool_size", 5))
+
+    @property
+    def db_max_overflow(self) -> int:
+        return int(self._config.get("db_max_overflow", 10))
+
+    @property
+    def db_pool_recycle(self) -> int:
+        return int(self._config.get("db_pool_recycle", 1800))
+
+    @property
+    def db_pool_timeout(self) -> float:
+        return float(self._config.get("db_pool_timeout", 30))
+
+    @property
+    def process_concurrency(self) -> int:
+        return int(self._config.get("process_concurrency", 4))
+
+    @property
+    def job_workers(self) -> int:
+        return int(self._config.get("job_workers", 2))
+
+    @property
+    def job_prefetch(self) -> int:
+        return int(self._config.get("job_prefetch", 2))
+
+    @property
+    def job_poll_interval(self) -> float:
+        return float(self._config.get("job_poll_interval", 1))
+
+    @property
+    def job_visibility_timeout(self) -> float:
+        return float(self._config.get("job_visibility_timeout", 900))
+
+    @property
+    def job_heartbeat_interval(self) -> float:
+        """How often running jobs refresh `updated_date`; must stay well under `job_visibility_timeout`."""
+        return float(self._config.get("job_heartbeat_interval", self.job_visibility_timeout / 3))
+
+    @property
+    def job_max_attempts(self) -> int:
+        return int(self._config.get("job_max_attempts", 3))
+
+    @property
+    def dedup_window_seconds(self) -> float:
+        return float(self._config.get("dedup_window_seconds", 86400))
+
+    @property
+    def bulk_chunk_size(self) -> int:
+        return int(self._config.get("bulk_chunk_size", 1000))
+
+    @property
+    def embedding_cache_size(self) -> int:
+        return int(self._config.get("embedding_cache_size", 1024))
+
+    @property
+    def embedding_cache_persist(self) -> bool:
+        return str(self._config.get("embedding_cache_persist", False)).lower() in ("1", "true", "yes")
+
+    @property
+    def embedding_chunk_size(self) -> int:
+        return int(self._config.get("embedding_chunk_size", 100))
+
+    @property
+    def embedding_concurrency(self) -> int:
+        return int(self._config.get("embedding_concurrency", 4))
+
+    @property
+    def embedding_requests_per_minute(self) -> float:
+        return float(self._config.get("embedding_requests_per_minute", 300))
+
+    @property
+    def embedding_max_retries(self) -> int:
+        return int(self._config.get("embedding_max_retries", 5))
+
+    @property
+    def table_catalog_ttl_seconds(self) -> float:
+        return float(self._config.get("table_catalog_ttl_seconds", 300))
+
+    @property
+    def sql_pool_size(self) -> int:
+        return int(self._config.get("sql_pool_size", 2))
+
+    @property
+    def sql_statement_timeout_ms(self) -> int:
+        return int(self._config.get("sql_statement_timeout_ms", 15000))
+
+    @property
+    def sql_max_rows(self) -> int:
+        return int(self._config.get("sql_max_rows", 1000))
+
+    @property
+    def sql_fetch_size(self) -> int:
+        return int(self._config.get("sql_fetch_size", 500))
+
+    @property
+    def table_extraction(self) -> bool:
+        return str(self._config.get("table_extraction", True)).lower() in ("1", "true", "yes")
+
+    @property
+    def extraction_chunk_rows(self) -> int:
+        return int(self._config.get("extraction_chunk_rows", 200))
+
+    @property
+    def extraction_chunk_concurrency(self) -> int:
+        return int(self._config.get("extraction_chunk_concurrency", 4))
+
+    def extraction_chunk_rows_for(self, client_id: int) -> int:
+        """Rows per extraction chunk for a client: `extraction_chunk_rows_by_client` {"<client_id>": rows}, else the default (0 disables chunking)."""
+        by_client = self._config.get("extraction_chunk_rows_by_client") or {}
+        return int(by_client.get(str(client_id), self.extraction_chunk_rows))
+
     @property
     def raw(self) -> dict:
         """Return raw config dict"""
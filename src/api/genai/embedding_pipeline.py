@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from api.config import config
+from api.genai.embeddings import get_embeddings
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket shared by every embedding request in the process.
+
+    `acquire` reserves a token up front and sleeps off any deficit, so callers on different
+    threads and event loops draw from the same budget without sharing an asyncio lock.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take tokens and return how many seconds the caller must wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        delay = self.reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def acquire_sync(self, tokens: float = 1.0) -> None:
+        delay = self.reserve(tokens)
+        if delay:
+            time.sleep(delay)
+
+
+embedding_rate_limiter = TokenBucket(
+    rate=config.embedding_requests_per_minute / 60,
+    capacity=max(1, config.embedding_concurrency)
+)
+
+
+class EmbeddingPipeline:
+    """
+    Embeds large batches of documents in chunks, concurrently, under the shared rate limit.
+
+    A chunk that fails is retried with exponential backoff, so one quota error delays a
+    load instead of failing it. Results come back in input order.
+    """
+
+    def __init__(self, embeddings: Optional[Embeddings] = None, chunk_size: Optional[int] = None,
+                 concurrency: Optional[int] = None, max_retries: Optional[int] = None,
+                 rate_limiter: Optional[TokenBucket] = None, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.embeddings = embeddings or get_embeddings()
+        self.chunk_size = chunk_size or config.embedding_chunk_size
+        self.concurrency = concurrency or config.embedding_concurrency
+        self.max_retries = max_retries if max_retries is not None else config.embedding_max_retries
+        self.rate_limiter = rate_limiter or embedding_rate_limiter
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def _retry_delay(self, attempt: int, chunk: List[str], error: Exception) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+        logger.warning(f"Embedding chunk of {len(chunk)} failed ({error}); retry {attempt}/{self.max_retries} in {delay:.1f}s")
+        return delay
+
+    async def _embed_chunk(self, chunk: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire()
+            try:
+                return await self.embeddings.aembed_documents(chunk)
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                await asyncio.sleep(self._retry_delay(attempt, chunk, e))
+
+    def _embed_chunk_sync(self, chunk: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire_sync()
+            try:
+                return self.embeddings.embed_documents(chunk)
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                time.sleep(self._retry_delay(attempt, chunk, e))
+
+    async def aembed(self, texts: List[str], progress: Optional[Callable[[int, int], None]] = None) -> List[List[float]]:
+        """
+        Embed texts as documents; `progress(done, total)` is called after each chunk.
+        """
+        chunks = [texts[start:start + self.chunk_size] for start in range(0, len(texts), self.chunk_size)]
+        slots = asyncio.Semaphore(self.concurrency)
+        done = 0
+
+        async def run(chunk: List[str]) -> List[List[float]]:
+            nonlocal done
+            async with slots:
+                vectors = await self._embed_chunk(chunk)
+            done += len(chunk)
+            if progress:
+                progress(done, len(texts))
+            return vectors
+
+        results = await asyncio.gather(*(run(chunk) for chunk in chunks))
+        return [vector for vectors in results for vector in vectors]
+
+    def embed(self, texts: List[str], progress: Optional[Callable[[int, int], None]] = None) -> List[List[float]]:
+        """
+        Blocking counterpart of `aembed` for synchronous callers, run on a thread pool.
+
+        Uses the client's sync API: its async client is bound to the first event loop that used it,
+        so a fresh `asyncio.run` per call would fail from the second call on.
+        """
+        chunks = [texts[start:start + self.chunk_size] for start in range(0, len(texts), self.chunk_size)]
+        lock = threading.Lock()
+        done = 0
+
+        def run(chunk: List[str]) -> List[List[float]]:
+            nonlocal done
+            vectors = self._embed_chunk_sync(chunk)
+            with lock:
+                done += len(chunk)
+                if progress:
+                    progress(done, len(texts))
+            return vectors
+
+        with ThreadPoolExecutor(max_workers=max(1, self.concurrency), thread_name_prefix="embedding") as pool:
+            results = list(pool.map(run, chunks))
+        return [vector for vectors in results for vector in vectors]
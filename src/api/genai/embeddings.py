@@ -0,0 +1,220 @@
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from api.config import config
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "models/gemini-embedding-001"
+
+# Google embeds queries and documents with different task types, so they are cached apart
+QUERY = "query"
+DOCUMENT = "document"
+
+
+def embedding_key(model: str, kind: str, text: str) -> str:
+    """sha256 of the model, embedding kind and text; the cache key in memory and in Postgres."""
+    return hashlib.sha256("\x1f".join((model, kind, text)).encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Persistent tier of the embedding cache in the embedding_cache table.
+
+    Lookups and writes borrow connections from the shared pool; failures are logged and
+    treated as misses so the cache never takes the embedding path down.
+    """
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        from api.repository.database import get_raw_connection
+        from api.repository.rule_index import decode_vector
+
+        conn = None
+        try:
+            conn = get_raw_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT content_hash, vector_send(embedding) FROM embedding_cache WHERE content_hash = ANY(%s)",
+                (keys,)
+            )
+            found = {row[0]: decode_vector(row[1]) for row in cursor.fetchall()}
+            cursor.close()
+            return found
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            return {}
+        finally:
+            if conn:
+                conn.close()
+
+    def put_many(self, model: str, items: Dict[str, np.ndarray]) -> None:
+        from psycopg2.extras import execute_values
+        from api.repository.database import get_raw_connection
+        from api.repository.rule_index import vector_literal
+
+        conn = None
+        try:
+            conn = get_raw_connection()
+            cursor = conn.cursor()
+            execute_values(
+                cursor,
+                "INSERT INTO embedding_cache (content_hash, model, embedding) VALUES %s ON CONFLICT (content_hash) DO NOTHING",
+                [(key, model, vector_literal(vector)) for key, vector in items.items()],
+                template="(%s, %s, %s::vector)"
+            )
+            conn.commit()
+            cursor.close()
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+            if conn:
+                conn.rollback()
+        finally:
+            if conn:
+                conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that remembers vectors by content hash.
+
+    Lookups go to an in-process LRU first, then (when configured) the embedding_cache table,
+    and only the texts missing from both are sent to the remote model, in one batch.
+    """
+
+    def __init__(self, inner: Embeddings, model: str = EMBEDDING_MODEL, maxsize: int = 1024,
+                 store: Optional[EmbeddingStore] = None):
+        self.inner = inner
+        self.model = model
+        self.maxsize = maxsize
+        self.store = store
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.remote_calls = 0
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _lookup(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Resolve keys from memory and the persistent tier; returns only the ones found."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = vector
+            self.hits += len(found)
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if missing and self.store is not None:
+            stored = self.store.get_many(missing)
+            with self._lock:
+                self.store_hits += len(stored)
+            for key, vector in stored.items():
+                self._remember(key, vector)
+            found.update(stored)
+        return found
+
+    def _save(self, computed: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            self.misses += len(computed)
+            self.remote_calls += 1
+        for key, vector in computed.items():
+            self._remember(key, vector)
+        if self.store is not None:
+            self.store.put_many(self.model, computed)
+
+    def _missing(self, kind: str, texts: List[str]):
+        keys = [embedding_key(self.model, kind, text) for text in texts]
+        found = self._lookup(keys)
+        # Embed each distinct missing text once, even if it repeats in the batch
+        pending = {key: text for key, text in zip(keys, texts) if key not in found}
+        return keys, found, pending
+
+    def _embed(self, kind: str, texts: List[str]) -> List[List[float]]:
+        keys, found, pending = self._missing(kind, texts)
+        if pending:
+            if kind == QUERY:
+                vectors = [self.inner.embed_query(text) for text in pending.values()]
+            else:
+                vectors = self.inner.embed_documents(list(pending.values()))
+            computed = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(pending, vectors)}
+            self._save(computed)
+            found.update(computed)
+        return [found[key].tolist() for key in keys]
+
+    async def _aembed(self, kind: str, texts: List[str]) -> List[List[float]]:
+        keys, found, pending = await asyncio.to_thread(self._missing, kind, texts)
+        if pending:
+            if kind == QUERY:
+                vectors = [await self.inner.aembed_query(text) for text in pending.values()]
+            else:
+                vectors = await self.inner.aembed_documents(list(pending.values()))
+            computed = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(pending, vectors)}
+            await asyncio.to_thread(self._save, computed)
+            found.update(computed)
+        return [found[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(QUERY, [text])[0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(DOCUMENT, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self._aembed(QUERY, [text]))[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self._aembed(DOCUMENT, texts)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.store_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "persistent": self.store is not None,
+                "hits": self.hits,
+                "store_hits": self.store_hits,
+                "misses": self.misses,
+                "remote_calls": self.remote_calls,
+                "hit_rate": round((self.hits + self.store_hits) / lookups, 4) if lookups else 0.0
+            }
+
+
+@lru_cache(maxsize=1)
+def get_embeddings() -> CachedEmbeddings:
+    """Return the process-wide Google embeddings client, wrapped in the embedding cache."""
+    google_api_key = config.google_api_key
+    if not google_api_key:
+        raise ValueError("google_api_key not found in config")
+
+    return CachedEmbeddings(
+        GoogleGenerativeAIEmbeddings(
+            model=EMBEDDING_MODEL,
+            google_api_key=google_api_key
+        ),
+        maxsize=config.embedding_cache_size,
+        store=EmbeddingStore() if config.embedding_cache_persist else None
+    )
+
+
+def embedding_cache_stats() -> Dict[str, Any]:
+    """Counters of the shared embedding cache, or an empty dict before it is first used."""
+    if get_embeddings.cache_info().currsize == 0:
+        return {}
+    return get_embeddings().stats()
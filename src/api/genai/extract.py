@@ -2,7 +2,10 @@ import os
 import asyncio
 from dotenv import load_dotenv
 import json
+import logging
+import time
 import uuid
+from typing import AsyncIterator, List, Optional, Union
 
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.agents import create_agent
@@ -10,45 +13,86 @@ from api.genai.tools import remove_space_sepcial_chars_from_account_number, chec
 from api.repository.models import MailRequest
 from api.config import config
 from api.repository.final_response import FinalResponse, ExtractedField, Rule, FieldValidation
+from api.repository.database import SessionLocal
+from api.repository.client_repository import ClientRepository
+from api.repository.client_rule_embedding import ClientRuleEmbedding
 
-from langchain_mcp_adapters.client import MultiServerMCPClient
 from langchain_mcp_adapters.tools import load_mcp_tools
+from api.genai.mcp_session_pool import MCPSessionPool
+from api.genai.rule_engine import compact_rules, compile_rules
+from api.genai.structured_output import agent_output
+from api.genai.table_parser import detect_table, header_fields, header_mapping, learn_mapping, parse_records, split_rows
+from api.repository.rule_cache import rule_cache
+from api.repository.table_layout_repository import TableLayoutRepository
+from api.tracing import Trace
+
+logger = logging.getLogger(__name__)
+
+# Steps that run deterministically in `Extract.prepare` and `Extract.finalize`, so the agent does not need these tools
+PIPELINE_TOOLS = {
+    "find_client",
+    "find_all_client_rule_by_client_id_and_process_type",
+    "accounts_urc_check",
+    "save_accounts_and_transactions",
+    "save_process_log",
+}
+
+# Cheap read-only tools the session pool may retry after a transport failure; write tools are never
+# retried, since the server may have committed before the connection broke, and neither is
+# query_database, which makes a model call and may answer differently the second time
+IDEMPOTENT_TOOLS = {
+    "find_client",
+    "find_all_client_rule_by_client_id_and_process_type",
+    "accounts_urc_check",
+    "get_all_accounts",
+    "get_all_transactions",
+    "get_rule_cache_stats",
+    "get_db_pool_stats",
+    "get_embedding_cache_stats",
+}
 
 class Extract:
     def __init__(self):
-        """Initialize without creating MCP session (do it per-request instead)."""
+        """Initialize configuration only; the MCP session pool and agent are built in `startup()`."""
         self.MCP_SERVER_URL = config.mcp_server_url
         self.GOOGLE_API_KEY = config.google_api_key
 
+        self.session_pool = None
+        self.agent = None
+        self._startup_lock = asyncio.Lock()
+        # Bounds concurrent extractions across /process and /process/batch to stay within Gemini quota
+        self._slots = asyncio.Semaphore(config.process_concurrency)
+
         self.system_message = '''
             You are a highly efficient **Data Extraction and Validation Assistant** specializing in financial records.
-            Your input will be a JSON object containing 'subject' and 'content' fields.
+            Your input contains a Correlation ID, a verified CONTEXT block and the email 'content'.
 
             **MANDATORY WORKFLOW:**
 
-            1. **Subject Validation (REQUIRED - DO NOT SKIP):**
-               - Call `validate_subject(subject=...)` with the subject from the input JSON.
-               - Check the response. If "valid" is false, IMMEDIATELY STOP and return: `{"error": "<message from tool>"}`
-               - If valid, note the process_type returned.
+            1. **Context (ALREADY VERIFIED - DO NOT RE-CHECK):**
+               - The subject has been validated and the process_type is given in the CONTEXT.
+               - The client has been verified; client_id and client_name are given in the CONTEXT.
+               - The CONTEXT `rules` are ONLY the client rules that the system could not apply automatically.
+                 All other client rules are applied by the system after extraction; do not apply or document them.
+               - The CONTEXT `rules` map each field name (or "other") to its rules as {"id", "rule"};
+                 a rule marked "auto": false is not auto-applied.
+               - Do NOT call validate_subject, find_client or find_all_client_rule_by_client_id_and_process_type.
 
-            2. **Client Verification (REQUIRED - DO NOT SKIP):**
-               - Extract the client name from the 'content' field (first row of data after intro text).
-               - Call `find_client(name=...)` to verify the client exists.
-               - If not found, IMMEDIATELY STOP and return: `{"error": "Client verification failed: Client not found."}`
+            2. **Data Extraction:**
+               - Extract every record from the 'content' field (customer_name, customer_account, amount_paid, balance_amount).
+               - Keep the values exactly as they appear in the email unless a CONTEXT rule transforms them.
 
-            3. **Rule Retrieval (REQUIRED - DO NOT SKIP):**
-               - Call `find_all_client_rule_by_client_id(client_id=..., process_type=...)` 
-               - Use the client_id from Step 2 and process_type from Step 1.
+            3. **APPLY THE CONTEXT RULES TO EACH RECORD (CRITICAL):**
 
-            4. **APPLY VALIDATION RULES TO EACH RECORD (CRITICAL):**
+               If the CONTEXT `rules` are empty, skip this step and return empty rule arrays.
        
-               For EVERY record extracted in Step 4:
+               For EVERY record extracted in Step 2:
    
                 For EVERY field in that record (customer_name, customer_account, amount_paid, balance_amount):
                 
-                    a) Find all rules for that field from Step 3 where is_auto_apply is True. 
+                    a) Find all rules listed under that field (and under "other") in the CONTEXT rules.
 
-                    b) Execute tools that match the rule where is_auto_apply is False.
+                    b) Execute tools that match the rules marked "auto": false.
 
                     c) Do not apply other rules except.
                     
@@ -69,85 +113,49 @@ class Extract:
                             
 
             **Final Output:**
-                Return a single comprehensive JSON object:
-                
-                {
-                    "client_id": "...",
-                    "client_name": "...",
-                    "process_type": 1 or 2,
-                    "extracted_fields": [
-                    {
-                        "customer_name": "FINAL_VALUE_AFTER_ALL_TRANSFORMATIONS",
-                        "customer_account": "FINAL_VALUE_AFTER_ALL_TRANSFORMATIONS",
-                        "amount_paid": "FINAL_VALUE",
-                        "balance_amount": "FINAL_VALUE",
-                        "transformtion_rules": [
-                            {
-                                "rule_id": RULE_ID,
-                                "description": "RULE_CONTENT",
-                                "status": "APPLIED|SKIPPED"
-                            },
-                            { ... next record ... }
-                        ],
-                        "validation_rules": [
-                            {
-                                "rule_id": RULE_ID,
-                                "rule_type": "RULE_CONTENT",
-                                "description": "Customer name is required",
-                                "status": "PASSED|FAILED"
-                            },
-                            { ... next record ... }
-                        ],
-                        "field_validations": [
-                            {
-                                "massage": "VALIDATION_FAILURE_MESSAGE"
-                            },
-                            { ... next record ... }
-                        ]
-                    },
-                    { ... next record ... }
-                    ],
-                    "errors": []
-                }
+                Return the result as the structured FinalResponse: client_id, client_name and process_type
+                from the CONTEXT, one extracted_fields entry per record with its final field values and the
+                documented transformtion_rules, validation_rules and field_validations, and any errors.
 
                 **CRITICAL RULES TO FOLLOW:**
 
-                - Do NOT skip any fields or rules
+                - Do NOT skip any fields or CONTEXT rules
                 - Apply transformations BEFORE validations
                 - Use transformed values for all subsequent operations
                 - Document EVERY rule application with status
                 - If a field fails validation, still include it in output with status "fail"
                 - Include only one final extracted_fields array
-                - If ANY step fails (subject, client, rules), return error JSON immediately and STOP
-                - Return ONLY valid JSON, nothing else
-                - Call accounts_urc_check(final_respone=...) to set field_validations
-                - Then call save_accounts_and_transactions(final_respone=..., correlation_id="...") to save response to database. Use the Correlation ID provided in the user's initial message.
-                - Finally call save_process_log(process_log=...) with:
-                    * correlation_id: extracted from the content or generated
-                    * process_type: process_type from Step 1
-                    * details: the entire final_response JSON
+                - If extraction fails, return no extracted_fields, describe the failure in errors and STOP
+                - Do NOT check accounts, save or log anything; the system does this after extraction
 
 
         '''
      
-    async def process(self, message: str):
-        """Create agent with fresh MCP session for this request."""
-        mcp_servers = {
-            "client_mcp": {
-                "transport": "streamable_http",
-                "url": self.MCP_SERVER_URL
-            }
-        }
-
-        client = MultiServerMCPClient(mcp_servers)
-        
-        # Create fresh session for this request
-        async with client.session("client_mcp") as session:
-            mcptools = await load_mcp_tools(session)
-
-            combined_tools = [remove_space_sepcial_chars_from_account_number, check_negative_balance_amount, validate_subject] + mcptools
-            # Note: save_process_log is now in mcptools
+    async def startup(self):
+        """Open the pooled MCP sessions, load the tool catalog once and build the agent."""
+        async with self._startup_lock:
+            if self.agent is not None:
+                return
 
+            session_pool = MCPSessionPool(
+                {
+                    "transport": "streamable_http",
+                    "url": self.MCP_SERVER_URL
+                },
+                size=config.mcp_session_pool_size,
+                health_check_interval=config.mcp_health_check_interval,
+                idempotent_tools=IDEMPOTENT_TOOLS
+            )
+            try:
+                await session_pool.start()
+                # Tools are bound to the pool, so every tool call borrows a live session
+                mcptools = await load_mcp_tools(session_pool)
+            except Exception:
+                await session_pool.close()
+                raise
+            self.session_pool = session_pool
+            mcptools = [t for t in mcptools if t.name not in PIPELINE_TOOLS]
+            combined_tools = [remove_space_sepcial_chars_from_account_number, check_negative_balance_amount] + mcptools
 
             llm = ChatGoogleGenerativeAI(
                 model="gemini-2.5-flash",
@@ -156,19 +164,285 @@ class Extract:
                 google_api_key=self.GOOGLE_API_KEY
             )
 
-            agent = create_agent(llm, 
-                                 tools=combined_tools, 
-                                 system_prompt=self.system_message
-                                 )
-            
-            # Generate a correlation ID for this request
-            request_correlation_id = str(uuid.uuid4())
-            
-            # Use the agent within the session context
-            result = await agent.ainvoke(
-                {"messages": [{"role": "user", "content": f"Correlation ID: {request_correlation_id}\n\n{message}"}]}
-            )
-            #final_response = result["messages"][-1].content
-            #return final_response
-            return result
+            self.agent = create_agent(llm,
+                                      tools=combined_tools,
+                                      system_prompt=self.system_message,
+                                      response_format=FinalResponse
+                                      )
+
+    async def shutdown(self):
+        """Close the pooled MCP sessions."""
+        if self.session_pool is not None:
+            await self.session_pool.close()
+        self.session_pool = None
+        self.agent = None
+
+    def prepare(self, request: MailRequest) -> dict:
+        """
+        Run subject validation, client lookup and rule retrieval without the LLM.
+
+        Returns:
+            `{"error": ...}` when a step fails, otherwise the verified context
+            (process_type, client_id, client_name, rules) for the agent prompt.
+        """
+        subject = validate_subject.invoke({"subject": request.subject})
+        if not subject["valid"]:
+            return {"error": subject["message"]}
+        process_type = subject["process_type"]
+
+        db = SessionLocal()
+        try:
+            client = ClientRepository(db).find_mentioned_in(request.content)
+        finally:
+            db.close()
+        if client is None:
+            return {"error": "Client verification failed: Client not found."}
+
+        rules = ClientRuleEmbedding(client.id).search_rules(process_type, return_all=True, k=100, include_embeddings=False)
+        if not rules.get("success"):
+            return {"error": f"Rule retrieval failed: {rules.get('error')}"}
+
+        return {
+            "process_type": process_type,
+            "client_id": client.id,
+            "client_name": client.name,
+            "rules": [
+                {
+                    "rule_id": rule["rule_id"],
+                    "rule_content": rule["rule_content"],
+                    "is_auto_apply": rule["is_auto_apply"]
+                }
+                for rule in rules["results"]
+            ]
+        }
+
+    def extract_table(self, context: dict, content: str) -> Optional[List[ExtractedField]]:
+        """
+        Parse a tabular email body locally instead of asking the LLM.
+
+        Columns are mapped by header name, or by the layout learned for this client from an
+        earlier LLM extraction. Returns None when the body has no single clear table, its layout
+        is not known yet, or a cell does not fit its field.
+        """
+        table = detect_table(content)
+        if table is None:
+            return None
+        mapping = header_mapping(table.header) if table.header else None
+        if mapping is None:
+            db = SessionLocal()
+            try:
+                mapping = TableLayoutRepository(db).get(context["client_id"], context["process_type"], table.signature)
+            finally:
+                db.close()
+        if mapping is None:
+            return None
+        return parse_records(table, mapping)
+
+    def learn_table_layout(self, context: dict, content: str, records: List[dict]) -> None:
+        """Remember the column layout of a header-less (or unusually labelled) table from the LLM's extraction."""
+        table = detect_table(content)
+        if table is None or (table.header and header_mapping(table.header)):
+            return
+        mapping = learn_mapping(table, records)
+        if mapping is None:
+            return
+        db = SessionLocal()
+        try:
+            TableLayoutRepository(db).save(context["client_id"], context["process_type"], table.signature, mapping)
+        finally:
+            db.close()
+        logger.info(f"Learned table layout {table.signature} for client {context['client_id']}: {mapping}")
+
+    async def call_mcp_tool(self, name: str, arguments: dict, trace: Optional[Trace] = None):
+        """Call an MCP tool on a pooled session and return its decoded JSON result; timed as a span of `trace`."""
+        started = time.monotonic()
+        try:
+            result = await self.session_pool.call_tool(name, arguments)
+        except Exception as e:
+            if trace is not None:
+                trace.record("tool", name, time.monotonic() - started, error=str(e))
+            raise
+        text = "".join(part.text for part in result.content if getattr(part, "text", None))
+        if trace is not None:
+            trace.record("tool", name, time.monotonic() - started, error=text if result.isError else None)
+        if result.isError:
+            raise RuntimeError(f"MCP tool {name} failed: {text}")
+        return json.loads(text) if text else None
+
+    def parse_final_response(self, result: dict) -> Union[FinalResponse, dict]:
+        """The agent's validated FinalResponse, or an error dict when extraction failed."""
+        final_response = agent_output(result, FinalResponse)
+        if isinstance(final_response, FinalResponse) and final_response.errors and not final_response.extracted_fields:
+            return {"error": "; ".join(final_response.errors)}
+        return final_response
+
+    async def finalize(self, final_response: FinalResponse, correlation_id: str, extraction: str = "llm",
+                       trace: Optional[Trace] = None) -> dict:
+        """
+        Flag unrecognised accounts, save valid records (outcome counts under `ingest`) and write the process log.
+
+        `extraction` records whether the records came from the LLM or the local table parser; the
+        `trace` summary (model and tool calls, tokens, latency) is saved under `usage`.
+        """
+        checked = await self.call_mcp_tool("accounts_urc_check", {"final_response": final_response.model_dump()}, trace)
+        checked["extraction"] = extraction
+        checked["ingest"] = await self.call_mcp_tool("save_accounts_and_transactions", {"final_response": checked, "correlation_id": correlation_id}, trace)
+        if trace is not None:
+            checked["usage"] = trace.summary()
+        await self.call_mcp_tool("save_process_log", {
+            "process_log": {
+                "correlation_id": correlation_id,
+                "process_type": final_response.process_type,
+                "details": checked
+            }
+        })
+        return checked
+
+    async def process(self, request: MailRequest, correlation_id: Optional[str] = None):
+        """Validate the email, extract records with the agent, apply compiled rules and save the result."""
+        async with self._slots:
+            return await self._process(request, correlation_id or str(uuid.uuid4()))
+
+    async def process_batch(self, requests: List[MailRequest]) -> AsyncIterator[dict]:
+        """
+        Process many emails concurrently, yielding each result as soon as it finishes.
+
+        Yields:
+            `{"index", "correlation_id", "response"}`, or `{"index", "correlation_id", "error"}`
+            when that email raised; one failure does not stop the batch.
+        """
+        async def run(index: int, request: MailRequest, correlation_id: str) -> dict:
+            try:
+                response = await self.process(request, correlation_id)
+                return {"index": index, "correlation_id": correlation_id, "response": response}
+            except Exception as e:
+                return {"index": index, "correlation_id": correlation_id, "error": str(e)}
+
+        tasks = [asyncio.create_task(run(i, r, str(uuid.uuid4()))) for i, r in enumerate(requests)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # The client went away mid-stream; do not leave orphaned agent runs behind
+            for task in tasks:
+                task.cancel()
+
+    async def _process(self, request: MailRequest, request_correlation_id: str):
+        """Run one email under a trace, so its model and tool calls are counted even when it fails."""
+        trace = Trace("process", request_correlation_id)
+        try:
+            return await self._run(request, request_correlation_id, trace)
+        finally:
+            trace.finish()
+
+    async def _run(self, request: MailRequest, request_correlation_id: str, trace: Trace):
+        context = await asyncio.to_thread(self.prepare, request)
+        if "error" in context:
+            return context
+
+        if self.agent is None:
+            await self.startup()
+
+        # Compiled rules run natively after extraction; only the rest go to the LLM
+        rule_set = rule_cache.get_compiled(context["client_id"], context["process_type"],
+                                           lambda: compile_rules(context["rules"]))
+
+        # A table with a known layout needs no LLM when every client rule runs natively
+        if config.table_extraction and not rule_set.uncompiled:
+            try:
+                records = await asyncio.to_thread(self.extract_table, context, request.content)
+            except Exception as e:
+                logger.warning(f"Table extraction failed, falling back to the LLM: {e}")
+                records = None
+            if records is not None:
+                final_response = FinalResponse(client_id=context["client_id"], client_name=context["client_name"],
+                                               process_type=context["process_type"], extracted_fields=records)
+                rule_set.apply(final_response.extracted_fields)
+                return await self.finalize(final_response, request_correlation_id, extraction="table", trace=trace)
+
+        final_response = await self.extract_with_agent(context, rule_set.uncompiled, request.content, request_correlation_id, trace)
+        if isinstance(final_response, dict):
+            return final_response
+        if config.table_extraction:
+            try:
+                records = [field.model_dump() for field in final_response.extracted_fields]
+                await asyncio.to_thread(self.learn_table_layout, context, request.content, records)
+            except Exception as e:
+                logger.warning(f"Could not learn the table layout: {e}")
+
+        final_response = final_response.model_copy(update={"client_id": context["client_id"], "client_name": context["client_name"],
+                                                           "process_type": context["process_type"]})
+        rule_set.apply(final_response.extracted_fields)
+        return await self.finalize(final_response, request_correlation_id, trace=trace)
+
+    async def _invoke_agent(self, context: dict, rules: dict, content: str, correlation_id: str,
+                            trace: Optional[Trace] = None) -> Union[FinalResponse, dict]:
+        message = (
+            f"Correlation ID: {correlation_id}\n\n"
+            f"CONTEXT: {json.dumps({**context, 'rules': rules})}\n\n"
+            f"content={content}"
+        )
+        result = await self.agent.ainvoke(
+            {"messages": [{"role": "user", "content": message}]},
+            config={"callbacks": trace.callbacks() if trace else [], "metadata": {"correlation_id": correlation_id}}
+        )
+        return self.parse_final_response(result)
+
+    async def extract_with_agent(self, context: dict, rules: List[dict], content: str, correlation_id: str,
+                                 trace: Optional[Trace] = None) -> Union[FinalResponse, dict]:
+        """
+        Extract records with the agent, splitting large tables into row-aligned chunks.
+
+        The rules are sent compacted by `compact_rules`, without rules for fields the table header
+        shows are absent. Chunks of `extraction_chunk_rows_for(client_id)` rows are extracted
+        concurrently (at most `extraction_chunk_concurrency` at a time) and merged with
+        `merge_extractions`, which drops records repeated from the text shared by every chunk.
+        An error in any chunk is returned as the result, so a partial email is never saved.
+        """
+        rules = compact_rules(rules, header_fields(content))
+        chunks = split_rows(content, config.extraction_chunk_rows_for(context["client_id"]))
+        if len(chunks) == 1:
+            return await self._invoke_agent(context, rules, content, correlation_id, trace)
+
+        logger.info(f"{correlation_id}: extracting {len(chunks)} chunks")
+        slots = asyncio.Semaphore(max(1, config.extraction_chunk_concurrency))
+
+        async def run(chunk: str) -> Union[FinalResponse, dict]:
+            async with slots:
+                return await self._invoke_agent(context, rules, chunk, correlation_id, trace)
+
+        # Lines in every chunk are the text repeated around the table slices
+        repeated = set(chunks[0].splitlines()).intersection(*(chunk.splitlines() for chunk in chunks[1:]))
+        return self.merge_extractions(await asyncio.gather(*(run(chunk) for chunk in chunks)), "\n".join(repeated))
+
+    def merge_extractions(self, partials: List[Union[FinalResponse, dict]], repeated_text: str = "") -> Union[FinalResponse, dict]:
+        """
+        Combine per-chunk extractions into one, in chunk order.
 
+        Every chunk repeats the text around the table, so a record the LLM read from that text
+        comes back once per chunk. A record is dropped only when it is identical to one from an
+        earlier chunk and its account (or, without one, its name) occurs in `repeated_text`;
+        repeat payments to the same account in the table are kept. The first chunk error, if
+        any, is returned instead.
+        """
+        for partial in partials:
+            if isinstance(partial, dict):
+                return partial
+        repeated = "".join(repeated_text.split()).lower()
+        fields, errors, earlier = [], [], set()
+        for partial in partials:
+            errors.extend(partial.errors)
+            keys = []
+            for field in partial.extracted_fields:
+                key = ("".join(field.customer_account.split()).lower(), " ".join(field.customer_name.split()).lower(),
+                       field.amount_paid, field.balance_amount)
+                keys.append(key)
+                mention = key[0] or key[1].replace(" ", "")
+                if key in earlier and mention and mention in repeated:
+                    continue
+                fields.append(field)
+            earlier.update(keys)
+        duplicates = sum(len(partial.extracted_fields) for partial in partials) - len(fields)
+        if duplicates:
+            logger.info(f"Dropped {duplicates} records repeated from the text around the table while merging {len(partials)} chunks")
+        return partials[0].model_copy(update={"extracted_fields": fields, "errors": errors})
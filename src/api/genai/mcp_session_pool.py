@@ -0,0 +1,158 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Iterable, Optional
+
+from mcp.shared.exceptions import McpError
+from langchain_mcp_adapters.sessions import Connection, create_session
+
+logger = logging.getLogger(__name__)
+
+
+class MCPSessionPool:
+    """
+    Pool of long-lived MCP client sessions.
+
+    Each session is owned by a dedicated background task so the underlying
+    streamable-HTTP transport is entered and exited in the same task. Callers
+    borrow a session with `acquire()`; a session that fails with a transport
+    error is dropped and its owner task reconnects it.
+
+    The pool exposes `list_tools` and `call_tool` with the same signature as
+    `mcp.ClientSession`, so it can be handed to `load_mcp_tools` and the
+    resulting LangChain tools route every call through the pool.
+    """
+
+    def __init__(self, connection: Connection, size: int = 4, health_check_interval: float = 30.0, acquire_timeout: float = 30.0,
+                 idempotent_tools: Iterable[str] = ()):
+        """
+        Args:
+            connection: langchain-mcp-adapters connection config for the server
+            size: Number of sessions kept open
+            health_check_interval: Seconds between pings of idle sessions
+            acquire_timeout: Seconds to wait for a free session before giving up
+            idempotent_tools: Tools that are safe to call twice; only these are retried after a transport failure
+        """
+        self.connection = connection
+        self.size = max(1, size)
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self.idempotent_tools = frozenset(idempotent_tools)
+
+        self._available: Optional[asyncio.Queue] = None
+        self._owners: list[asyncio.Task] = []
+        self._drop_events: dict[int, asyncio.Event] = {}
+        self._health_task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._ready = None
+
+    async def start(self, timeout: float = 30.0) -> None:
+        """Open the sessions and wait until at least one is usable."""
+        if self._owners:
+            return
+        self._closing = False
+        self._available = asyncio.Queue()
+        self._ready = asyncio.Event()
+        self._owners = [asyncio.create_task(self._own_session()) for _ in range(self.size)]
+        self._health_task = asyncio.create_task(self._health_check())
+        await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+        logger.info(f"MCP session pool started with {self.size} sessions")
+
+    async def close(self) -> None:
+        """Close all sessions and stop background tasks."""
+        self._closing = True
+        for event in self._drop_events.values():
+            event.set()
+        tasks = self._owners + ([self._health_task] if self._health_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._owners = []
+        self._drop_events = {}
+        self._health_task = None
+
+    async def _own_session(self) -> None:
+        """Keep one session open, reconnecting with backoff when it is dropped."""
+        backoff = 1.0
+        while not self._closing:
+            try:
+                async with create_session(self.connection) as session:
+                    await session.initialize()
+                    drop = asyncio.Event()
+                    self._drop_events[id(session)] = drop
+                    await self._available.put(session)
+                    self._ready.set()
+                    backoff = 1.0
+                    await drop.wait()
+                    self._drop_events.pop(id(session), None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"MCP session failed, reconnecting in {backoff:.0f}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def _drop(self, session) -> None:
+        """Signal the owner task to discard a broken session and reconnect."""
+        event = self._drop_events.get(id(session))
+        if event:
+            event.set()
+
+    async def _health_check(self) -> None:
+        """Periodically ping idle sessions and drop the ones that do not answer."""
+        while not self._closing:
+            await asyncio.sleep(self.health_check_interval)
+            for _ in range(self._available.qsize()):
+                session = self._available.get_nowait()
+                try:
+                    await asyncio.wait_for(session.send_ping(), timeout=5.0)
+                    self._available.put_nowait(session)
+                except Exception as e:
+                    logger.warning(f"MCP session health check failed: {e}")
+                    self._drop(session)
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Borrow a session from the pool."""
+        if not self._owners:
+            await self.start()
+        session = await asyncio.wait_for(self._available.get(), timeout=self.acquire_timeout)
+        try:
+            yield session
+        except McpError:
+            # Protocol-level error: the session itself is still healthy
+            self._available.put_nowait(session)
+            raise
+        except Exception:
+            self._drop(session)
+            raise
+        except BaseException:
+            # Cancelled by the caller (e.g. a client disconnect); the session itself is fine
+            self._available.put_nowait(session)
+            raise
+        else:
+            self._available.put_nowait(session)
+
+    async def list_tools(self, cursor: Optional[str] = None) -> Any:
+        async with self.acquire() as session:
+            return await session.list_tools(cursor=cursor)
+
+    async def call_tool(self, name: str, arguments: Optional[dict] = None, **kwargs) -> Any:
+        """
+        Call a tool on a pooled session.
+
+        A transport failure is retried once on a fresh session, but only for `idempotent_tools`:
+        the server may already have committed a write before the connection broke, and calling a
+        write tool again would apply it twice.
+        """
+        try:
+            async with self.acquire() as session:
+                return await session.call_tool(name, arguments, **kwargs)
+        except (McpError, asyncio.CancelledError):
+            raise
+        except Exception as e:
+            if name not in self.idempotent_tools:
+                raise
+            logger.warning(f"MCP call '{name}' failed on pooled session, retrying: {e}")
+            async with self.acquire() as session:
+                return await session.call_tool(name, arguments, **kwargs)
@@ -0,0 +1,123 @@
+import sys
+from pathlib import Path
+
+# Add src to path so 'api' package is importable
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+# reembed.py
+# Re-embeds client_rule and table_details rows whose embedding_model is not the current model.
+# Each batch commits with its new embedding_model, so an interrupted run resumes where it stopped.
+#   python src/api/genai/reembed.py [client_rule] [table_details] [--batch-size 500]
+import argparse
+import logging
+import time
+from typing import Callable, Dict, Optional
+
+from psycopg2.extras import execute_values
+from api.genai.embeddings import EMBEDDING_MODEL
+from api.genai.embedding_pipeline import EmbeddingPipeline
+from api.repository.database import get_raw_connection
+from api.repository.rule_cache import notify_rule_change, rule_cache
+from api.repository.rule_index import vector_literal
+
+logger = logging.getLogger(__name__)
+
+# table -> (text column, column naming the client whose rule cache must be dropped)
+TARGETS = {
+    "client_rule": ("rule_content", "client_id"),
+    "table_details": ("table_description", None),
+}
+
+
+def _log_progress(table: str, done: int, total: int, started: float) -> None:
+    elapsed = time.monotonic() - started
+    rate = done / elapsed if elapsed else 0.0
+    eta = (total - done) / rate if rate else 0.0
+    logger.info(f"{table}: {done}/{total} re-embedded ({rate:.1f} rows/s, eta {eta:.0f}s)")
+
+
+def reembed_table(table: str, batch_size: int = 500, pipeline: Optional[EmbeddingPipeline] = None,
+                  progress: Optional[Callable[[str, int, int, float], None]] = None) -> Dict[str, int]:
+    """
+    Re-embed every row of `table` not yet embedded with EMBEDDING_MODEL.
+
+    Returns {"table", "total", "reembedded"}.
+    """
+    text_column, client_column = TARGETS[table]
+    pipeline = pipeline or EmbeddingPipeline()
+    progress = progress or _log_progress
+    select_columns = f"id, {text_column}" + (f", {client_column}" if client_column else "")
+
+    conn = get_raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT count(*) FROM {table} WHERE embedding_model IS DISTINCT FROM %s AND {text_column} IS NOT NULL",
+            (EMBEDDING_MODEL,)
+        )
+        total = cursor.fetchone()[0]
+        done = 0
+        last_id = 0
+        started = time.monotonic()
+        progress(table, done, total, started)
+
+        while True:
+            cursor.execute(
+                f"""
+                    SELECT {select_columns} FROM {table}
+                    WHERE embedding_model IS DISTINCT FROM %s AND {text_column} IS NOT NULL AND id > %s
+                    ORDER BY id
+                    LIMIT %s
+                """,
+                (EMBEDDING_MODEL, last_id, batch_size)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            vectors = pipeline.embed([row[1] for row in rows])
+            execute_values(
+                cursor,
+                f"""
+                    UPDATE {table} AS t SET embedding = v.embedding::vector, embedding_model = v.embedding_model
+                    FROM (VALUES %s) AS v(id, embedding, embedding_model)
+                    WHERE t.id = v.id
+                """,
+                [(row[0], vector_literal(vector), EMBEDDING_MODEL) for row, vector in zip(rows, vectors)],
+                page_size=batch_size
+            )
+
+            clients = {row[2] for row in rows} if client_column else set()
+            for client_id in clients:
+                notify_rule_change(cursor, client_id)
+            conn.commit()
+            for client_id in clients:
+                rule_cache.invalidate(client_id)
+
+            last_id = rows[-1][0]
+            done += len(rows)
+            progress(table, done, total, started)
+
+        cursor.close()
+        return {"table": table, "total": total, "reembedded": done}
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-embed rows not embedded with the current model.")
+    parser.add_argument("tables", nargs="*", choices=list(TARGETS), default=list(TARGETS))
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    for table in args.tables:
+        result = reembed_table(table, batch_size=args.batch_size)
+        logger.info(f"{result['table']}: re-embedded {result['reembedded']} of {result['total']} rows")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,341 @@
+import re
+import logging
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional
+
+from api.repository.final_response import ExtractedField, Rule, FieldValidation
+
+logger = logging.getLogger(__name__)
+
+TEXT_FIELDS = ("customer_name", "customer_account")
+NUMERIC_FIELDS = ("amount_paid", "balance_amount")
+
+# A field phrase ("amount paid") is more specific than a bare keyword ("account"), so the
+# phrases are tried first; the keywords only decide rules that use no phrase at all
+FIELD_PHRASES = [
+    ("customer_account", re.compile(r"\b(?:account|acct)\s*(?:number|num\b|no\b|id\b|#)|customer\s+account", re.IGNORECASE)),
+    ("customer_name", re.compile(r"\b(?:customer|debtor|account|full)\s+name\b", re.IGNORECASE)),
+    ("balance_amount", re.compile(r"\bbalance\s+(?:amount|due)\b|\boutstanding\s+balance\b", re.IGNORECASE)),
+    ("amount_paid", re.compile(r"\bamount\s+paid\b|\bpaid\s+amount\b|\bpayment\s+amount\b", re.IGNORECASE)),
+]
+FIELD_KEYWORDS = [
+    ("customer_account", re.compile(r"\b(?:account|acct)\b", re.IGNORECASE)),
+    ("customer_name", re.compile(r"\bname\b", re.IGNORECASE)),
+    ("balance_amount", re.compile(r"\bbalance\b", re.IGNORECASE)),
+    ("amount_paid", re.compile(r"\bpayment\b|\bpaid\b|\bamount\b", re.IGNORECASE)),
+]
+
+
+def detect_field(rule_content: str) -> Optional[str]:
+    """
+    Return the ExtractedField attribute a rule refers to.
+
+    None if the rule names no known field, or names more than one at the same level of
+    detail, so that the rule is left to the LLM rather than guessed.
+    """
+    for patterns in (FIELD_PHRASES, FIELD_KEYWORDS):
+        fields = {field for field, pattern in patterns if pattern.search(rule_content)}
+        if fields:
+            return fields.pop() if len(fields) == 1 else None
+    return None
+
+
+def compact_rules(rules: List[dict], fields: Optional[Iterable[str]] = None) -> Dict[str, List[dict]]:
+    """
+    Group rules by the field they refer to, for the agent prompt.
+
+    Each rule becomes {"id", "rule"}, plus "auto": False when it is not auto-applied; rules
+    with the same text (ignoring case and spacing) for the same field are sent once. When
+    `fields` is given, rules for other fields are left out; rules naming no field are kept
+    under "other".
+    """
+    wanted = set(fields) if fields is not None else None
+    grouped: Dict[str, List[dict]] = {}
+    seen = set()
+    for rule in rules:
+        field = detect_field(rule["rule_content"])
+        if field is not None and wanted is not None and field not in wanted:
+            continue
+        group = field or "other"
+        key = (group, " ".join(rule["rule_content"].lower().split()))
+        if key in seen:
+            continue
+        seen.add(key)
+        entry = {"id": rule["rule_id"], "rule": rule["rule_content"].strip()}
+        if not rule.get("is_auto_apply", True):
+            entry["auto"] = False
+        grouped.setdefault(group, []).append(entry)
+    return grouped
+
+
+class Transformation:
+    """A rule that rewrites the value of one text field."""
+    kind = "transformation"
+
+    def __init__(self, name: str, field: str, func: Callable[[str], str]):
+        self.name = name
+        self.field = field
+        self.func = func
+
+    def apply(self, values: list) -> list:
+        return [self.func(v) if v else v for v in values]
+
+
+class Validation:
+    """A rule that checks one or more fields of every record."""
+    kind = "validation"
+
+    def __init__(self, name: str, fields: tuple, check: Callable[..., bool], detail: Callable[..., str]):
+        self.name = name
+        self.fields = fields
+        self.check = check
+        self.detail = detail
+
+    def apply(self, columns: List[list]) -> List[bool]:
+        return [bool(self.check(*row)) for row in zip(*columns)]
+
+
+def _length(value) -> int:
+    return len(str(value)) if value is not None else 0
+
+
+def _number(text: str) -> float:
+    """A rule limit such as "1,000" or "10.5"."""
+    return float(text.replace(",", ""))
+
+
+# Each builder receives (match, field) and returns an operator, or None when the rule does not fit the field
+def _regex(match, field):
+    if field not in TEXT_FIELDS:
+        return None
+    try:
+        pattern = re.compile(match.group(1))
+    except re.error as e:
+        logger.warning(f"Rule pattern {match.group(1)!r} is not a valid regex ({e}); leaving the rule to the LLM")
+        return None
+    return Validation("regex", (field,), lambda v: bool(pattern.fullmatch(str(v or ""))),
+                      lambda v: f"'{v}' does not match {pattern.pattern}")
+
+
+def _negative_balance(match, field):
+    return Validation("negative_balance", ("balance_amount", "amount_paid"),
+                      lambda balance, paid: (balance or 0) - (paid or 0) >= 0,
+                      lambda balance, paid: f"balance {balance} - amount paid {paid} is negative")
+
+
+def _special_chars(match, field):
+    field = field if field in TEXT_FIELDS else "customer_account"
+    return Transformation("remove_special_chars", field, lambda v: re.sub(r"[^A-Za-z0-9]+", "", v))
+
+
+def _leading_zeros(match, field):
+    field = field if field in TEXT_FIELDS else "customer_account"
+    return Transformation("remove_leading_zeros", field, lambda v: v.lstrip("0") or v)
+
+
+def _remove_spaces(match, field):
+    if field not in TEXT_FIELDS:
+        return None
+    return Transformation("remove_spaces", field, lambda v: re.sub(r"\s+", "", v))
+
+
+def _strip(match, field):
+    if field not in TEXT_FIELDS:
+        return None
+    return Transformation("strip", field, lambda v: re.sub(r"\s+", " ", v).strip())
+
+
+def _upper(match, field):
+    if field not in TEXT_FIELDS:
+        return None
+    return Transformation("uppercase", field, str.upper)
+
+
+def _lower(match, field):
+    if field not in TEXT_FIELDS:
+        return None
+    return Transformation("lowercase", field, str.lower)
+
+
+def _required(match, field):
+    if field is None:
+        return None
+    return Validation("required", (field,), lambda v: v is not None and str(v).strip() != "",
+                      lambda v: "value is required")
+
+
+def _numeric_only(match, field):
+    if field not in TEXT_FIELDS:
+        return None
+    return Validation("numeric", (field,), lambda v: str(v or "").isdigit(),
+                      lambda v: f"'{v}' must contain digits only")
+
+
+def _exact_length(match, field):
+    if field not in TEXT_FIELDS:
+        return None
+    size = int(match.group(1))
+    return Validation("length", (field,), lambda v: _length(v) == size,
+                      lambda v: f"length {_length(v)} is not {size}")
+
+
+# A max/min number is only a length when it is given as one ("10 characters", "length 20"), and
+# only an amount when nothing but a currency follows it; "Maximum 3 payments per account" is a
+# count of something else and is left to the LLM
+LENGTH_BEFORE = re.compile(r"\blength\b", re.IGNORECASE)
+LENGTH_AFTER = re.compile(r"\s*(?:characters?|chars?|digits?|letters?)\b", re.IGNORECASE)
+AMOUNT_AFTER = re.compile(
+    r"\s*(?:$|[.,;:)]|(?:dollars?|usd|eur(?:os?)?|gbp|pounds?|inr|rupees?|rs)\b|(?:and|or)\b)", re.IGNORECASE
+)
+
+
+def _limit_fits(match, field) -> bool:
+    after = match.string[match.end():]
+    if field in TEXT_FIELDS:
+        return bool(LENGTH_BEFORE.search(match.group(0)) or LENGTH_AFTER.match(after))
+    return bool(AMOUNT_AFTER.match(after))
+
+
+def _max(match, field):
+    if field is None or not _limit_fits(match, field):
+        return None
+    limit = _number(match.group(1))
+    if field in TEXT_FIELDS:
+        return Validation("max_length", (field,), lambda v: _length(v) <= limit,
+                          lambda v: f"length {_length(v)} exceeds max_length {int(limit)}")
+    return Validation("max_amount", (field,), lambda v: (v or 0) <= limit,
+                      lambda v: f"{v} is greater than maximum {limit}")
+
+
+def _min(match, field):
+    if field is None or not _limit_fits(match, field):
+        return None
+    limit = _number(match.group(1))
+    if field in TEXT_FIELDS:
+        return Validation("min_length", (field,), lambda v: _length(v) >= limit,
+                          lambda v: f"length {_length(v)} is below min_length {int(limit)}")
+    return Validation("min_amount", (field,), lambda v: (v or 0) >= limit,
+                      lambda v: f"{v} is less than minimum {limit}")
+
+
+def _non_negative(match, field):
+    if field not in NUMERIC_FIELDS:
+        return None
+    return Validation("non_negative", (field,), lambda v: (v or 0) >= 0,
+                      lambda v: f"{v} is negative")
+
+
+RULE_PATTERNS = [
+    (re.compile(r"(?:match(?:es)?|pattern|regex)\s*[:=]?\s*[`'\"/](.+?)[`'\"/]", re.IGNORECASE), _regex),
+    (re.compile(r"negative\s+balance|(?:paid|payment).{0,40}(?:exceed|more\s+than|greater\s+than).{0,20}balance", re.IGNORECASE), _negative_balance),
+    (re.compile(r"special\s+char", re.IGNORECASE), _special_chars),
+    (re.compile(r"leading\s+zeros?", re.IGNORECASE), _leading_zeros),
+    (re.compile(r"remove\s+(?:all\s+)?(?:white\s*)?spaces?", re.IGNORECASE), _remove_spaces),
+    (re.compile(r"\bstrip\b|\btrim\b|(?:leading|trailing)\s+(?:and\s+trailing\s+)?(?:white\s*)?spaces?", re.IGNORECASE), _strip),
+    (re.compile(r"upper\s*case|capitali[sz]e", re.IGNORECASE), _upper),
+    (re.compile(r"lower\s*case", re.IGNORECASE), _lower),
+    (re.compile(r"exactly\s+(\d+)\s+(?:characters|chars|digits)", re.IGNORECASE), _exact_length),
+    (re.compile(r"(?:max(?:imum)?|at\s+most|not\s+exceed|no\s+more\s+than|up\s+to)\b\D{0,30}?(\d[\d,]*(?:\.\d+)?)", re.IGNORECASE), _max),
+    (re.compile(r"(?:min(?:imum)?|at\s+least|no\s+less\s+than)\b\D{0,30}?(\d[\d,]*(?:\.\d+)?)", re.IGNORECASE), _min),
+    (re.compile(r"\bnumeric\b|\bdigits\s+only\b|\bonly\s+(?:contain\s+)?digits\b|\bnumbers\s+only\b", re.IGNORECASE), _numeric_only),
+    (re.compile(r"(?:must|should|may)\s+not\s+be\s+negative|(?:cannot|can't)\s+be\s+negative|(?:must|should)\s+be\s+positive", re.IGNORECASE), _non_negative),
+    (re.compile(r"\brequired\b|\bmandatory\b|(?:must|should|may)\s+not\s+be\s+(?:empty|blank|missing)|(?:cannot|can't)\s+be\s+(?:empty|blank|missing)", re.IGNORECASE), _required),
+]
+
+
+@lru_cache(maxsize=1024)
+def compile_rule_content(rule_content: str) -> Optional[tuple]:
+    """
+    Parse a rule text into executable operators, one per clause.
+
+    "Account number is required and must not exceed 10 characters" compiles to both a
+    required and a max_length check.
+
+    Returns:
+        A tuple of Transformations and Validations, or None if the text matches no known rule
+        shape or any clause it matches does not fit the rule's field (the whole rule is then
+        left to the LLM rather than applied in part).
+    """
+    field = detect_field(rule_content)
+    operators = []
+    for pattern, builder in RULE_PATTERNS:
+        match = pattern.search(rule_content)
+        if match:
+            operator = builder(match, field)
+            if operator is None:
+                return None
+            operators.append(operator)
+    return tuple(operators) or None
+
+
+class CompiledRule:
+    def __init__(self, rule: dict, operator):
+        self.rule_id = rule["rule_id"]
+        self.description = rule["rule_content"]
+        self.operator = operator
+
+
+class CompiledRuleSet:
+    """
+    Client rules compiled into operators and applied column-wise to all extracted records.
+
+    Rules that could not be compiled, and rules the client did not mark as auto-applied
+    (`is_auto_apply` False, which the LLM handles through the matching tool), are kept in
+    `uncompiled` so they are still handed to the LLM.
+    """
+
+    def __init__(self, rules: List[dict]):
+        self.transformations: List[CompiledRule] = []
+        self.validations: List[CompiledRule] = []
+        self.uncompiled: List[dict] = []
+
+        for rule in rules:
+            operators = compile_rule_content(rule["rule_content"]) if rule.get("is_auto_apply", True) else None
+            if operators is None:
+                self.uncompiled.append(rule)
+                continue
+            for operator in operators:
+                if operator.kind == "transformation":
+                    self.transformations.append(CompiledRule(rule, operator))
+                else:
+                    self.validations.append(CompiledRule(rule, operator))
+
+        logger.info(
+            f"Compiled {len(self.transformations)} transformation and {len(self.validations)} validation rules, "
+            f"{len(self.uncompiled)} left for the LLM"
+        )
+
+    def apply(self, records: List[ExtractedField]) -> List[ExtractedField]:
+        """
+        Apply all transformations, then all validations, recording the audit trail on each record.
+
+        Records are updated in place and returned.
+        """
+        for compiled in self.transformations:
+            field = compiled.operator.field
+            before = [getattr(r, field) for r in records]
+            after = compiled.operator.apply(before)
+            for record, old, new in zip(records, before, after):
+                setattr(record, field, new)
+                record.transformtion_rules.append(
+                    Rule(rule_id=compiled.rule_id, description=compiled.description, status="APPLIED" if old else "SKIPPED")
+                )
+
+        for compiled in self.validations:
+            operator = compiled.operator
+            columns = [[getattr(r, f) for r in records] for f in operator.fields]
+            results = operator.apply(columns)
+            for record, passed, row in zip(records, results, zip(*columns)):
+                record.validation_rules.append(
+                    Rule(rule_id=compiled.rule_id, description=compiled.description, status="PASSED" if passed else "FAILED")
+                )
+                if not passed:
+                    record.field_validations.append(
+                        FieldValidation(message=f"{compiled.description}: {operator.detail(*row)}")
+                    )
+        return records
+
+
+def compile_rules(rules: List[dict]) -> CompiledRuleSet:
+    """Compile a list of client_rule dicts (rule_id, rule_content, is_auto_apply)."""
+    return CompiledRuleSet(rules)
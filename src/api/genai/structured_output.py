@@ -0,0 +1,34 @@
+import json
+from typing import Any, Type, TypeVar, Union
+
+from pydantic import BaseModel
+
+T = TypeVar("T", bound=BaseModel)
+
+
+def message_text(message) -> str:
+    """The text of a chat message, joining content parts and dropping a ```json fence."""
+    content = message.content
+    if isinstance(content, list):
+        content = "".join(part if isinstance(part, str) else part.get("text", "") for part in content)
+    text = content.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1].rsplit("```", 1)[0]
+    return text
+
+
+def agent_output(result: dict, schema: Type[T]) -> Union[T, dict]:
+    """
+    The validated answer of an agent built with `response_format=schema`.
+
+    Uses the agent's `structured_response`; a run that ended in plain text instead (a model
+    that skipped the response tool) is parsed as JSON and validated once against the schema.
+    An `{"error": ...}` object in that text is returned as a dict.
+    """
+    structured: Any = result.get("structured_response")
+    if structured is not None:
+        return structured if isinstance(structured, schema) else schema.model_validate(structured)
+    data = json.loads(message_text(result["messages"][-1]))
+    if isinstance(data, dict) and "error" in data:
+        return data
+    return schema.model_validate(data)
@@ -0,0 +1,291 @@
+import csv
+import re
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from api.repository.final_response import ExtractedField
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("customer_name", "customer_account", "amount_paid", "balance_amount")
+TEXT_FIELDS = ("customer_name", "customer_account")
+NUMERIC_FIELDS = ("amount_paid", "balance_amount")
+
+# Normalised header text -> ExtractedField attribute
+HEADER_SYNONYMS = {
+    "customer_name": {"name", "customer", "customer name", "debtor", "debtor name", "account name", "full name"},
+    "customer_account": {"account", "account number", "account no", "account num", "acct", "acct no", "acct number",
+                         "customer account", "account id"},
+    "amount_paid": {"amount paid", "paid", "payment", "payment amount", "paid amount", "amount"},
+    "balance_amount": {"balance", "balance amount", "outstanding", "outstanding balance", "balance due", "amount due"},
+}
+
+MIN_COLUMNS = 3
+_MARKDOWN_SEPARATOR = re.compile(r"^\s*\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?\s*$")
+# "1,200.50", "$75", "-3.5"; decimal commas ("10,50"), accounting negatives ("(100.00)") and
+# exponents are not accepted, so such cells send the email to the LLM instead of being misread
+_AMOUNT = re.compile(r"[$£€]?\s*-?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?")
+
+
+class ParsedTable:
+    """A delimited or fixed-width block found in an email body."""
+
+    def __init__(self, kind: str, rows: List[List[str]], header: Optional[List[str]] = None):
+        self.kind = kind
+        self.rows = rows
+        self.header = header
+
+    @property
+    def columns(self) -> int:
+        return len(self.rows[0]) if self.rows else len(self.header or [])
+
+    @property
+    def shape(self) -> str:
+        """One letter per column: "n" when every filled cell is a number, else "t"."""
+        letters = []
+        for column in range(self.columns):
+            cells = [row[column] for row in self.rows if column < len(row) and row[column]]
+            letters.append("n" if cells and all(_looks_numeric(cell) for cell in cells) else "t")
+        return "".join(letters)
+
+    @property
+    def signature(self) -> str:
+        """
+        Identifies tables with the same layout: the header text, or the delimiter, column count
+        and which columns are numeric, so a header-less table with its columns reordered is not
+        read with another table's layout.
+        """
+        if self.header:
+            return "h:" + "|".join(normalize_header(h) for h in self.header)
+        return f"n:{self.kind}:{self.columns}:{self.shape}"
+
+
+def normalize_header(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", text.lower()).strip()
+
+
+def parse_number(text: Optional[str]) -> Optional[float]:
+    """Parse an amount such as "1,200.50" or "$75"; None when the cell is not an unambiguous amount."""
+    if text is None:
+        return None
+    text = text.strip()
+    if not _AMOUNT.fullmatch(text):
+        return None
+    return float(re.sub(r"[^\d.\-]", "", text))
+
+
+def _looks_numeric(cell: str) -> bool:
+    return bool(re.fullmatch(r"\s*[$£€]?\s*-?[\d,]+(\.\d+)?\s*", cell))
+
+
+def _split_markdown(line: str) -> Optional[List[str]]:
+    if "|" not in line:
+        return None
+    return [c.strip() for c in line.strip().strip("|").split("|")]
+
+
+def _split_delimited(delimiter: str) -> Callable[[str], Optional[List[str]]]:
+    def split(line: str) -> Optional[List[str]]:
+        if delimiter not in line:
+            return None
+        return [c.strip() for c in next(csv.reader([line], delimiter=delimiter, skipinitialspace=True))]
+    return split
+
+
+def _split_fixed_width(line: str) -> Optional[List[str]]:
+    cells = re.split(r"\s{2,}", line.strip())
+    return cells if len(cells) > 1 else None
+
+
+# Checked in this order; an earlier kind wins a tie on row count
+SPLITTERS: List[Tuple[str, Callable[[str], Optional[List[str]]]]] = [
+    ("pipe", _split_markdown),
+    ("tab", _split_delimited("\t")),
+    ("comma", _split_delimited(",")),
+    ("semicolon", _split_delimited(";")),
+    ("fixed", _split_fixed_width),
+]
+
+
+def _runs(lines: List[str], split) -> List[List[Tuple[int, List[str]]]]:
+    """Consecutive lines that split into the same number (>= MIN_COLUMNS) of cells, as (line index, cells)."""
+    runs, current = [], []
+    for index, line in enumerate(lines):
+        if _MARKDOWN_SEPARATOR.match(line) and "-" in line:
+            continue
+        cells = split(line) if line.strip() else None
+        if cells is not None and len(cells) >= MIN_COLUMNS and (not current or len(cells) == len(current[0][1])):
+            current.append((index, cells))
+            continue
+        if current:
+            runs.append(current)
+        current = [(index, cells)] if cells is not None and len(cells) >= MIN_COLUMNS else []
+    if current:
+        runs.append(current)
+    return runs
+
+
+def _is_header(row: List[str]) -> bool:
+    return all(cell and not _looks_numeric(cell) for cell in row)
+
+
+def _find_table(lines: List[str]) -> Optional[Tuple[str, List[Tuple[int, List[str]]], bool]]:
+    """The winning (kind, run, has_header), or None when there is no table or it is ambiguous."""
+    best = None
+    for kind, split in SPLITTERS:
+        runs = [run for run in _runs(lines, split) if any(not _is_header(cells) for _, cells in run)]
+        if runs:
+            longest = max(runs, key=len)
+            if best is None or len(longest) > len(best[1]):
+                best = (kind, longest, len(runs))
+    if best is None:
+        return None
+
+    kind, run, count = best
+    if count > 1:
+        logger.info(f"Found {count} separate {kind} tables; leaving the email to the LLM")
+        return None
+    return kind, run, len(run) > 1 and _is_header(run[0][1])
+
+
+def detect_table(content: str) -> Optional[ParsedTable]:
+    """
+    Find the one record table in an email body.
+
+    Returns None when there is no table or when it is ambiguous (two separate tables of the
+    same kind), so the caller falls back to the LLM.
+    """
+    found = _find_table(content.splitlines())
+    if found is None:
+        return None
+    kind, run, has_header = found
+    rows = [cells for _, cells in run]
+    if has_header:
+        return ParsedTable(kind, rows[1:], header=rows[0])
+    return ParsedTable(kind, rows)
+
+
+def split_rows(content: str, max_rows: int) -> List[str]:
+    """
+    Split an email body into row-aligned chunks of at most `max_rows` table rows.
+
+    Each chunk is a complete email body: the text before the table (including its header)
+    and after it is repeated around every slice of rows. Bodies without a single clear table,
+    or with no more than `max_rows` rows, come back as one chunk.
+    """
+    lines = content.splitlines()
+    found = _find_table(lines) if max_rows > 0 else None
+    if found is None:
+        return [content]
+    _, run, has_header = found
+    rows = [index for index, _ in run[1:]] if has_header else [index for index, _ in run]
+    if len(rows) <= max_rows:
+        return [content]
+    before, after = lines[:rows[0]], lines[rows[-1] + 1:]
+    return [
+        "\n".join(before + [lines[i] for i in rows[start:start + max_rows]] + after)
+        for start in range(0, len(rows), max_rows)
+    ]
+
+
+def header_mapping(header: List[str]) -> Optional[Dict[str, int]]:
+    """Map header cells onto the four fields by name; None unless every field is found exactly once."""
+    mapping = {}
+    for index, cell in enumerate(header):
+        name = normalize_header(cell)
+        for field, synonyms in HEADER_SYNONYMS.items():
+            if name in synonyms:
+                if field in mapping:
+                    return None
+                mapping[field] = index
+    return mapping if len(mapping) == len(FIELDS) else None
+
+
+def header_fields(content: str) -> Optional[set]:
+    """
+    The fields the header of the email's table names.
+
+    None when there is no header or any header cell is not a known field name: an unknown
+    column ("Payment Received") may hold one of the fields, so nothing can be ruled out.
+    """
+    table = detect_table(content)
+    if table is None or not table.header:
+        return None
+    fields = set()
+    for cell in table.header:
+        name = normalize_header(cell)
+        matches = [field for field, synonyms in HEADER_SYNONYMS.items() if name in synonyms]
+        if not matches:
+            return None
+        fields.update(matches)
+    return fields
+
+
+def _same_text(cell: str, value) -> bool:
+    return " ".join(str(cell).split()).lower() == " ".join(str(value).split()).lower()
+
+
+def learn_mapping(table: ParsedTable, records: List[dict]) -> Optional[Dict[str, Optional[int]]]:
+    """
+    Work out which column holds each field from records the LLM extracted from the same table.
+
+    A field maps to a column only if that column, and no other, matches it on every row. A
+    numeric field the LLM always left at 0 and that matches no column is recorded as absent
+    (None). Returns None when any field cannot be placed unambiguously.
+    """
+    if not table.rows or len(records) != len(table.rows):
+        return None
+    mapping: Dict[str, Optional[int]] = {}
+    for field in FIELDS:
+        values = [record.get(field) for record in records]
+        if field in TEXT_FIELDS:
+            matches = [c for c in range(table.columns)
+                       if all(_same_text(row[c], v) for row, v in zip(table.rows, values))]
+        else:
+            numbers = [parse_number(str(v)) if v is not None else None for v in values]
+            matches = [c for c in range(table.columns)
+                       if all(cell is not None and v is not None and abs(cell - v) < 0.005
+                              for cell, v in ((parse_number(row[c]), v) for row, v in zip(table.rows, numbers)))]
+            if not matches and all(not v for v in values):
+                mapping[field] = None
+                continue
+        if len(matches) != 1:
+            return None
+        mapping[field] = matches[0]
+    if len({c for c in mapping.values() if c is not None}) != len([c for c in mapping.values() if c is not None]):
+        return None
+    return mapping
+
+
+def parse_records(table: ParsedTable, mapping: Dict[str, Optional[int]]) -> Optional[List[ExtractedField]]:
+    """
+    Build ExtractedField candidates with a column mapping.
+
+    None if any cell does not fit its field: an amount that is not a number, a blank name or
+    account, or a name that is a number.
+    """
+    records = []
+    for row in table.rows:
+        values = {}
+        for field in FIELDS:
+            column = mapping.get(field)
+            if column is None:
+                if field in TEXT_FIELDS:
+                    return None
+                values[field] = 0.0
+                continue
+            if column >= len(row):
+                return None
+            cell = row[column]
+            if field in TEXT_FIELDS:
+                # A name that is a number, or a blank name or account, means the columns are not where the layout says
+                if not cell or (field == "customer_name" and _looks_numeric(cell)):
+                    return None
+                values[field] = cell
+            else:
+                number = parse_number(cell)
+                if number is None:
+                    return None
+                values[field] = number
+        records.append(ExtractedField(**values))
+    return records
@@ -4,7 +4,13 @@ from pathlib import Path
 # Add src to path so 'api' package is importable
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from fastapi import FastAPI
+import asyncio
+import uuid
+from typing import List
+from fastapi import FastAPI, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from api.genai.extract import Extract
 from api.repository.routes import router as client_router
 from api.repository.client_rules import rules_router
@@ -14,7 +20,14 @@ from api.chat_bot.routes import router as chat_router
 from api.chat_bot.table_detail_routes import router as table_detail_router
 from api.repository.models import MailRequest
 from api.config import config
-from api.repository.final_response import FinalResponse
+from api.repository.rule_cache import start_rule_cache_listener, stop_rule_cache_listener
+from api.repository.database import get_async_db, pool_stats
+from api.genai.embeddings import embedding_cache_stats
+from api.chat_bot.table_catalog import table_catalog
+from api.repository.process_job_repository import ProcessJobRepository, QUEUED, RUNNING, DONE, FAILED
+from api.repository.process_log_repository import AsyncProcessLogRepository
+from api.process_worker import ProcessWorker, job_heartbeat
+from api.tracing import metrics
 import logging
 import json
 
@@ -49,20 +62,114 @@ app.include_router(table_detail_router)
 
 
 
-# Create Extract instance once (lightweight, no MCP session)
+# Create Extract instance once; MCP sessions, tools and agent are built at startup
 extractor = Extract()
+# Set job_workers to 0 to run the API as a submit-only replica next to standalone workers
+worker = ProcessWorker(extractor)
+
+@app.on_event("startup")
+async def startup():
+    start_rule_cache_listener()
+    try:
+        await extractor.startup()
+    except Exception as e:
+        # Keep the API up; the first /process call retries the startup
+        logger.warning(f"Extractor startup failed, will retry on first request: {e}")
+    try:
+        await asyncio.to_thread(table_catalog.load)
+    except Exception as e:
+        # The chat bot loads the catalog on its first question instead
+        logger.warning(f"Table catalog load failed, will retry on first search: {e}")
+    if config.job_workers > 0:
+        await worker.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await worker.stop()
+    stop_rule_cache_listener()
+    await extractor.shutdown()
+
+@app.get("/db/pool")
+def get_db_pool_stats():
+    """Shared connection pool checkout counts and wait times."""
+    return pool_stats()
+
+@app.get("/embeddings/cache")
+def get_embedding_cache_stats():
+    """Hit/miss counters of the shared query and document embedding cache."""
+    return embedding_cache_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Model and tool call counts, tokens and latencies of /process and /chat, in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.post("/process")
-async def read_item(request: MailRequest):
-    response = await extractor.process(f"subject={request.subject}\n contnet={request.content}")
-    #raw_response = response[0]["text"][7:-3] #remove quotes from the start and end for json string
-    #json_response: FinalResponse = json.loads(raw_response)
-
+async def read_item(request: MailRequest, wait: bool = False, db: AsyncSession = Depends(get_async_db)):
+    """
+    Queue an email for processing and return its correlation ID; poll `GET /process/{correlation_id}`.
+
+    With `wait=true` the email is processed within the request and the final response is returned.
+    An email resent within `dedup_window_seconds` is not processed again; the earlier job's status
+    and stored response are returned with `duplicate: true`.
+    """
+    repo = ProcessJobRepository(db)
+    job, created = await repo.enqueue(request, str(uuid.uuid4()), status=RUNNING if wait else QUEUED,
+                                      dedup_window_seconds=config.dedup_window_seconds)
+    if not created:
+        status = await job_status(job, db)
+        return JSONResponse(status_code=200 if job.status == DONE else 202,
+                            content=jsonable_encoder({**status, "duplicate": True}))
+    if not wait:
+        return JSONResponse(status_code=202, content={"correlation_id": str(job.correlation_id), "status": job.status})
+
+    try:
+        # The job is RUNNING from the start; keep it from being recovered as stale by a worker
+        async with job_heartbeat({job.id}):
+            response = await extractor.process(request, str(job.correlation_id))
+    except Exception as e:
+        await repo.set_status([job.id], FAILED, str(e))
+        raise
+    error = response.get("error") if isinstance(response, dict) else None
+    await repo.set_status([job.id], FAILED if error else DONE, str(error) if error else None)
     #Check account exists in database if the process type is Transaction
     #Handle error
     #Write a save method to save valid accounts.
     #Write process log for error record
     #Initiate a response email
 
-    return {"response": response }
-
+    return {"correlation_id": str(job.correlation_id), "response": response }
+
+@app.get("/process/{correlation_id}")
+async def get_process_status(correlation_id: uuid.UUID, db: AsyncSession = Depends(get_async_db)):
+    """Status of a queued email and, once done, the final response saved in process_log."""
+    job = await ProcessJobRepository(db).get_by_correlation_id(correlation_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Process {correlation_id} not found")
+    return await job_status(job, db)
+
+async def job_status(job, db: AsyncSession) -> dict:
+    log = await AsyncProcessLogRepository(db).get_by_correlation_id(job.correlation_id)
+    return {
+        "correlation_id": str(job.correlation_id),
+        "status": job.status,
+        "attempts": job.attempts,
+        "error": job.error_detail,
+        "created_date": job.created_date,
+        "updated_date": job.updated_date,
+        "response": log.details if log else None
+    }
+
+@app.post("/process/batch")
+async def process_batch(requests: List[MailRequest]):
+    """Process many emails concurrently; results are returned in completion order with their correlation IDs."""
+    return {"results": [result async for result in extractor.process_batch(requests)]}
+
+@app.post("/process/batch/stream")
+async def process_batch_stream(requests: List[MailRequest]):
+    """Process many emails concurrently, streaming one NDJSON line per email as it finishes."""
+    async def lines():
+        async for result in extractor.process_batch(requests):
+            yield json.dumps(result, default=str) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -7,28 +7,35 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # client_mcp_server.py
 # MCP server exposing find_client(name: str) -> {id, name, match_score}
-from api.config import config
 import logging
 # from dotenv import load_dotenv
 import uvicorn
 from api.repository.client_rule_embedding import ClientRuleEmbedding
-from api.repository.database import SessionLocal
-from api.repository.account import AccountRepository
-from api.repository.account_transaction import AccountTransactionRepository
+from api.repository.database import AsyncSessionLocal, get_raw_connection, pool_stats
+from api.genai.embeddings import embedding_cache_stats
+from api.repository.account import AsyncAccountRepository
+from api.repository.account_transaction import AsyncAccountTransactionRepository
 from api.repository.db_models import Account as AccountTable, AccountTransaction as AccountTransactionTable
 from api.repository.process_type import ProcessType
-from api.repository.process_log_repository import ProcessLogRepository
+from api.repository.process_log_repository import AsyncProcessLogRepository
+from api.repository.rule_cache import rule_cache, start_rule_cache_listener
+from api.repository.rule_index import rule_index_cache
 from api.repository.models import Account as AccountModel, AccountTransaction as AccountTransactionModel, ProcessLog
 from api.repository.final_response import FinalResponse, FieldValidation
+from api.genai.rule_engine import compact_rules
 from api.chat_bot.service import ChatBotService
+from api.tracing import metrics, observe_tool_call
 
-from typing import List
+from typing import List, Optional
+import asyncio
 import json
+import time
 
 # mcp provides a simple way to expose tools
 from mcp.server.fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
 
-import psycopg2
 from psycopg2.extras import RealDictCursor
 
 service = ChatBotService()
@@ -47,20 +54,35 @@ logger = logging.getLogger("client_mcp_server")
 # MCP_SERVER_API_KEY = os.getenv("MCP_SERVER_API_KEY","")  # set on server and client
 
 def get_db_conn():
-    return psycopg2.connect(
-        host=config.db_host,
-        port=config.db_port,
-        database=config.db_name,
-        user=config.db_user,
-        password=config.db_password,
-        cursor_factory=RealDictCursor
-    )
-
-mcp = FastMCP()
+    """Borrow a connection from the shared pool; close() returns it."""
+    return get_raw_connection()
+
+class TracedFastMCP(FastMCP):
+    """FastMCP that times every tool call into the shared metrics registry."""
+
+    async def call_tool(self, name: str, arguments: dict):
+        started = time.monotonic()
+        try:
+            result = await super().call_tool(name, arguments)
+        except Exception as e:
+            observe_tool_call("mcp", name, time.monotonic() - started, str(e))
+            raise
+        observe_tool_call("mcp", name, time.monotonic() - started)
+        return result
+
+mcp = TracedFastMCP()
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def get_metrics(request: Request) -> Response:
+    """Tool call counts and latencies served by this MCP server, in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 app = mcp.streamable_http_app()
 
-@mcp.tool("find_client", description="Find client by name. Args: {name: str}")
-def find_client(name: str) -> dict:
+# Keep this replica's rule cache coherent with rule writes made elsewhere
+start_rule_cache_listener()
+
+def _find_client(name: str) -> dict:
     """
     Find a client by name.
     Returns: {"id": int, "name": str, "score": float} or raise if not found.
@@ -68,16 +90,16 @@ def find_client(name: str) -> dict:
     print(f"**************************************Finding client with name: {name}*************") 
     # Basic normalization + simple LIKE search; replace with your fuzzy logic if desired
     q = name.strip()
+    conn = None
     try:
         conn = get_db_conn()
-        cur = conn.cursor()
+        cur = conn.cursor(cursor_factory=RealDictCursor)
         cur.execute(
             "SELECT id, name FROM client WHERE LOWER(name) LIKE LOWER(%s) ORDER BY id LIMIT 1;",
             (f"%{q}%",),
         )
         rows = cur.fetchall()
         cur.close()
-        conn.close()
 
         if not rows:
             return {"found": False, "message": f"No client matching '{name}'"}
@@ -89,12 +111,25 @@ def find_client(name: str) -> dict:
     except Exception as e:
         logger.exception("DB lookup failed")
         raise e  # MCP will return tool error to caller
-    
-@mcp.tool("find_all_client_rule_by_client_id_and_process_type", description="Find client rules by client Id. Args: {client_id: int, process_type: int}")
-def find_all_client_rule_by_client_id(client_id: int, process_type: int) -> dict:
+    finally:
+        if conn:
+            conn.close()
+
+@mcp.tool("find_client", description="Find client by name. Args: {name: str}")
+async def find_client(name: str) -> dict:
+    """
+    Find a client by name.
+    Returns: {"id": int, "name": str, "score": float} or raise if not found.
+    """
+    # psycopg2 blocks, so keep it off the event loop
+    return await asyncio.to_thread(_find_client, name)
+
+def _find_all_client_rule_by_client_id(client_id: int, process_type: int, compact: bool = False,
+                                       fields: Optional[List[str]] = None) -> dict:
     """
     Find a client rule by client_id.
-    Returns: [{"id": int, "rule_content": str, "score": float}] or empty dict if not found.
+    Returns: [{"id": int, "rule_content": str, "score": float}] or empty dict if not found;
+    with compact, {"success", "client_id", "process_type", "rules": {field: [{"id", "rule"}]}}.
     """
     print(f"**************************************Finding client rule by client Id: {client_id}, process_type: {process_type}*************") 
     # Basic normalization + simple LIKE search; replace with your fuzzy logic if desired
@@ -115,177 +150,205 @@ def find_all_client_rule_by_client_id(client_id: int, process_type: int) -> dict
         #     "results_count": len(filtered_results), # Update the count
         #     "results": filtered_results
         # }
+        if compact and data.get("success"):
+            return {
+                "success": True,
+                "client_id": client_id,
+                "process_type": process_type,
+                "rules": compact_rules(data["results"], fields)
+            }
         return data
 
     except Exception as e:
         logger.exception("DB client rule lookup failed")
         raise e  # MCP will return tool error to caller
 
-@mcp.tool("get_all_accounts", description="Get all accounts. Args: {skip: int, limit: int}")
-def get_all_accounts(skip: int = 0, limit: int = 100) -> List[dict]:
+@mcp.tool("find_all_client_rule_by_client_id_and_process_type", description="Find client rules by client Id. Pass compact=true for rules grouped by field, optionally only for the given fields. Args: {client_id: int, process_type: int, compact: bool, fields: List[str]}")
+async def find_all_client_rule_by_client_id(client_id: int, process_type: int, compact: bool = False,
+                                            fields: Optional[List[str]] = None) -> dict:
+    """
+    Find a client rule by client_id.
+    Returns: [{"id": int, "rule_content": str, "score": float}] or empty dict if not found;
+    with compact, the rules grouped by field (see compact_rules).
+    """
+    return await asyncio.to_thread(_find_all_client_rule_by_client_id, client_id, process_type, compact, fields)
+
+@mcp.tool("get_rule_cache_stats", description="Get hit/miss counters of the client rule cache. Args: {}")
+def get_rule_cache_stats() -> dict:
+    """
+    Get client rule cache statistics.
+    Returns: {"size": int, "hits": int, "misses": int, ...}
+    """
+    return {**rule_cache.stats(), "vector_index": rule_index_cache.stats()}
+
+@mcp.tool("get_db_pool_stats", description="Get connection pool checkout counts and wait times. Args: {}")
+def get_db_pool_stats() -> dict:
+    """
+    Get shared connection pool statistics.
+    Returns: {"checkouts": int, "wait_avg_ms": float, "checked_out": int, ...}
+    """
+    return pool_stats()
+
+@mcp.tool("get_embedding_cache_stats", description="Get hit/miss counters of the embedding cache. Args: {}")
+def get_embedding_cache_stats() -> dict:
+    """
+    Get embedding cache statistics.
+    Returns: {"size": int, "hits": int, "store_hits": int, "misses": int, "remote_calls": int, ...}
     """
-    Get all accounts.
+    return embedding_cache_stats()
+
+@mcp.tool("get_all_accounts", description="Get accounts ordered by id. Pass the last id returned as after_id for the next page. Args: {limit: int, after_id: int}")
+async def get_all_accounts(skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[dict]:
+    """
+    Get accounts ordered by id.
     Returns: List of accounts.
     """
     print(f"**************************************Getting all accounts*************")
+    db = AsyncSessionLocal()
     try:
-        db = SessionLocal()
-        repo = AccountRepository(db)
-        accounts = repo.list(skip, limit)
+        repo = AsyncAccountRepository(db)
+        accounts = await repo.list(skip, limit, after_id)
         # Convert to dict for JSON serialization
         return [AccountModel.from_orm(a).dict() for a in accounts]
     except Exception as e:
         logger.exception("Failed to get accounts")
         raise e
     finally:
-        db.close()
+        await db.close()
 
 
 @mcp.tool("accounts_urc_check", description="Check Unrecognised accounts. Args: {final_response: FinalResponse}")
-def accounts_urc_check(final_response: FinalResponse) -> FinalResponse:
+async def accounts_urc_check(final_response: FinalResponse) -> FinalResponse:
     """
     Check Unrecognised accounts.
     Returns: FinalResponse.
     """
+    db = AsyncSessionLocal()
     try:
-        db = SessionLocal()
         print("Get accounts from database")
-        repo = AccountRepository(db)
-        
-        account_numbers =  [
-            field.customer_account
-            for field in final_response.extracted_fields # Use .get with a default [] for safety
-        ]
-        accounts = repo.get_by_account_numbers(account_numbers)
-        existing_accounts_set = {
-            account.account_number 
-            for account in accounts
-        }
-        all_accounts_set = set(account_numbers)
+        repo = AsyncAccountRepository(db)
+
+        records = final_response.extracted_fields
+        exists = await repo.account_exists_flags(final_response.client_id, [r.customer_account for r in records])
 
         if final_response.process_type == ProcessType.Transaction.value:
-            missing_accounts_set = all_accounts_set - existing_accounts_set
-            missing_accounts_list = list(missing_accounts_set)
-            print("Update validation message for missing accounts")
-            for record in final_response.extracted_fields:
-                if record.customer_account in missing_accounts_list:
-                    validation = FieldValidation(message="Account does not exists")
-                    record.field_validations.append(validation)
-                    print("Account does not exists")
+            # Payments must target an account the client already has
+            flag_when_exists, message = False, "Account does not exists"
         elif final_response.process_type == ProcessType.Placement.value:
-            duplicate_accounts_set = existing_accounts_set - all_accounts_set
-            duplicate_accounts_list = list(duplicate_accounts_set)
-            print("Update validation message for duplicate accounts")
-            for record in final_response.extracted_fields:
-                if record.customer_account in duplicate_accounts_list:
-                    validation = FieldValidation(message="Account already exists")
-                    record.field_validations.append(validation)
-                    print("Account already exists")
+            # Placements must not re-create an account the client already has
+            flag_when_exists, message = True, "Account already exists"
+        else:
+            return final_response
+
+        print(f"Update validation message for accounts where exists={flag_when_exists}")
+        for record, account_exists in zip(records, exists):
+            if account_exists == flag_when_exists:
+                record.field_validations.append(FieldValidation(message=message))
         return final_response
     except Exception as e:
         logger.exception("Failed to get accounts")
         raise e
     finally:
-        db.close()
+        await db.close()
 
-@mcp.tool("save_accounts_and_transactions", description="Save accounts and transactions. Args: {final_response: FinalResponse, correlation_id: str}")
-def save_accounts_and_transactions(final_response: FinalResponse, correlation_id: str) -> FinalResponse:
+@mcp.tool("save_accounts_and_transactions", description="Save the valid accounts and transactions. Args: {final_response: FinalResponse, correlation_id: str}")
+async def save_accounts_and_transactions(final_response: FinalResponse, correlation_id: str) -> dict:
     """
-    Save accounts and transaction to database
-    Returns: FinalResponse.
+    Save the records without field validation errors to the database.
+    Returns: {"rows": int, "accounts_created": int, ...} outcome counts.
     """
+    db = AsyncSessionLocal()
     try:
-        db = SessionLocal()
-        repo = AccountRepository(db)
-        repo.process_accounts(final_response.model_dump_json(), correlation_id)
-        print("Account and transaction updated to database")
-        return final_response
+        repo = AsyncAccountRepository(db)
+        outcome = await repo.process_accounts(final_response, correlation_id)
+        print(f"Account and transaction updated to database: {outcome}")
+        return outcome
     except Exception as e:
-        logger.exception("Failed to get accounts")
+        logger.exception("Failed to save accounts and transactions")
         raise e
     finally:
-        db.close()
+        await db.close()
 
 @mcp.tool("bulk_create_accounts", description="Bulk create accounts. Args: {accounts: List[dict]}")
-def bulk_create_accounts(accounts: List[dict]) -> List[dict]:
+async def bulk_create_accounts(accounts: List[dict]) -> List[dict]:
     """
     Bulk create accounts.
     Returns: List of created accounts.
     """
     print(f"**************************************Bulk creating accounts*************")
+    db = AsyncSessionLocal()
     try:
-        db = SessionLocal()
-        repo = AccountRepository(db)
+        repo = AsyncAccountRepository(db)
         # Convert dicts to SQLAlchemy models
         # Note: Pydantic validation happens here implicitly if we use AccountModel first
         account_models = [AccountModel(**a) for a in accounts]
         db_accounts = [AccountTable(**a.dict(exclude={"id"})) for a in account_models]
         
-        created_accounts = repo.bulk_create(db_accounts)
+        created_accounts = await repo.bulk_create(db_accounts)
         return [AccountModel.from_orm(a).dict() for a in created_accounts]
     except Exception as e:
         logger.exception("Failed to bulk create accounts")
         raise e
     finally:
-        db.close()
+        await db.close()
 
-@mcp.tool("get_all_transactions", description="Get all transactions. Args: {skip: int, limit: int}")
-def get_all_transactions(skip: int = 0, limit: int = 100) -> List[dict]:
+@mcp.tool("get_all_transactions", description="Get transactions ordered by id. Pass the last id returned as after_id for the next page. Args: {limit: int, after_id: int}")
+async def get_all_transactions(skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[dict]:
     """
-    Get all transactions.
+    Get transactions ordered by id.
     Returns: List of transactions.
     """
     print(f"**************************************Getting all transactions*************")
+    db = AsyncSessionLocal()
     try:
-        db = SessionLocal()
-        repo = AccountTransactionRepository(db)
-        transactions = repo.list(skip, limit)
+        repo = AsyncAccountTransactionRepository(db)
+        transactions = await repo.list(skip, limit, after_id)
         return [AccountTransactionModel.from_orm(t).dict() for t in transactions]
     except Exception as e:
         logger.exception("Failed to get transactions")
         raise e
     finally:
-        db.close()
+        await db.close()
 
 @mcp.tool("bulk_create_transactions", description="Bulk create transactions. Args: {transactions: List[dict]}")
-def bulk_create_transactions(transactions: List[dict]) -> List[dict]:
+async def bulk_create_transactions(transactions: List[dict]) -> List[dict]:
     """
     Bulk create transactions.
     Returns: List of created transactions.
     """
     print(f"**************************************Bulk creating transactions*************")
+    db = AsyncSessionLocal()
     try:
-        db = SessionLocal()
-        repo = AccountTransactionRepository(db)
+        repo = AsyncAccountTransactionRepository(db)
         transaction_models = [AccountTransactionModel(**t) for t in transactions]
         db_transactions = [AccountTransactionTable(**t.dict(exclude={"id"})) for t in transaction_models]
         
-        created_transactions = repo.bulk_create(db_transactions)
+        created_transactions = await repo.bulk_create(db_transactions)
         return [AccountTransactionModel.from_orm(t).dict() for t in created_transactions]
     except Exception as e:
         logger.exception("Failed to bulk create transactions")
         raise e
     finally:
-        db.close()
+        await db.close()
 
 @mcp.tool("save_process_log", description="Save process log. Args: {process_log: ProcessLog}")
-def save_process_log(process_log: dict) -> dict:
+async def save_process_log(process_log: dict) -> dict:
     """
     Save process log to database.
     """
     print(f"**************************************Saving process log*************")
+    db = AsyncSessionLocal()
     try:
-        db = SessionLocal()
-        repo = ProcessLogRepository(db)
+        repo = AsyncProcessLogRepository(db)
         # Validate input with Pydantic model
         log_model = ProcessLog(**process_log)
-        saved_log = repo.save(log_model)
+        saved_log = await repo.save(log_model)
         return {"id": saved_log.id, "status": "saved"}
     except Exception as e:
         logger.exception("Failed to save process log")
         raise e
     finally:
-        db.close()
+        await db.close()
 
 
 @mcp.tool("query_database", description="Execute a natural language query against the database. Args: {query: str}")
@@ -0,0 +1,166 @@
+import sys
+from pathlib import Path
+
+# Add src to path so 'api' package is importable
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# process_worker.py
+# Claims queued emails from the process_job table and runs them through Extract.process.
+# Runs inside the API (job_workers > 0) or standalone: python src/api/process_worker.py
+import asyncio
+import logging
+import signal
+from contextlib import asynccontextmanager
+from typing import Optional, Set
+
+from api.config import config
+from api.genai.extract import Extract
+from api.repository.database import AsyncSessionLocal
+from api.repository.models import MailRequest
+from api.repository.process_job_repository import ProcessJobRepository, QUEUED, DONE, FAILED
+from api.repository.rule_cache import start_rule_cache_listener, stop_rule_cache_listener
+
+logger = logging.getLogger(__name__)
+
+
+async def heartbeat(job_ids: Set[int], interval: Optional[float] = None):
+    """Keep refreshing the jobs in `job_ids` (read on every beat) until cancelled."""
+    interval = interval if interval is not None else config.job_heartbeat_interval
+    while True:
+        await asyncio.sleep(interval)
+        if not job_ids:
+            continue
+        try:
+            async with AsyncSessionLocal() as db:
+                await ProcessJobRepository(db).heartbeat(list(job_ids))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Job heartbeat failed, retrying: {e}")
+
+
+@asynccontextmanager
+async def job_heartbeat(job_ids: Set[int], interval: Optional[float] = None):
+    """Run `heartbeat` for the duration of the block, e.g. while a request processes a job itself."""
+    task = asyncio.create_task(heartbeat(job_ids, interval), name="process-job-heartbeat")
+    try:
+        yield
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+class ProcessWorker:
+    """
+    Pulls jobs from the process_job queue and processes them with a fixed number of workers.
+
+    A fetcher keeps up to `prefetch` claimed jobs buffered locally so workers never wait
+    on the database between emails. Claimed jobs, buffered or running, are kept alive by a
+    heartbeat so long extractions are not mistaken for stale ones. Jobs still claimed on
+    shutdown go back to the queue.
+    """
+
+    def __init__(self, extractor: Extract, workers: Optional[int] = None, prefetch: Optional[int] = None,
+                 poll_interval: Optional[float] = None):
+        self.extractor = extractor
+        self.workers = workers if workers is not None else config.job_workers
+        self.prefetch = prefetch if prefetch is not None else config.job_prefetch
+        self.poll_interval = poll_interval if poll_interval is not None else config.job_poll_interval
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._claimed: Set[int] = set()
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=max(self.prefetch, 1))
+        self._tasks = [asyncio.create_task(self._fetch(), name="process-job-fetcher"),
+                       asyncio.create_task(heartbeat(self._claimed), name="process-job-heartbeat")]
+        self._tasks += [asyncio.create_task(self._work(), name=f"process-job-worker-{i}") for i in range(self.workers)]
+        logger.info(f"Process worker started with {self.workers} workers, prefetch {self.prefetch}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._claimed:
+            # Interrupted and buffered jobs are picked up again by the next worker
+            async with AsyncSessionLocal() as db:
+                await ProcessJobRepository(db).set_status(list(self._claimed), QUEUED)
+            logger.info(f"Released {len(self._claimed)} claimed jobs back to the queue")
+            self._claimed.clear()
+
+    async def _fetch(self):
+        while True:
+            try:
+                jobs = []
+                free = self._queue.maxsize - self._queue.qsize()
+                if free > 0:
+                    async with AsyncSessionLocal() as db:
+                        repo = ProcessJobRepository(db)
+                        recovered = await repo.requeue_stale(config.job_visibility_timeout, config.job_max_attempts)
+                        if recovered:
+                            logger.warning(f"Recovered {recovered} stale jobs")
+                        jobs = await repo.claim(free)
+                for job in jobs:
+                    self._claimed.add(job["id"])
+                    await self._queue.put(job)
+                if not jobs:
+                    await asyncio.sleep(self.poll_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Claiming jobs failed, retrying: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: dict):
+        correlation_id = str(job["correlation_id"])
+        request = MailRequest(from_address=job["from_address"], subject=job["subject"], content=job["content"])
+        try:
+            response = await self.extractor.process(request, correlation_id)
+            status, error_detail = DONE, None
+            if isinstance(response, dict) and "error" in response:
+                status, error_detail = FAILED, str(response["error"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"Job {correlation_id} failed")
+            status, error_detail = FAILED, str(e)
+
+        async with AsyncSessionLocal() as db:
+            await ProcessJobRepository(db).set_status([job["id"]], status, error_detail)
+        self._claimed.discard(job["id"])
+
+
+async def main():
+    start_rule_cache_listener()
+    extractor = Extract()
+    await extractor.startup()
+    worker = ProcessWorker(extractor)
+    await worker.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        await worker.stop()
+        await extractor.shutdown()
+        stop_rule_cache_listener()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
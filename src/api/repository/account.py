@@ -1,19 +1,34 @@
 import psycopg2
+from sqlalchemy import select, text
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from api.repository.db_models import Account
+from api.repository.final_response import FinalResponse
+from api.repository.bulk import bulk_insert, async_bulk_insert
 from uuid import UUID
-from api.config import config
+from decimal import Decimal
+from api.repository.database import get_raw_connection
+
+def ingest_payload(final_response: FinalResponse) -> dict:
+    """
+    Column arrays of the records that passed every validation; the rule audit trail is not sent.
+    """
+    valid = [r for r in final_response.extracted_fields if not r.field_validations]
+    return {
+        "client_id": final_response.client_id,
+        "process_type": final_response.process_type,
+        "account_numbers": [r.customer_account for r in valid],
+        "account_names": [r.customer_name for r in valid],
+        "balance_amounts": [Decimal(str(r.balance_amount)) for r in valid],
+        "amounts_paid": [Decimal(str(r.amount_paid)) for r in valid]
+    }
+
 
 class AccountRepository:
     def __init__(self, db: Session):
         self.db = db
-        self.db_host = config.db_host
-        self.db_port = config.db_port
-        self.db_name = config.db_name
-        self.db_user = config.db_user
-        self.db_password = config.db_password
 
     def create(self, account: Account) -> Account:
         """Create a new account."""
@@ -59,9 +74,19 @@ class AccountRepository:
             self.db.rollback()
             raise e
 
-    def list(self, skip: int = 0, limit: int = 100) -> List[Account]:
-        """List accounts."""
-        return self.db.query(Account).offset(skip).limit(limit).all()
+    def list(self, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[Account]:
+        """List accounts ordered by id; pass the last id seen as `after_id` to get the next page."""
+        query = self.db.query(Account)
+        if after_id is not None:
+            query = query.filter(Account.id > after_id)
+        return query.order_by(Account.id).offset(skip).limit(limit).all()
+
+    def stream_all(self, batch_size: int = 1000) -> Iterator[Account]:
+        """Yield every account ordered by id through a server-side cursor, `batch_size` rows at a time."""
+        result = self.db.execute(
+            select(Account).order_by(Account.id).execution_options(stream_results=True, yield_per=batch_size)
+        )
+        yield from result.scalars()
 
     def get_by_account_number(self, account_number: str) -> Optional[Account]:
         """Get an account by account number."""
@@ -72,44 +97,166 @@ class AccountRepository:
         return self.db.query(Account).filter(Account.account_number.in_(account_numbers)).all()
 
     def bulk_create(self, accounts: List[Account]) -> List[Account]:
-        """Bulk create accounts."""
+        """Bulk create accounts in chunks of multi-row INSERT ... RETURNING; returns them with IDs, in input order."""
         try:
-            self.db.add_all(accounts)
+            created = bulk_insert(self.db, Account, accounts)
             self.db.commit()
-            for account in accounts:
-                self.db.refresh(account)
-            return accounts
+            return created
         except SQLAlchemyError as e:
             self.db.rollback()
             raise e
 
-    def process_accounts(self, final_response: str, correlation_id: str) -> bool:
-        """Insert accounts and transaction from final_response json"""
+    def process_accounts(self, final_response: FinalResponse, correlation_id: str) -> dict:
+        """
+        Insert accounts or apply payments for the valid records of a final response.
+
+        Returns:
+            The outcome counts reported by the database function (rows, accounts_created, ...).
+        """
         conn = None
         try:
             conn = self._get_connection()
             cursor = conn.cursor()
-            sql = "call public.process_accounts_and_transaction_from_json(%s::json, %s::uuid)"
-            cursor.execute(sql, (final_response, correlation_id))
+            sql = (
+                "SELECT public.process_accounts_and_transaction("
+                "%(client_id)s, %(process_type)s, %(account_numbers)s::text[], %(account_names)s::text[], "
+                "%(balance_amounts)s::numeric[], %(amounts_paid)s::numeric[], %(correlation_id)s::uuid)"
+            )
+            cursor.execute(sql, {**ingest_payload(final_response), "correlation_id": correlation_id})
+            outcome = cursor.fetchone()[0]
             conn.commit()
-            return True
+            return outcome
         except psycopg2.Error as e:
             # Rollback in case of any error
-            print("Error while executing sp")
             if conn:
                 conn.rollback()
+            raise e
         finally:
             # Close the connection
             if conn:
                 conn.close()
 
     def _get_connection(self):
-        """Create and return a database connection."""
-        conn = psycopg2.connect(
-            host=self.db_host,
-            port=self.db_port,
-            database=self.db_name,
-            user=self.db_user,
-            password=self.db_password
+        """Borrow a database connection from the shared pool."""
+        return get_raw_connection()
+
+
+class AsyncAccountRepository:
+    """Asyncio counterpart of AccountRepository for use on the event loop."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create(self, account: Account) -> Account:
+        """Create a new account."""
+        try:
+            self.db.add(account)
+            await self.db.commit()
+            await self.db.refresh(account)
+            return account
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise e
+
+    async def get_by_id(self, account_id: int) -> Optional[Account]:
+        """Get an account by ID."""
+        return await self.db.get(Account, account_id)
+
+    async def update(self, account_id: int, **kwargs) -> Optional[Account]:
+        """Update an account."""
+        try:
+            account = await self.get_by_id(account_id)
+            if account:
+                for key, value in kwargs.items():
+                    setattr(account, key, value)
+                await self.db.commit()
+                await self.db.refresh(account)
+            return account
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise e
+
+    async def delete(self, account_id: int) -> bool:
+        """Delete an account."""
+        try:
+            account = await self.get_by_id(account_id)
+            if account:
+                await self.db.delete(account)
+                await self.db.commit()
+                return True
+            return False
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise e
+
+    async def list(self, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[Account]:
+        """List accounts ordered by id; pass the last id seen as `after_id` to get the next page."""
+        stmt = select(Account)
+        if after_id is not None:
+            stmt = stmt.filter(Account.id > after_id)
+        result = await self.db.execute(stmt.order_by(Account.id).offset(skip).limit(limit))
+        return list(result.scalars().all())
+
+    async def get_by_account_number(self, account_number: str) -> Optional[Account]:
+        """Get an account by account number."""
+        result = await self.db.execute(select(Account).filter(Account.account_number == account_number))
+        return result.scalars().first()
+
+    async def get_by_account_numbers(self, account_numbers: List[str]) -> List[Account]:
+        """Get accounts by a list of account numbers."""
+        result = await self.db.execute(select(Account).filter(Account.account_number.in_(account_numbers)))
+        return list(result.scalars().all())
+
+    async def account_exists_flags(self, client_id: int, account_numbers: List[str]) -> List[bool]:
+        """
+        For each submitted account number, whether the client already has that account.
+
+        The check runs as one set-based query and returns one flag per input, in input order.
+        """
+        if not account_numbers:
+            return []
+        result = await self.db.execute(
+            text("""
+                SELECT EXISTS (
+                    SELECT 1 FROM account a
+                    WHERE a.client_id = :client_id AND a.account_number = s.account_number
+                ) AS account_exists
+                FROM unnest(CAST(:account_numbers AS text[])) WITH ORDINALITY AS s(account_number, ord)
+                ORDER BY s.ord
+            """),
+            {"client_id": client_id, "account_numbers": list(account_numbers)}
         )
-        return conn
\ No newline at end of file
+        return [row.account_exists for row in result]
+
+    async def bulk_create(self, accounts: List[Account]) -> List[Account]:
+        """Bulk create accounts in chunks of multi-row INSERT ... RETURNING; returns them with IDs, in input order."""
+        try:
+            created = await async_bulk_insert(self.db, Account, accounts)
+            await self.db.commit()
+            return created
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise e
+
+    async def process_accounts(self, final_response: FinalResponse, correlation_id: str) -> dict:
+        """
+        Insert accounts or apply payments for the valid records of a final response.
+
+        Returns:
+            The outcome counts reported by the database function (rows, accounts_created, ...).
+        """
+        try:
+            result = await self.db.execute(
+                text(
+                    "SELECT public.process_accounts_and_transaction("
+                    ":client_id, :process_type, CAST(:account_numbers AS text[]), CAST(:account_names AS text[]), "
+                    "CAST(:balance_amounts AS numeric[]), CAST(:amounts_paid AS numeric[]), CAST(:correlation_id AS uuid))"
+                ),
+                {**ingest_payload(final_response), "correlation_id": correlation_id}
+            )
+            outcome = result.scalar_one()
+            await self.db.commit()
+            return outcome
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise e
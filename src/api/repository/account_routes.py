@@ -1,10 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
 from typing import List, Optional
-from api.repository.models import Account as AccountModel
+from api.config import config
+from api.repository.models import Account as AccountModel, AccountPage
 from api.repository.db_models import Account as AccountTable
-from api.repository.database import get_db
-from api.repository.account import AccountRepository
+from api.repository.database import SessionLocal, get_db, get_async_db
+from api.repository.account import AccountRepository, AsyncAccountRepository
+from api.repository.bulk_upload import iter_csv, iter_ndjson, validation_message
+
+CSV_CONTENT_TYPES = ("text/csv", "application/csv")
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
 
 # Create a router for account endpoints
 router = APIRouter(prefix="/accounts", tags=["accounts"])
@@ -18,6 +27,34 @@ def create_account(account: AccountModel, db: Session = Depends(get_db)):
     db_account = AccountTable(**account.dict(exclude={"id"}))
     return repo.create(db_account)
 
+@router.get("", response_model=AccountPage)
+def list_accounts(after_id: Optional[int] = None, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    """List accounts ordered by id, one keyset page at a time."""
+    repo = AccountRepository(db)
+    accounts = repo.list(limit=limit, after_id=after_id)
+    next_cursor = accounts[-1].id if len(accounts) == limit else None
+    return {"items": accounts, "next_cursor": next_cursor}
+
+@router.get("/export")
+def export_accounts(batch_size: int = 1000):
+    """Stream every account as NDJSON through a server-side cursor, without loading the table into memory."""
+    def lines():
+        # The session must outlive the route, so the generator owns it
+        db = SessionLocal()
+        try:
+            batch = []
+            for account in AccountRepository(db).stream_all(batch_size):
+                batch.append(AccountModel.model_validate(account).model_dump_json())
+                if len(batch) >= batch_size:
+                    yield "\n".join(batch) + "\n"
+                    batch = []
+            if batch:
+                yield "\n".join(batch) + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @router.get("/{account_id}", response_model=AccountModel)
 def get_account(account_id: int, db: Session = Depends(get_db)):
     """Get an account by ID."""
@@ -50,6 +87,65 @@ def bulk_create_accounts(accounts: List[AccountModel], db: Session = Depends(get
     db_accounts = [AccountTable(**account.dict(exclude={"id"})) for account in accounts]
     return repo.bulk_create(db_accounts)
 
+@router.post("/bulk/stream")
+async def bulk_upload_accounts(request: Request, max_errors: int = 1000, db: AsyncSession = Depends(get_async_db)):
+    """
+    Stream a placement file into the account table; the body is NDJSON or CSV (with a header row), per Content-Type.
+
+    Rows are validated one at a time and written in chunks of `bulk_chunk_size`, so memory stays flat
+    whatever the file size; a chunk the database rejects is retried row by row. Returns the inserted and failed counts and up to `max_errors` per-row errors.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in CSV_CONTENT_TYPES:
+        rows = iter_csv(request.stream())
+    elif content_type in NDJSON_CONTENT_TYPES:
+        rows = iter_ndjson(request.stream())
+    else:
+        raise HTTPException(status_code=415, detail="Send the file as text/csv or application/x-ndjson")
+
+    repo = AsyncAccountRepository(db)
+    inserted, failed, errors = 0, 0, []
+    chunk = []
+
+    def record_error(row_number: int, message: str):
+        nonlocal failed
+        failed += 1
+        if len(errors) < max_errors:
+            errors.append({"row": row_number, "error": message})
+
+    async def flush():
+        nonlocal inserted
+        try:
+            await repo.bulk_create([account for _, account in chunk])
+            inserted += len(chunk)
+        except SQLAlchemyError:
+            # One bad row (e.g. a duplicate account number) fails the whole chunk; retry its rows
+            # one at a time so the others are still inserted and only the bad ones are reported
+            for row_number, account in chunk:
+                try:
+                    await repo.create(account)
+                    inserted += 1
+                except SQLAlchemyError as e:
+                    record_error(row_number, f"Database error: {str(getattr(e, 'orig', None) or e).splitlines()[0]}")
+        chunk.clear()
+
+    async for row_number, row, error in rows:
+        if error:
+            record_error(row_number, error)
+            continue
+        try:
+            account = AccountModel(**row)
+        except ValidationError as e:
+            record_error(row_number, validation_message(e))
+            continue
+        chunk.append((row_number, AccountTable(**account.dict(exclude={"id"}))))
+        if len(chunk) >= config.bulk_chunk_size:
+            await flush()
+    if chunk:
+        await flush()
+
+    return {"inserted": inserted, "failed": failed, "errors": errors, "errors_truncated": failed > len(errors)}
+
 @router.put("/{account_id}", response_model=AccountModel)
 def update_account(account_id: int, account: AccountModel, db: Session = Depends(get_db)):
     """Update an account."""
@@ -1,7 +1,10 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from api.repository.db_models import AccountTransaction
+from api.repository.bulk import bulk_insert, async_bulk_insert
 from uuid import UUID
 
 class AccountTransactionRepository:
@@ -50,22 +53,108 @@ class AccountTransactionRepository:
             self.db.rollback()
             raise e
 
-    def list(self, skip: int = 0, limit: int = 100) -> List[AccountTransaction]:
-        """List transactions."""
-        return self.db.query(AccountTransaction).offset(skip).limit(limit).all()
+    def list(self, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[AccountTransaction]:
+        """List transactions ordered by id; pass the last id seen as `after_id` to get the next page."""
+        query = self.db.query(AccountTransaction)
+        if after_id is not None:
+            query = query.filter(AccountTransaction.id > after_id)
+        return query.order_by(AccountTransaction.id).offset(skip).limit(limit).all()
 
-    def get_by_account_id(self, account_id: int, skip: int = 0, limit: int = 100) -> List[AccountTransaction]:
-        """List transactions for a specific account."""
-        return self.db.query(AccountTransaction).filter(AccountTransaction.account_id == account_id).offset(skip).limit(limit).all()
+    def get_by_account_id(self, account_id: int, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[AccountTransaction]:
+        """List transactions for a specific account, ordered by id."""
+        query = self.db.query(AccountTransaction).filter(AccountTransaction.account_id == account_id)
+        if after_id is not None:
+            query = query.filter(AccountTransaction.id > after_id)
+        return query.order_by(AccountTransaction.id).offset(skip).limit(limit).all()
+
+    def stream_all(self, batch_size: int = 1000) -> Iterator[AccountTransaction]:
+        """Yield every transaction ordered by id through a server-side cursor, `batch_size` rows at a time."""
+        result = self.db.execute(
+            select(AccountTransaction).order_by(AccountTransaction.id).execution_options(stream_results=True, yield_per=batch_size)
+        )
+        yield from result.scalars()
 
     def bulk_create(self, transactions: List[AccountTransaction]) -> List[AccountTransaction]:
-        """Bulk create transactions."""
+        """Bulk create transactions in chunks of multi-row INSERT ... RETURNING; returns them with IDs, in input order."""
         try:
-            self.db.add_all(transactions)
+            created = bulk_insert(self.db, AccountTransaction, transactions)
             self.db.commit()
-            for transaction in transactions:
-                self.db.refresh(transaction)
-            return transactions
+            return created
         except SQLAlchemyError as e:
             self.db.rollback()
             raise e
+
+
+class AsyncAccountTransactionRepository:
+    """Asyncio counterpart of AccountTransactionRepository for use on the event loop."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create(self, transaction: AccountTransaction) -> AccountTransaction:
+        """Create a new account transaction."""
+        try:
+            self.db.add(transaction)
+            await self.db.commit()
+            await self.db.refresh(transaction)
+            return transaction
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise e
+
+    async def get_by_id(self, transaction_id: int) -> Optional[AccountTransaction]:
+        """Get a transaction by ID."""
+        return await self.db.get(AccountTransaction, transaction_id)
+
+    async def update(self, transaction_id: int, **kwargs) -> Optional[AccountTransaction]:
+        """Update a transaction."""
+        try:
+            transaction = await self.get_by_id(transaction_id)
+            if transaction:
+                for key, value in kwargs.items():
+                    setattr(transaction, key, value)
+                await self.db.commit()
+                await self.db.refresh(transaction)
+            return transaction
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise e
+
+    async def delete(self, transaction_id: int) -> bool:
+        """Delete a transaction."""
+        try:
+            transaction = await self.get_by_id(transaction_id)
+            if transaction:
+                await self.db.delete(transaction)
+                await self.db.commit()
+                return True
+            return False
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise e
+
+    async def list(self, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[AccountTransaction]:
+        """List transactions ordered by id; pass the last id seen as `after_id` to get the next page."""
+        stmt = select(AccountTransaction)
+        if after_id is not None:
+            stmt = stmt.filter(AccountTransaction.id > after_id)
+        result = await self.db.execute(stmt.order_by(AccountTransaction.id).offset(skip).limit(limit))
+        return list(result.scalars().all())
+
+    async def get_by_account_id(self, account_id: int, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[AccountTransaction]:
+        """List transactions for a specific account, ordered by id."""
+        stmt = select(AccountTransaction).filter(AccountTransaction.account_id == account_id)
+        if after_id is not None:
+            stmt = stmt.filter(AccountTransaction.id > after_id)
+        result = await self.db.execute(stmt.order_by(AccountTransaction.id).offset(skip).limit(limit))
+        return list(result.scalars().all())
+
+    async def bulk_create(self, transactions: List[AccountTransaction]) -> List[AccountTransaction]:
+        """Bulk create transactions in chunks of multi-row INSERT ... RETURNING; returns them with IDs, in input order."""
+        try:
+            created = await async_bulk_insert(self.db, AccountTransaction, transactions)
+            await self.db.commit()
+            return created
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise e
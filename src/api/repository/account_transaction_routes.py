@@ -1,9 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from api.repository.models import AccountTransaction as AccountTransactionModel
+from typing import List, Optional
+from api.repository.models import AccountTransaction as AccountTransactionModel, AccountTransactionPage
 from api.repository.db_models import AccountTransaction as AccountTransactionTable
-from api.repository.database import get_db
+from api.repository.database import SessionLocal, get_db
 from api.repository.account_transaction import AccountTransactionRepository
 
 # Create a router for account transaction endpoints
@@ -25,6 +26,34 @@ def bulk_create_transactions(transactions: List[AccountTransactionModel], db: Se
     db_transactions = [AccountTransactionTable(**transaction.dict(exclude={"id"})) for transaction in transactions]
     return repo.bulk_create(db_transactions)
 
+@router.get("", response_model=AccountTransactionPage)
+def list_transactions(after_id: Optional[int] = None, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    """List transactions ordered by id, one keyset page at a time."""
+    repo = AccountTransactionRepository(db)
+    transactions = repo.list(limit=limit, after_id=after_id)
+    next_cursor = transactions[-1].id if len(transactions) == limit else None
+    return {"items": transactions, "next_cursor": next_cursor}
+
+@router.get("/export")
+def export_transactions(batch_size: int = 1000):
+    """Stream every transaction as NDJSON through a server-side cursor, without loading the table into memory."""
+    def lines():
+        # The session must outlive the route, so the generator owns it
+        db = SessionLocal()
+        try:
+            batch = []
+            for transaction in AccountTransactionRepository(db).stream_all(batch_size):
+                batch.append(AccountTransactionModel.model_validate(transaction).model_dump_json())
+                if len(batch) >= batch_size:
+                    yield "\n".join(batch) + "\n"
+                    batch = []
+            if batch:
+                yield "\n".join(batch) + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @router.get("/{transaction_id}", response_model=AccountTransactionModel)
 def get_transaction(transaction_id: int, db: Session = Depends(get_db)):
     """Get a transaction by ID."""
@@ -35,7 +64,8 @@ def get_transaction(transaction_id: int, db: Session = Depends(get_db)):
     return transaction
 
 @router.get("/account/{account_id}", response_model=List[AccountTransactionModel])
-def get_transactions_by_account(account_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get transactions for a specific account."""
+def get_transactions_by_account(account_id: int, skip: int = 0, limit: int = 100, after_id: Optional[int] = None,
+                                db: Session = Depends(get_db)):
+    """Get transactions for a specific account, ordered by id; pass the last id seen as `after_id` for the next page."""
     repo = AccountTransactionRepository(db)
-    return repo.get_by_account_id(account_id, skip, limit)
+    return repo.get_by_account_id(account_id, skip, limit, after_id)
@@ -0,0 +1,44 @@
+from typing import List, Optional, Type
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.config import config
+
+
+def _statement(model: Type):
+    # Core insert on the table: one multi-row INSERT ... RETURNING per page, rows come back in input order
+    table = model.__table__
+    return insert(table).returning(*table.columns, sort_by_parameter_order=True)
+
+
+def _values(model: Type, objects: list) -> List[dict]:
+    columns = [c for c in model.__table__.columns if not c.primary_key]
+    return [{c.name: getattr(obj, c.key) for c in columns} for obj in objects]
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def bulk_insert(db: Session, model: Type, objects: list, chunk_size: Optional[int] = None) -> list:
+    """
+    Insert ORM objects with multi-row INSERT ... RETURNING and return new instances, in input order.
+
+    The returned instances carry the generated IDs and are not attached to the session, so
+    reading them after commit does not issue a SELECT per row. The caller commits.
+    """
+    created = []
+    for chunk in _chunks(objects, chunk_size or config.bulk_chunk_size):
+        result = db.execute(_statement(model), _values(model, chunk))
+        created.extend(model(**row) for row in result.mappings())
+    return created
+
+
+async def async_bulk_insert(db: AsyncSession, model: Type, objects: list, chunk_size: Optional[int] = None) -> list:
+    """Asyncio counterpart of `bulk_insert`."""
+    created = []
+    for chunk in _chunks(objects, chunk_size or config.bulk_chunk_size):
+        result = await db.execute(_statement(model), _values(model, chunk))
+        created.extend(model(**row) for row in result.mappings())
+    return created
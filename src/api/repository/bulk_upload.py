@@ -0,0 +1,77 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Optional, Tuple
+
+from pydantic import ValidationError
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into text lines without holding more than one partial line in memory."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Yield (row_number, row, error) for each non-blank NDJSON line."""
+    row_number = 0
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, None, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(row, dict):
+            yield row_number, None, "Expected a JSON object"
+            continue
+        yield row_number, row, None
+
+
+def _parse_csv_line(text: str) -> list:
+    return next(csv.reader([text]))
+
+
+async def iter_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Yield (row_number, row, error) for each CSV record; the first record is the header.
+
+    Empty cells become None. Quoted fields may span lines.
+    """
+    header = None
+    row_number = 0
+    pending = None
+    async for line in iter_lines(chunks):
+        pending = line if pending is None else pending + "\n" + line
+        # An odd number of quotes means a quoted field continues on the next line
+        if pending.count('"') % 2:
+            continue
+        text, pending = pending, None
+        if not text.strip():
+            continue
+        values = _parse_csv_line(text)
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+        row_number += 1
+        if len(values) != len(header):
+            yield row_number, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield row_number, {h: (v if v != "" else None) for h, v in zip(header, values)}, None
+    if pending is not None:
+        row_number += 1
+        yield row_number, None, "Unterminated quoted field"
+
+
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in error.errors())
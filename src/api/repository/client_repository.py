@@ -0,0 +1,26 @@
+from sqlalchemy import func, literal, String
+from sqlalchemy.orm import Session
+from typing import Optional
+from api.repository.db_models import ClientTable
+
+class ClientRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def find_by_name(self, name: str) -> Optional[ClientTable]:
+        """Find the first client whose name contains the given text (case-insensitive)."""
+        return (
+            self.db.query(ClientTable)
+            .filter(ClientTable.name.ilike(f"%{name.strip()}%"))
+            .order_by(ClientTable.id)
+            .first()
+        )
+
+    def find_mentioned_in(self, text: str) -> Optional[ClientTable]:
+        """Find the client whose name appears in the given text, preferring the longest name."""
+        return (
+            self.db.query(ClientTable)
+            .filter(literal(text, String).icontains(ClientTable.name))
+            .order_by(func.length(ClientTable.name).desc(), ClientTable.id)
+            .first()
+        )
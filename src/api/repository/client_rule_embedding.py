@@ -1,11 +1,14 @@
 import logging
 from typing import List, Dict, Any
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-import psycopg2
-from psycopg2.extras import execute_batch
+from psycopg2.extras import execute_values
 from psycopg2.extensions import register_adapter
-import json
+import numpy as np
 from api.config import config
+from api.genai.embeddings import EMBEDDING_MODEL, get_embeddings
+from api.genai.embedding_pipeline import EmbeddingPipeline
+from api.repository.rule_cache import rule_cache, notify_rule_change
+from api.repository.rule_index import RuleVectorIndex, decode_vector, encode_embedding, rule_index_cache, vector_literal
+from api.repository.database import get_raw_connection
 
 from api.repository.process_type import ProcessType
 
@@ -24,59 +27,50 @@ class ClientRuleEmbedding:
         """
         self.client_id = client_id
 
-        # Setup Google Embeddings using unified config
-        google_api_key = config.google_api_key
-        if not google_api_key:
-            raise ValueError("google_api_key not found in config")
-
-        self.embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/gemini-embedding-001",
-            google_api_key=google_api_key
-        )
-
-        # Database Configuration from unified config
-        self.db_host = config.db_host
-        self.db_port = config.db_port
-        self.db_name = config.db_name
-        self.db_user = config.db_user
-        self.db_password = config.db_password
+        # Shared Google Embeddings client (created once per process)
+        self.embeddings = get_embeddings()
 
     def _get_connection(self):
-        """Create and return a database connection."""
+        """Borrow a database connection from the shared pool."""
         try:
-            conn = psycopg2.connect(
-                host=self.db_host,
-                port=self.db_port,
-                database=self.db_name,
-                user=self.db_user,
-                password=self.db_password
-            )
-            return conn
-        except psycopg2.Error as e:
+            return get_raw_connection()
+        except Exception as e:
             logger.error(f"Database connection error: {str(e)}")
             raise
 
-    def _parse_embedding(self, embedding_str: str) -> list:
-        """
-        Parse pgvector embedding string format to list of floats.
-
-        pgvector stores as: "[0.1,0.2,0.3,...]"
-
-        Args:
-            embedding_str: String representation from pgvector
-
-        Returns:
-            List of floats
-        """
+    def _load_index(self, process_type: ProcessType) -> RuleVectorIndex:
+        """Load every embedded rule of the client and process type into a RuleVectorIndex."""
+        conn = None
         try:
-            # pgvector returns as string like "[0.123, 0.456, ...]"
-            # Remove brackets and split by comma
-            embedding_str = embedding_str.strip('[]')
-            embedding_list = [float(x.strip()) for x in embedding_str.split(',')]
-            return embedding_list
-        except Exception as e:
-            logger.error(f"Error parsing embedding: {str(e)}")
-            return []
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                    SELECT id, client_id, process_type, rule_content, is_auto_apply, vector_send(embedding)
+                    FROM client_rule
+                    WHERE client_id = %s and process_type = %s and embedding IS NOT NULL
+                    ORDER BY id ASC
+                """,
+                (self.client_id, int(getattr(process_type, "value", process_type)))
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+        finally:
+            if conn:
+                conn.close()
+
+        rules = [
+            {
+                "rule_id": row[0],
+                "client_id": row[1],
+                "process_type": ProcessType(row[2]).name,
+                "rule_content": row[3],
+                "is_auto_apply": row[4]
+            }
+            for row in rows
+        ]
+        vectors = np.stack([decode_vector(row[5]) for row in rows]) if rows else np.zeros((0, 0), dtype=np.float32)
+        return RuleVectorIndex(rules, vectors)
 
     def store_client_rules(self, process_type: ProcessType, rules: List[str]) -> Dict[str, Any]:
         """
@@ -95,48 +89,42 @@ class ClientRuleEmbedding:
                 "error": "No rules provided"
             }
 
+        conn = None
         try:
-            # Generate embeddings for all rules at once (batch)
+            # Embed in rate-limited, retried chunks so a large rule book is not one remote call
             logger.info(f"Generating embeddings for {len(rules)} rules...")
-            embeddings = self.embeddings.embed_documents(rules)
+            embeddings = EmbeddingPipeline(self.embeddings).embed(rules)
             
             if not embeddings:
                 raise ValueError("Failed to generate embeddings")
 
-            # Convert embeddings to lists (psycopg2 compatible format)
-            # Google embeddings are already lists, but ensure they are
-            embeddings = [
-                emb.tolist() if hasattr(emb, 'tolist') else list(emb) if isinstance(emb, (list, tuple)) else emb
-                for emb in embeddings
-            ]
-
             # Connect to database
             conn = self._get_connection()
             cursor = conn.cursor()
 
-            # Prepare data for batch insert
-            # pgvector expects format: [0.1, 0.2, ..., 0.768]
+            # pgvector text input: [0.1, 0.2, ..., 0.768]
             data = [
-                (self.client_id, rule, process_type.value, emb)
+                (self.client_id, rule, process_type.value, vector_literal(emb), EMBEDDING_MODEL)
                 for rule, emb in zip(rules, embeddings)
             ]
 
-            # SQL to insert into client_rule table
-            sql = """
-                INSERT INTO client_rule (client_id, rule_content, process_type, embedding)
-                VALUES (%s, %s, %s, %s::vector)
-            """
-
-            # Execute batch insert
+            # One multi-row INSERT per page
             logger.info(f"Inserting {len(data)} rules into database...")
-            execute_batch(cursor, sql, data, page_size=100)
-            
+            execute_values(
+                cursor,
+                "INSERT INTO client_rule (client_id, rule_content, process_type, embedding, embedding_model) VALUES %s",
+                data,
+                template="(%s, %s, %s, %s::vector, %s)",
+                page_size=config.embedding_chunk_size
+            )
+            notify_rule_change(cursor, self.client_id)
+
             conn.commit()
+            rule_cache.invalidate(self.client_id)
             
             logger.info(f"✓ Successfully stored {len(data)} rules for client {self.client_id}")
             
             cursor.close()
-            conn.close()
             
             return {
                 "success": True,
@@ -146,13 +134,18 @@ class ClientRuleEmbedding:
 
         except Exception as e:
             logger.error(f"Error storing rules: {str(e)}")
+            if conn:
+                conn.rollback()
             return {
                 "success": False,
                 "error": str(e),
                 "client_id": self.client_id
             }
+        finally:
+            if conn:
+                conn.close()
 
-    def search_rules(self,process_type: ProcessType, query: str = None, k: int = 3, return_all: bool = False, include_embeddings: bool = False) -> Dict[str, Any]:
+    def search_rules(self,process_type: ProcessType, query: str = None, k: int = 3, return_all: bool = False, include_embeddings: bool = False, embedding_format: str = "list") -> Dict[str, Any]:
         """
         Search for similar rules or retrieve all rules for a client.
 
@@ -162,17 +155,30 @@ class ClientRuleEmbedding:
             k: Number of results to return (default: 3)
             return_all: If True, return all rules for the client (ignores query and k)
             include_embeddings: If True, include embedding vectors in response (default: False)
+            embedding_format: "list" for float lists or "base64" for base64 encoded float32 bytes
 
         Returns:
             Dictionary with search results or empty if not found
         """
+        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
+            if return_all and not include_embeddings:
+                cached = rule_cache.get(self.client_id, process_type)
+                if cached is not None:
+                    return {
+                        "success": True,
+                        "client_id": self.client_id,
+                        "include_embeddings": False,
+                        "results_count": len(cached),
+                        "results": list(cached)
+                    }
+            cache_version = rule_cache.version(self.client_id)
 
             if return_all:
                 # Return all rules for the client
                 logger.info(f"Retrieving all rules for client {self.client_id}")
+                conn = self._get_connection()
+                cursor = conn.cursor()
                 
                 # Build SQL based on whether embeddings are requested
                 if include_embeddings:
@@ -183,7 +189,7 @@ class ClientRuleEmbedding:
                             process_type,
                             rule_content,
                             is_auto_apply,
-                            embedding::text
+                            vector_send(embedding)
                         FROM client_rule
                         WHERE client_id = %s and process_type = %s
                         ORDER BY id ASC
@@ -201,14 +207,15 @@ class ClientRuleEmbedding:
                         ORDER BY id ASC
                     """
                 
-                cursor.execute(sql, (self.client_id,process_type))
+                cursor.execute(sql, (self.client_id, int(getattr(process_type, "value", process_type))))
                 results = cursor.fetchall()
 
                 cursor.close()
-                conn.close()
 
                 if not results:
                     logger.info(f"No rules found for client {self.client_id}")
+                    if not include_embeddings:
+                        rule_cache.put(self.client_id, process_type, [], cache_version)
                     return {
                         "success": True,
                         "client_id": self.client_id,
@@ -225,7 +232,7 @@ class ClientRuleEmbedding:
                             "process_type": ProcessType(row[2]).name,
                             "rule_content": row[3],
                             "is_auto_apply": row[4],
-                            "embedding": self._parse_embedding(row[5])  # Convert pgvector string to list
+                            "embedding": encode_embedding(decode_vector(row[5]), embedding_format) if row[5] is not None else None
                         }
                         for row in results
                     ]
@@ -242,6 +249,8 @@ class ClientRuleEmbedding:
                     ]
 
                 logger.info(f"Retrieved {len(formatted_results)} rules for client {self.client_id}")
+                if not include_embeddings:
+                    rule_cache.put(self.client_id, process_type, formatted_results, cache_version)
 
                 return {
                     "success": True,
@@ -264,51 +273,12 @@ class ClientRuleEmbedding:
                 
                 # Generate embedding for query
                 query_embedding = self.embeddings.embed_query(query)
-                
-                # Convert to list if needed
-                if hasattr(query_embedding, 'tolist'):
-                    query_embedding = query_embedding.tolist()
-                elif not isinstance(query_embedding, list):
-                    query_embedding = list(query_embedding)
 
-                # Build SQL based on whether embeddings are requested
-                if include_embeddings:
-                    sql = """
-                        SELECT 
-                            id,
-                            client_id,
-                            process_type,
-                            rule_content,
-                            is_auto_apply,
-                            embedding::text,
-                            1 - (embedding <=> %s::vector) as similarity_score
-                        FROM client_rule
-                        WHERE client_id = %s and process_type = %s
-                        ORDER BY embedding <=> %s::vector
-                        LIMIT %s
-                    """
-                else:
-                    sql = """
-                        SELECT 
-                            id,
-                            client_id,
-                            process_type,
-                            rule_content,
-                            is_auto_apply,
-                            1 - (embedding <=> %s::vector) as similarity_score
-                        FROM client_rule
-                        WHERE client_id = %s and process_type = %s
-                        ORDER BY embedding <=> %s::vector
-                        LIMIT %s
-                    """
-
-                cursor.execute(sql, (json.dumps(query_embedding), self.client_id, json.dumps(query_embedding), k))
-                results = cursor.fetchall()
+                # Rank against the in-process index instead of scanning client_rule in Postgres
+                index = rule_index_cache.get(self.client_id, process_type, lambda: self._load_index(process_type))
+                hits = index.search(query_embedding, k)
 
-                cursor.close()
-                conn.close()
-
-                if not results:
+                if not hits:
                     logger.info(f"No similar rules found for query: {query}")
                     return {
                         "success": True,
@@ -319,31 +289,12 @@ class ClientRuleEmbedding:
                     }
 
                 # Format results with similarity scores and optional embeddings
-                if include_embeddings:
-                    formatted_results = [
-                        {
-                            "rule_id": row[0],
-                            "client_id": row[1],
-                            "process_type": ProcessType(row[2]).name,
-                            "rule_content": row[3],
-                            "is_auto_apply": row[4],
-                            "embedding": self._parse_embedding(row[5]),
-                            "similarity_score": round(float(row[6]), 4)
-                        }
-                        for row in results
-                    ]
-                else:
-                    formatted_results = [
-                        {
-                            "rule_id": row[0],
-                            "client_id": row[1],
-                            "process_type": ProcessType(row[2]).name,
-                            "rule_content": row[3],
-                            "is_auto_apply": row[4],
-                            "similarity_score": round(float(row[4]), 4)
-                        }
-                        for row in results
-                    ]
+                formatted_results = []
+                for row, score in hits:
+                    result = {**index.rules[row], "similarity_score": round(score, 4)}
+                    if include_embeddings:
+                        result["embedding"] = encode_embedding(index.vectors[row], embedding_format)
+                    formatted_results.append(result)
 
                 logger.info(f"Found {len(formatted_results)} similar rules for query: {query}")
 
@@ -363,6 +314,9 @@ class ClientRuleEmbedding:
                 "error": str(e),
                 "client_id": self.client_id
             }
+        finally:
+            if conn:
+                conn.close()
 
     def delete_client_rules(self) -> Dict[str, Any]:
         """
@@ -371,6 +325,7 @@ class ClientRuleEmbedding:
         Returns:
             Dictionary with status
         """
+        conn = None
         try:
             conn = self._get_connection()
             cursor = conn.cursor()
@@ -379,10 +334,11 @@ class ClientRuleEmbedding:
             cursor.execute(sql, (self.client_id,))
             
             deleted_count = cursor.rowcount
+            notify_rule_change(cursor, self.client_id)
             conn.commit()
+            rule_cache.invalidate(self.client_id)
 
             cursor.close()
-            conn.close()
 
             logger.info(f"Deleted {deleted_count} rules for client {self.client_id}")
 
@@ -394,7 +350,12 @@ class ClientRuleEmbedding:
 
         except Exception as e:
             logger.error(f"Error deleting rules: {str(e)}")
+            if conn:
+                conn.rollback()
             return {
                 "success": False,
                 "error": str(e)
-            }
\ No newline at end of file
+            }
+        finally:
+            if conn:
+                conn.close()
\ No newline at end of file
@@ -1,12 +1,20 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal
 from api.repository.models import ClientRules
 from api.repository.client_rule_embedding import ClientRuleEmbedding
+from api.repository.process_type import ProcessType
+from api.repository.rule_cache import rule_cache
+from api.repository.rule_index import rule_index_cache
 
 # Create a router for client endpoints
 rules_router = APIRouter(prefix="/client_rule", tags=["client_rule"])
 
+@rules_router.get("/cache/stats")
+def get_rule_cache_stats():
+    """Hit/miss counters of the in-process client rule cache and rule vector index."""
+    return {**rule_cache.stats(), "vector_index": rule_index_cache.stats()}
+
 @rules_router.post("/{client_id}",response_model=str)
 def save_client_rule(clientRule: ClientRules, client_id: int):
     print(f"Storing rules for client ID: {client_id}")
@@ -15,8 +23,20 @@ def save_client_rule(clientRule: ClientRules, client_id: int):
     return "Client rules stored successfully."
 
 @rules_router.get("/{client_id}")
-def list_client_rules(client_id: int):
+def list_client_rules(client_id: int, process_type: int = ProcessType.Placement.value, include_embeddings: bool = True,
+                      embedding_format: Literal["list", "base64"] = "list"):
+    """
+    List a client's rules for one process type.
+
+    `embedding_format=base64` returns each embedding as base64 encoded little-endian float32 bytes,
+    about a quarter of the size of the float list; `include_embeddings=false` omits them.
+    """
     print(f"get client rules for client ID: {client_id}")
+    try:
+        process_type = ProcessType(process_type)
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"Unknown process_type {process_type}")
     clientRuleEmbedding = ClientRuleEmbedding(client_id)
-    return clientRuleEmbedding.search_rules(return_all=True, k=100,include_embeddings=True)
+    return clientRuleEmbedding.search_rules(process_type, return_all=True, k=100, include_embeddings=include_embeddings,
+                                            embedding_format=embedding_format)
 
@@ -1,19 +1,175 @@
+import threading
+import time
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from api.config import config
 
 # load_dotenv()
 # database_url = os.getenv("database_url")
 
-# Create engine and session factory
-engine = create_engine(config.database_url)
+
+class PoolMetrics:
+    """Checkout counts and wait times of the shared connection pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "wait_avg_ms": round(self.wait_total / self.wait_count * 1000, 3) if self.wait_count else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3)
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_metrics.record_wait(time.perf_counter() - start)
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Async-adapted counterpart of InstrumentedQueuePool for the async engine."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_metrics.record_wait(time.perf_counter() - start)
+
+
+def _engine_options(poolclass=InstrumentedQueuePool) -> dict:
+    """Pool settings from Config (SQLite, used in tests, keeps SQLAlchemy's default pool)."""
+    if config.database_url and config.database_url.startswith("sqlite"):
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": config.db_pool_size,
+        "max_overflow": config.db_max_overflow,
+        "pool_recycle": config.db_pool_recycle,
+        "pool_timeout": config.db_pool_timeout,
+        "pool_pre_ping": True
+    }
+
+
+# Create engine and session factory; the engine's pool is shared by every sync DB access path
+engine = create_engine(config.database_url, **_engine_options())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def _read_only_engine_options() -> dict:
+    """
+    Own small pool for ad-hoc (chat bot) SQL: every session is read-only and statements are
+    cancelled by the server after `sql_statement_timeout_ms`.
+    """
+    options = _engine_options()
+    if not options:
+        return options
+    return {
+        **options,
+        "pool_size": config.sql_pool_size,
+        "max_overflow": config.sql_pool_size,
+        "connect_args": {
+            "options": f"-c default_transaction_read_only=on -c statement_timeout={config.sql_statement_timeout_ms}"
+        }
+    }
+
+
+read_only_engine = create_engine(config.database_url, **_read_only_engine_options())
+
+
+def _async_database_url(url: str):
+    """Map the sync Postgres URL onto the asyncio psycopg (v3) driver; None for other databases."""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url and url.startswith(prefix):
+            return "postgresql+psycopg://" + url[len(prefix):]
+    return None
+
+
+# Async engine and session factory for event-loop code (MCP tools, async routes)
+_async_url = _async_database_url(config.database_url)
+async_engine = create_async_engine(_async_url, **_engine_options(InstrumentedAsyncQueuePool)) if _async_url else None
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Base class for ORM models
 Base = declarative_base()
 
 
+def _on_connect(dbapi_connection, connection_record):
+    pool_metrics.count("connects")
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_metrics.count("checkouts")
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    pool_metrics.count("checkins")
+
+
+for _engine in filter(None, [engine, read_only_engine, async_engine.sync_engine if async_engine else None]):
+    event.listen(_engine, "connect", _on_connect)
+    event.listen(_engine, "checkout", _on_checkout)
+    event.listen(_engine, "checkin", _on_checkin)
+
+
+def get_raw_connection():
+    """
+    Borrow a raw DBAPI (psycopg2) connection from the shared pool.
+
+    Use it like a normal psycopg2 connection; `close()` returns it to the pool.
+    """
+    return engine.raw_connection()
+
+
+def pool_stats() -> dict:
+    """Pool status and instrumentation counters."""
+    stats = pool_metrics.as_dict()
+    pools = {"sync": engine.pool, "read_only": read_only_engine.pool}
+    if async_engine is not None:
+        pools["async"] = async_engine.pool
+    for name, pool in pools.items():
+        if isinstance(pool, QueuePool):
+            stats[name] = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "idle": pool.checkedin()
+            }
+    return stats
+
+
 def get_db():
     """Dependency for FastAPI to inject database sessions."""
     db = SessionLocal()
@@ -21,3 +177,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Dependency for async FastAPI routes to inject async database sessions."""
+    async with AsyncSessionLocal() as db:
+        yield db
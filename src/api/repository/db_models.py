@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, Numeric
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Numeric, Text, func
 from sqlalchemy.dialects.postgresql import UUID
 from api.repository.database import Base
 from pgvector.sqlalchemy import Vector
@@ -77,3 +77,31 @@ class ProcessLogTable(Base):
     process_type = Column(Integer)
     details = Column(JSONB)
 
+
+class ProcessJobTable(Base):
+    """SQLAlchemy ORM model for the process_job table."""
+    __tablename__ = "process_job"
+
+    id = Column(Integer, primary_key=True, index=True)
+    correlation_id = Column(UUID(as_uuid=True), nullable=False, unique=True)
+    from_address = Column(String(255))
+    subject = Column(Text)
+    content = Column(Text)
+    content_hash = Column(String(64), index=True)
+    status = Column(String(20), nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    error_detail = Column(Text)
+    created_date = Column(DateTime, server_default=func.now())
+    updated_date = Column(DateTime, server_default=func.now())
+
+
+class ClientTableLayoutTable(Base):
+    """SQLAlchemy ORM model for the client_table_layout table."""
+    __tablename__ = "client_table_layout"
+
+    id = Column(Integer, primary_key=True, index=True)
+    client_id = Column(Integer, ForeignKey('client.id', ondelete="CASCADE"), nullable=False)
+    process_type = Column(Integer, nullable=False)
+    signature = Column(Text, nullable=False)
+    mapping = Column(JSONB, nullable=False)
+    updated_date = Column(DateTime, server_default=func.now())
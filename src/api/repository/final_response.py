@@ -16,9 +16,9 @@ class ExtractedField(BaseModel):
     customer_account: str
     amount_paid: float
     balance_amount: float
-    transformtion_rules: List[Rule]
-    validation_rules: List[Rule]
-    field_validations: List[FieldValidation]
+    transformtion_rules: List[Rule] = []
+    validation_rules: List[Rule] = []
+    field_validations: List[FieldValidation] = []
 
 class FinalResponse(BaseModel):
     model_config = ConfigDict(
@@ -29,6 +29,7 @@ class FinalResponse(BaseModel):
     client_name: str
     process_type: int
     extracted_fields: List[ExtractedField]
+    errors: List[str] = []
 
 
 
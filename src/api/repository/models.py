@@ -20,7 +20,7 @@ class MailRequest(BaseModel):
 
 
 from uuid import UUID
-from typing import Optional
+from typing import List, Optional
 from decimal import Decimal
 
 class Account(BaseModel):
@@ -47,6 +47,17 @@ class AccountTransaction(BaseModel):
     class Config:
         from_attributes = True
 
+class AccountPage(BaseModel):
+    """One keyset page of accounts; pass `next_cursor` as `after_id` to fetch the next page."""
+    items: List[Account]
+    next_cursor: Optional[int] = None
+
+
+class AccountTransactionPage(BaseModel):
+    """One keyset page of transactions; pass `next_cursor` as `after_id` to fetch the next page."""
+    items: List[AccountTransaction]
+    next_cursor: Optional[int] = None
+
 from typing import Any, Dict
 
 class ProcessLog(BaseModel):
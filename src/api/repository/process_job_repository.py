@@ -0,0 +1,157 @@
+import hashlib
+from datetime import timedelta
+from typing import List, Optional, Tuple
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.repository.db_models import ProcessJobTable
+from api.repository.models import MailRequest
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def content_hash(request: MailRequest) -> str:
+    """sha256 over (from_address, subject, content); a resent email hashes to the same value."""
+    digest = hashlib.sha256()
+    for part in (request.from_address, request.subject, request.content):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+def _lock_key(hash_value: str) -> int:
+    # pg advisory locks take a signed bigint
+    return int.from_bytes(bytes.fromhex(hash_value[:16]), "big", signed=True)
+
+
+class ProcessJobRepository:
+    """Postgres-backed queue of emails waiting for `Extract.process`."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def enqueue(self, request: MailRequest, correlation_id: str, status: str = QUEUED,
+                      dedup_window_seconds: float = 0) -> Tuple[ProcessJobTable, bool]:
+        """
+        Queue an email for processing under the given correlation ID.
+
+        When `dedup_window_seconds` is set, an identical email submitted within the window is not queued
+        again; the earlier job is returned instead. Failed jobs do not count, so a resend retries them.
+        Pass `status=RUNNING` to claim the job for processing in the caller.
+
+        Returns:
+            (job, created) where `created` is False for a duplicate.
+        """
+        hash_value = content_hash(request)
+        if dedup_window_seconds > 0:
+            # Serialise submissions of the same email; the lock is released on commit
+            await self.db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _lock_key(hash_value)})
+            result = await self.db.execute(
+                select(ProcessJobTable)
+                .filter(ProcessJobTable.content_hash == hash_value)
+                .filter(ProcessJobTable.status != FAILED)
+                .filter(ProcessJobTable.created_date >= func.now() - timedelta(seconds=dedup_window_seconds))
+                .order_by(ProcessJobTable.id.desc())
+                .limit(1)
+            )
+            existing = result.scalars().first()
+            if existing is not None:
+                await self.db.commit()
+                return existing, False
+
+        job = ProcessJobTable(
+            correlation_id=correlation_id,
+            from_address=request.from_address,
+            subject=request.subject,
+            content=request.content,
+            content_hash=hash_value,
+            status=status,
+            attempts=1 if status == RUNNING else 0
+        )
+        self.db.add(job)
+        await self.db.commit()
+        await self.db.refresh(job)
+        return job, True
+
+    async def get_by_correlation_id(self, correlation_id: str) -> Optional[ProcessJobTable]:
+        result = await self.db.execute(select(ProcessJobTable).filter(ProcessJobTable.correlation_id == correlation_id))
+        return result.scalars().first()
+
+    async def claim(self, limit: int) -> List[dict]:
+        """
+        Mark up to `limit` queued jobs as running and return them, oldest first.
+
+        Rows locked by another worker are skipped, so any number of workers can claim concurrently.
+        """
+        result = await self.db.execute(
+            text("""
+                UPDATE process_job
+                SET status = :running, attempts = attempts + 1, updated_date = now()
+                WHERE id IN (
+                    SELECT id FROM process_job
+                    WHERE status = :queued
+                    ORDER BY id
+                    FOR UPDATE SKIP LOCKED
+                    LIMIT :limit
+                )
+                RETURNING id, correlation_id, from_address, subject, content, attempts
+            """),
+            {"running": RUNNING, "queued": QUEUED, "limit": limit}
+        )
+        jobs = [dict(row._mapping) for row in result]
+        await self.db.commit()
+        return sorted(jobs, key=lambda job: job["id"])
+
+    async def set_status(self, job_ids: List[int], status: str, error_detail: Optional[str] = None) -> None:
+        """Move jobs to a new status (used for done, failed and releasing claimed jobs back to the queue)."""
+        if not job_ids:
+            return
+        await self.db.execute(
+            text("""
+                UPDATE process_job
+                SET status = :status, error_detail = :error_detail, updated_date = now()
+                WHERE id = ANY(:job_ids)
+            """),
+            {"status": status, "error_detail": error_detail, "job_ids": list(job_ids)}
+        )
+        await self.db.commit()
+
+    async def heartbeat(self, job_ids: List[int]) -> None:
+        """Refresh `updated_date` of jobs still running, so `requeue_stale` leaves them alone."""
+        if not job_ids:
+            return
+        await self.db.execute(
+            text("""
+                UPDATE process_job
+                SET updated_date = now()
+                WHERE id = ANY(:job_ids) AND status = :running
+            """),
+            {"job_ids": list(job_ids), "running": RUNNING}
+        )
+        await self.db.commit()
+
+    async def requeue_stale(self, timeout_seconds: float, max_attempts: int) -> int:
+        """
+        Return jobs left running by a crashed worker to the queue, or fail them once out of attempts.
+
+        A job counts as abandoned when its `heartbeat` has not been refreshed for `timeout_seconds`.
+
+        Returns:
+            The number of jobs recovered.
+        """
+        result = await self.db.execute(
+            text("""
+                UPDATE process_job
+                SET status = CASE WHEN attempts < :max_attempts THEN :queued ELSE :failed END,
+                    error_detail = CASE WHEN attempts < :max_attempts THEN error_detail ELSE 'Worker stopped before the job finished' END,
+                    updated_date = now()
+                WHERE status = :running
+                  AND updated_date < now() - make_interval(secs => :timeout)
+            """),
+            {"max_attempts": max_attempts, "queued": QUEUED, "failed": FAILED, "running": RUNNING,
+             "timeout": timeout_seconds}
+        )
+        await self.db.commit()
+        return result.rowcount
@@ -1,4 +1,7 @@
+from typing import Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from api.repository.db_models import ProcessLogTable
 from api.repository.models import ProcessLog
 
@@ -12,3 +15,32 @@ class ProcessLogRepository:
         self.db.commit()
         self.db.refresh(db_log)
         return db_log
+
+    def get_by_correlation_id(self, correlation_id: str) -> Optional[ProcessLogTable]:
+        return (
+            self.db.query(ProcessLogTable)
+            .filter(ProcessLogTable.correlation_id == correlation_id)
+            .order_by(ProcessLogTable.id.desc())
+            .first()
+        )
+
+
+class AsyncProcessLogRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def save(self, log: ProcessLog) -> ProcessLogTable:
+        db_log = ProcessLogTable(**log.dict(exclude={"id"}))
+        self.db.add(db_log)
+        await self.db.commit()
+        await self.db.refresh(db_log)
+        return db_log
+
+    async def get_by_correlation_id(self, correlation_id: str) -> Optional[ProcessLogTable]:
+        result = await self.db.execute(
+            select(ProcessLogTable)
+            .filter(ProcessLogTable.correlation_id == correlation_id)
+            .order_by(ProcessLogTable.id.desc())
+            .limit(1)
+        )
+        return result.scalars().first()
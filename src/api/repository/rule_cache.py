@@ -0,0 +1,182 @@
+import logging
+import select
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import psycopg2
+from api.config import config
+
+logger = logging.getLogger(__name__)
+
+# Postgres channel used to tell other replicas that a client's rules changed
+RULE_CHANGE_CHANNEL = "client_rule_changed"
+
+
+def _key(client_id: int, process_type) -> tuple:
+    # Accept both ProcessType members and plain ints
+    return (client_id, int(getattr(process_type, "value", process_type)))
+
+
+class RuleSetCache:
+    """
+    In-process LRU/TTL cache of client rule sets keyed by (client_id, process_type).
+
+    Each entry holds the rule rows and, once requested, the compiled rule set
+    built from them, so both are dropped together when the client's rules change.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a read that raced with a rule write is not cached
+        self._versions: Dict[int, int] = {}
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _live_entry(self, key: tuple) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry["expires_at"] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, client_id: int, process_type: int) -> Optional[List[dict]]:
+        """Return the cached rule rows, or None on a miss."""
+        with self._lock:
+            entry = self._live_entry(_key(client_id, process_type))
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry["results"]
+
+    def version(self, client_id: int) -> tuple:
+        """Return the invalidation counter of a client; pass it to `put` to detect concurrent writes."""
+        with self._lock:
+            return (self._epoch, self._versions.get(client_id, 0))
+
+    def put(self, client_id: int, process_type: int, results: List[dict], version: Optional[tuple] = None) -> None:
+        with self._lock:
+            if version is not None and version != (self._epoch, self._versions.get(client_id, 0)):
+                return
+            key = _key(client_id, process_type)
+            self._entries[key] = {
+                "results": results,
+                "compiled": None,
+                "expires_at": time.monotonic() + self.ttl
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_compiled(self, client_id: int, process_type: int, factory: Callable[[], Any]) -> Any:
+        """Return the compiled form of a cached rule set, building it with `factory` on first use."""
+        with self._lock:
+            entry = self._live_entry(_key(client_id, process_type))
+            if entry is not None and entry["compiled"] is not None:
+                return entry["compiled"]
+        compiled = factory()
+        with self._lock:
+            entry = self._live_entry(_key(client_id, process_type))
+            if entry is not None:
+                entry["compiled"] = compiled
+        return compiled
+
+    def invalidate(self, client_id: int) -> None:
+        """Drop every cached rule set of a client."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == client_id]:
+                del self._entries[key]
+            self._versions[client_id] = self._versions.get(client_id, 0) + 1
+            self.invalidations += 1
+        logger.info(f"Rule cache invalidated for client {client_id}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._epoch += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+
+rule_cache = RuleSetCache(maxsize=config.rule_cache_size, ttl=config.rule_cache_ttl_seconds)
+
+
+def notify_rule_change(cursor, client_id: int) -> None:
+    """Queue a NOTIFY for other replicas; it is delivered when the caller's transaction commits."""
+    cursor.execute("SELECT pg_notify(%s, %s)", (RULE_CHANGE_CHANNEL, str(client_id)))
+
+
+def _listen_for_rule_changes(stop: threading.Event) -> None:
+    """Invalidate the local cache whenever another process changes a client's rules."""
+    while not stop.is_set():
+        conn = None
+        try:
+            conn = psycopg2.connect(
+                host=config.db_host,
+                port=config.db_port,
+                database=config.db_name,
+                user=config.db_user,
+                password=config.db_password
+            )
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            cursor = conn.cursor()
+            cursor.execute(f"LISTEN {RULE_CHANGE_CHANNEL};")
+            logger.info(f"Listening for {RULE_CHANGE_CHANNEL} notifications")
+            # Anything cached before LISTEN started may have missed a change
+            rule_cache.clear()
+            while not stop.is_set():
+                if select.select([conn], [], [], 5) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    rule_cache.invalidate(int(notify.payload))
+        except Exception as e:
+            logger.warning(f"Rule change listener failed, retrying: {e}")
+            # Without the listener we cannot trust the cache to be coherent
+            rule_cache.clear()
+            stop.wait(5)
+        finally:
+            if conn:
+                conn.close()
+
+
+_listener_stop: Optional[threading.Event] = None
+
+
+def start_rule_cache_listener() -> None:
+    """Start the LISTEN/NOTIFY invalidation thread if `rule_cache_listen` is enabled."""
+    global _listener_stop
+    if not config.rule_cache_listen or _listener_stop is not None:
+        return
+    _listener_stop = threading.Event()
+    threading.Thread(target=_listen_for_rule_changes, args=(_listener_stop,), daemon=True, name="rule-cache-listener").start()
+
+
+def stop_rule_cache_listener() -> None:
+    global _listener_stop
+    if _listener_stop is not None:
+        _listener_stop.set()
+        _listener_stop = None
@@ -0,0 +1,126 @@
+import base64
+import logging
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+from api.config import config
+from api.repository.rule_cache import rule_cache, _key
+
+logger = logging.getLogger(__name__)
+
+
+def decode_vector(data) -> np.ndarray:
+    """
+    Decode pgvector's binary form (what `vector_send(embedding)` returns) into a float32 array.
+
+    The layout is a big-endian uint16 dimension count, a reserved uint16, then big-endian float32s,
+    so decoding is a single buffer view instead of parsing thousands of decimal strings.
+    """
+    dim, _ = struct.unpack_from(">HH", data)
+    return np.frombuffer(data, dtype=">f4", count=dim, offset=4).astype(np.float32)
+
+
+def vector_literal(vector) -> str:
+    """Format an embedding as pgvector's text input "[0.1,0.2,...]" for a `%s::vector` parameter."""
+    return "[" + ",".join(map(repr, np.asarray(vector, dtype=np.float64).tolist())) + "]"
+
+
+def encode_embedding(vector: np.ndarray, embedding_format: str = "list"):
+    """
+    Shape an embedding for an API response.
+
+    "list" returns plain floats; "base64" returns the little-endian float32 bytes base64 encoded,
+    which is about a quarter of the size of the JSON list.
+    """
+    if embedding_format == "base64":
+        return base64.b64encode(np.asarray(vector, dtype="<f4").tobytes()).decode("ascii")
+    return np.asarray(vector).tolist()
+
+
+class RuleVectorIndex:
+    """
+    Flat in-memory cosine index over the rule embeddings of one client and process type.
+
+    Vectors are kept as one float32 matrix, so a query is a single matrix-vector product.
+    """
+
+    def __init__(self, rules: List[dict], vectors: np.ndarray):
+        self.rules = rules
+        self.vectors = np.atleast_2d(vectors.astype(np.float32, copy=False))
+        norms = np.linalg.norm(self.vectors, axis=1)
+        self._inv_norms = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def search(self, query_vector, k: int) -> List[Tuple[int, float]]:
+        """
+        Return up to k (row, cosine similarity) pairs, most similar first.
+        """
+        if not self.rules or k <= 0:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        query_norm = np.linalg.norm(query)
+        if query_norm == 0:
+            return []
+        scores = (self.vectors @ query) * self._inv_norms / query_norm
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(i), float(scores[i])) for i in top]
+
+
+class RuleIndexCache:
+    """
+    LRU of RuleVectorIndex per (client_id, process_type).
+
+    Entries are tagged with the client's rule cache version, so any rule change that
+    invalidates the rule cache (locally or through LISTEN/NOTIFY) also rebuilds the index.
+    Like the rule cache, entries also expire after `ttl` seconds, which is what picks up rule
+    changes made on other replicas when LISTEN/NOTIFY is off.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+
+    def get(self, client_id: int, process_type, loader: Callable[[], RuleVectorIndex]) -> RuleVectorIndex:
+        key = _key(client_id, process_type)
+        version = rule_cache.version(client_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version and entry[2] >= time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        index = loader()
+        with self._lock:
+            self.builds += 1
+            self._entries[key] = (version, index, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        logger.info(f"Built rule vector index for client {client_id} with {len(index)} rules")
+        return index
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "vectors": sum(len(entry[1]) for entry in self._entries.values()),
+                "hits": self.hits,
+                "builds": self.builds,
+                "ttl_seconds": self.ttl
+            }
+
+
+rule_index_cache = RuleIndexCache(maxsize=config.rule_cache_size, ttl=config.rule_cache_ttl_seconds)
@@ -0,0 +1,31 @@
+from typing import Dict, Optional
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from api.repository.db_models import ClientTableLayoutTable
+
+
+class TableLayoutRepository:
+    """Learned column mappings of client email tables, keyed by client, process type and table signature."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get(self, client_id: int, process_type: int, signature: str) -> Optional[Dict[str, Optional[int]]]:
+        return self.db.execute(
+            select(ClientTableLayoutTable.mapping)
+            .filter(ClientTableLayoutTable.client_id == client_id)
+            .filter(ClientTableLayoutTable.process_type == process_type)
+            .filter(ClientTableLayoutTable.signature == signature)
+        ).scalar()
+
+    def save(self, client_id: int, process_type: int, signature: str, mapping: Dict[str, Optional[int]]) -> None:
+        """Insert or replace the mapping of a table layout."""
+        statement = insert(ClientTableLayoutTable).values(
+            client_id=client_id, process_type=process_type, signature=signature, mapping=mapping
+        )
+        self.db.execute(statement.on_conflict_do_update(
+            index_elements=["client_id", "process_type", "signature"],
+            set_={"mapping": statement.excluded.mapping, "updated_date": func.now()}
+        ))
+        self.db.commit()
@@ -0,0 +1,230 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels:
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and histograms rendered in the Prometheus text format.
+
+    Metrics are declared once with `counter` / `histogram`; each label combination is a
+    separate series, created on first use.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kinds: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        # name -> labels -> [bucket counts, sum, count]
+        self._histograms: Dict[str, Dict[tuple, list]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+
+    def counter(self, name: str, help_text: str) -> None:
+        with self._lock:
+            self._kinds[name] = ("counter", help_text)
+            self._counters.setdefault(name, {})
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        with self._lock:
+            self._kinds[name] = ("histogram", help_text)
+            self._histograms.setdefault(name, {})
+            self._buckets[name] = tuple(sorted(buckets))
+
+    def inc(self, name: str, labels: Optional[Dict[str, Any]] = None, value: float = 1.0) -> None:
+        key = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None) -> None:
+        key = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            buckets = self._buckets[name]
+            series = self._histograms[name].setdefault(key, [[0] * len(buckets), 0.0, 0])
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def value(self, name: str, labels: Optional[Dict[str, Any]] = None) -> float:
+        """A counter's current value (0 if the series does not exist yet)."""
+        with self._lock:
+            return self._counters.get(name, {}).get(tuple(sorted((labels or {}).items())), 0.0)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in sorted(self._kinds.items()):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "counter":
+                    for labels, value in sorted(self._counters[name].items()):
+                        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+                    continue
+                buckets = self._buckets[name]
+                for labels, (counts, total, count) in sorted(self._histograms[name].items()):
+                    for bound, bucket_count in zip(buckets, counts):
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', f'{bound:g}'),))} {bucket_count}")
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {total:g}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+metrics.counter("pipeline_requests_total", "Traced /process and /chat requests, by pipeline")
+metrics.histogram("pipeline_request_seconds", "End-to-end request latency, by pipeline")
+metrics.counter("llm_calls_total", "Model calls, by pipeline, model and status")
+metrics.counter("llm_tokens_total", "Model tokens, by pipeline, model and direction (input/output)")
+metrics.histogram("llm_call_seconds", "Model call latency, by pipeline and model")
+metrics.counter("tool_calls_total", "Tool calls, by pipeline (process, chat, or mcp for calls served by the MCP server), tool and status")
+metrics.histogram("tool_call_seconds", "Tool call latency, by pipeline and tool")
+
+
+def observe_tool_call(pipeline: str, tool: str, seconds: float, error: Optional[str] = None,
+                      registry: MetricsRegistry = metrics) -> None:
+    registry.inc("tool_calls_total", {"pipeline": pipeline, "tool": tool, "status": "error" if error else "ok"})
+    registry.observe("tool_call_seconds", seconds, {"pipeline": pipeline, "tool": tool})
+
+
+class Trace:
+    """
+    Spans of one request through an agent pipeline ("process" or "chat").
+
+    Model and tool calls are recorded as spans and counted into `metrics` as they finish;
+    `summary()` totals them for the process log and `finish()` closes the request.
+    """
+
+    def __init__(self, pipeline: str, correlation_id: Optional[str] = None, registry: MetricsRegistry = metrics):
+        self.pipeline = pipeline
+        self.correlation_id = correlation_id
+        self.registry = registry
+        self.started = time.monotonic()
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._finished: Optional[Dict[str, Any]] = None
+
+    def record(self, kind: str, name: str, seconds: float, input_tokens: int = 0, output_tokens: int = 0,
+               error: Optional[str] = None) -> None:
+        """Add a finished "llm" or "tool" span."""
+        span = {"kind": kind, "name": name, "ms": round(seconds * 1000, 1)}
+        if kind == "llm":
+            span.update(input_tokens=input_tokens, output_tokens=output_tokens)
+        if error:
+            span["error"] = error
+        with self._lock:
+            self.spans.append(span)
+
+        status = "error" if error else "ok"
+        if kind == "llm":
+            labels = {"pipeline": self.pipeline, "model": name}
+            self.registry.inc("llm_calls_total", {**labels, "status": status})
+            self.registry.inc("llm_tokens_total", {**labels, "direction": "input"}, input_tokens)
+            self.registry.inc("llm_tokens_total", {**labels, "direction": "output"}, output_tokens)
+            self.registry.observe("llm_call_seconds", seconds, labels)
+        else:
+            observe_tool_call(self.pipeline, name, seconds, error, self.registry)
+
+    def callbacks(self) -> List[BaseCallbackHandler]:
+        """Callback handlers to pass in an agent's run config."""
+        return [TracingCallbackHandler(self)]
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = list(self.spans)
+        llm = [s for s in spans if s["kind"] == "llm"]
+        tools = [s for s in spans if s["kind"] == "tool"]
+        return {
+            "llm_calls": len(llm),
+            "tool_calls": len(tools),
+            "input_tokens": sum(s["input_tokens"] for s in llm),
+            "output_tokens": sum(s["output_tokens"] for s in llm),
+            "llm_ms": round(sum(s["ms"] for s in llm), 1),
+            "tool_ms": round(sum(s["ms"] for s in tools), 1),
+            "total_ms": round((time.monotonic() - self.started) * 1000, 1),
+            "spans": spans
+        }
+
+    def finish(self) -> Dict[str, Any]:
+        """Count the request once and return its summary."""
+        with self._lock:
+            finished = self._finished
+        if finished is not None:
+            return finished
+        summary = self.summary()
+        with self._lock:
+            self._finished = summary
+        self.registry.inc("pipeline_requests_total", {"pipeline": self.pipeline})
+        self.registry.observe("pipeline_request_seconds", summary["total_ms"] / 1000, {"pipeline": self.pipeline})
+        logger.info(f"{self.pipeline} {self.correlation_id or ''}: {summary['llm_calls']} model calls, "
+                    f"{summary['tool_calls']} tool calls, {summary['input_tokens']}/{summary['output_tokens']} tokens "
+                    f"in/out, {summary['total_ms']:.0f} ms")
+        return summary
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Records each model and tool call of a LangChain run as a span of `trace`."""
+
+    # Runs on the event loop instead of a worker thread; the handler only appends to lists
+    run_inline = True
+
+    def __init__(self, trace: Trace):
+        self.trace = trace
+        self._started: Dict[UUID, Tuple[str, float]] = {}
+
+    def _start(self, run_id: UUID, name: str) -> None:
+        self._started[run_id] = (name, time.monotonic())
+
+    def _stop(self, run_id: UUID) -> Tuple[str, float]:
+        name, started = self._started.pop(run_id, ("unknown", time.monotonic()))
+        return name, time.monotonic() - started
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs) -> None:
+        self._start(run_id, (metadata or {}).get("ls_model_name") or "unknown")
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, metadata=None, **kwargs) -> None:
+        self._start(run_id, (metadata or {}).get("ls_model_name") or "unknown")
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs) -> None:
+        name, seconds = self._stop(run_id)
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+        self.trace.record("llm", name, seconds, input_tokens, output_tokens)
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs) -> None:
+        name, seconds = self._stop(run_id)
+        self.trace.record("llm", name, seconds, error=str(error))
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, **kwargs) -> None:
+        self._start(run_id, (serialized or {}).get("name") or kwargs.get("name") or "unknown")
+
+    def on_tool_end(self, output, *, run_id: UUID, **kwargs) -> None:
+        name, seconds = self._stop(run_id)
+        self.trace.record("tool", name, seconds)
+
+    def on_tool_error(self, error, *, run_id: UUID, **kwargs) -> None:
+        name, seconds = self._stop(run_id)
+        self.trace.record("tool", name, seconds, error=str(error))
@@ -0,0 +1,63 @@
+import sys
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+# Compares the old add_all + refresh-per-row bulk create with the multi-row INSERT ... RETURNING path.
+# Run against the configured database: python tests/bench_bulk_create.py [rows] [chunk_size]
+from sqlalchemy import text
+from api.repository.database import SessionLocal
+from api.repository.db_models import Account
+from api.repository.bulk import bulk_insert
+
+
+def make_accounts(client_id: int, rows: int, prefix: str):
+    return [
+        Account(client_id=client_id, account_name=f"Bench {i}", account_number=f"{prefix}{i:08d}",
+                account_balance=100, account_fee_balance=0)
+        for i in range(rows)
+    ]
+
+
+def legacy_bulk_create(db, accounts):
+    db.add_all(accounts)
+    db.commit()
+    for account in accounts:
+        db.refresh(account)
+    return accounts
+
+
+def run(rows: int, chunk_size: int):
+    db = SessionLocal()
+    client_id = db.execute(text("INSERT INTO client (name) VALUES ('bulk benchmark') RETURNING id")).scalar()
+    db.commit()
+    try:
+        start = time.perf_counter()
+        legacy = legacy_bulk_create(db, make_accounts(client_id, rows, "L"))
+        legacy_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        created = bulk_insert(db, Account, make_accounts(client_id, rows, "B"), chunk_size)
+        db.commit()
+        bulk_seconds = time.perf_counter() - start
+
+        assert [a.account_number for a in created] == [f"B{i:08d}" for i in range(rows)]
+        assert all(a.id for a in created) and len(legacy) == rows
+
+        print(f"rows={rows} chunk_size={chunk_size}")
+        print(f"add_all + refresh : {legacy_seconds:8.3f}s  ({rows / legacy_seconds:10.0f} rows/s)")
+        print(f"INSERT RETURNING  : {bulk_seconds:8.3f}s  ({rows / bulk_seconds:10.0f} rows/s)")
+        print(f"speedup           : {legacy_seconds / bulk_seconds:8.1f}x")
+    finally:
+        db.rollback()
+        db.execute(text("DELETE FROM client WHERE id = :id"), {"id": client_id})
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    run(rows, chunk_size)
@@ -1,6 +1,8 @@
 import unittest
 from unittest.mock import MagicMock
-from api.repository.account import AccountRepository, Account
+from decimal import Decimal
+from api.repository.account import AccountRepository, Account, ingest_payload
+from api.repository.final_response import FinalResponse
 
 class TestAccountRepository(unittest.TestCase):
     def setUp(self):
@@ -25,5 +27,23 @@ class TestAccountRepository(unittest.TestCase):
         
         self.assertEqual(result, mock_accounts)
 
+    def test_ingest_payload_keeps_only_valid_rows(self):
+        final_response = FinalResponse(client_id=3, client_name="Jio", process_type=1, extracted_fields=[
+            {"customer_name": "John", "customer_account": "111", "amount_paid": 50, "balance_amount": 150.1},
+            {"customer_name": "Bad", "customer_account": "222", "amount_paid": 1, "balance_amount": 2,
+             "field_validations": [{"message": "Account already exists"}]},
+        ])
+
+        payload = ingest_payload(final_response)
+
+        self.assertEqual(payload, {
+            "client_id": 3,
+            "process_type": 1,
+            "account_numbers": ["111"],
+            "account_names": ["John"],
+            "balance_amounts": [Decimal("150.1")],
+            "amounts_paid": [Decimal("50.0")]
+        })
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+# Add src to path so 'api' package is importable
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import unittest
+from unittest.mock import PropertyMock, patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from api.repository.db_models import Account
+from api.repository.account import AccountRepository
+from api.config import Config
+
+class TestBulkInsert(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite:///:memory:")
+        Account.__table__.create(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def test_ids_returned_in_input_order_across_chunks(self):
+        accounts = [Account(client_id=1, account_name=f"n{i}", account_number=f"{i:04d}") for i in range(7)]
+
+        with patch.object(Config, "bulk_chunk_size", new_callable=PropertyMock, return_value=3):
+            created = AccountRepository(self.db).bulk_create(accounts)
+
+        self.assertEqual([a.account_number for a in created], [f"{i:04d}" for i in range(7)])
+        self.assertEqual(len({a.id for a in created}), 7)
+        stored = {a.account_number: a.id for a in self.db.query(Account).all()}
+        self.assertEqual({a.account_number: a.id for a in created}, stored)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+# Add src to path so 'api' package is importable
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy.exc import IntegrityError
+from api.repository.bulk_upload import iter_csv, iter_ndjson
+
+async def stream(text: str, size: int = 5):
+    data = text.encode("utf-8")
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+async def collect(rows):
+    return [row async for row in rows]
+
+class TestBulkUploadParsing(unittest.IsolatedAsyncioTestCase):
+    async def test_csv_rows_split_across_chunks(self):
+        text = 'client_id,account_name,account_number\r\n1,"Doe, John",0012\r\n1,"two\nlines",\r\n1,only\r\n'
+
+        rows = await collect(iter_csv(stream(text)))
+
+        self.assertEqual(rows[0], (1, {"client_id": "1", "account_name": "Doe, John", "account_number": "0012"}, None))
+        self.assertEqual(rows[1], (2, {"client_id": "1", "account_name": "two\nlines", "account_number": None}, None))
+        self.assertEqual(rows[2], (3, None, "Expected 3 columns, got 2"))
+
+    async def test_ndjson_reports_bad_lines_and_skips_blank_ones(self):
+        text = '{"client_id": 1, "account_name": "José"}\n\n{bad\n[1]\n{"client_id": 2}'
+
+        rows = await collect(iter_ndjson(stream(text, size=3)))
+
+        self.assertEqual(rows[0], (1, {"client_id": 1, "account_name": "José"}, None))
+        self.assertEqual(rows[1][0], 2)
+        self.assertTrue(rows[1][2].startswith("Invalid JSON"))
+        self.assertEqual(rows[2], (3, None, "Expected a JSON object"))
+        self.assertEqual(rows[3], (4, {"client_id": 2}, None))
+
+class TestBulkUploadRoute(unittest.IsolatedAsyncioTestCase):
+    async def test_failed_chunk_is_retried_row_by_row(self):
+        from api.repository.account_routes import bulk_upload_accounts
+
+        duplicate = IntegrityError("INSERT", {}, Exception("duplicate key value violates unique constraint\nDETAIL: ..."))
+        repo = MagicMock()
+        repo.bulk_create = AsyncMock(side_effect=duplicate)
+        repo.create = AsyncMock(side_effect=lambda account: _raise(duplicate) if account.account_number == "222" else account)
+        request = MagicMock()
+        request.headers = {"content-type": "application/x-ndjson"}
+        request.stream = lambda: stream(
+            '{"client_id": 1, "account_number": "111"}\n{"client_id": 1, "account_number": "222"}\n'
+            '{"client_id": 1, "account_number": "333"}\n')
+
+        with patch('api.repository.account_routes.AsyncAccountRepository', return_value=repo):
+            result = await bulk_upload_accounts(request, db=MagicMock())
+
+        self.assertEqual((result["inserted"], result["failed"]), (2, 1))
+        self.assertEqual(result["errors"], [{"row": 2, "error": "Database error: duplicate key value violates unique constraint"}])
+        self.assertEqual([c.args[0].account_number for c in repo.create.await_args_list], ["111", "222", "333"])
+
+def _raise(error):
+    raise error
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import sys
+from pathlib import Path
+# Add src to path so 'api' package is importable
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import unittest
+from unittest.mock import MagicMock, AsyncMock
+import numpy as np
+from api.genai.embeddings import CachedEmbeddings, embedding_key, QUERY, DOCUMENT
+
+def make_inner():
+    inner = MagicMock()
+    inner.embed_query.side_effect = lambda text: [float(len(text)), 1.0]
+    inner.embed_documents.side_effect = lambda texts: [[float(len(t)), 2.0] for t in texts]
+    return inner
+
+class TestCachedEmbeddings(unittest.TestCase):
+    def test_repeated_query_is_served_from_memory(self):
+        inner = make_inner()
+        cache = CachedEmbeddings(inner, model="m")
+
+        first = cache.embed_query("overdue accounts")
+        second = cache.embed_query("overdue accounts")
+
+        self.assertEqual(first, second)
+        inner.embed_query.assert_called_once_with("overdue accounts")
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["remote_calls"]), (1, 1, 1))
+
+    def test_documents_embed_only_unseen_texts_once(self):
+        inner = make_inner()
+        cache = CachedEmbeddings(inner, model="m")
+        cache.embed_documents(["a"])
+
+        vectors = cache.embed_documents(["a", "bb", "bb"])
+
+        self.assertEqual(vectors, [[1.0, 2.0], [2.0, 2.0], [2.0, 2.0]])
+        inner.embed_documents.assert_called_with(["bb"])
+
+    def test_query_and_document_keys_differ_and_lru_evicts(self):
+        self.assertNotEqual(embedding_key("m", QUERY, "x"), embedding_key("m", DOCUMENT, "x"))
+        inner = make_inner()
+        cache = CachedEmbeddings(inner, model="m", maxsize=1)
+
+        cache.embed_query("a")
+        cache.embed_query("b")
+        cache.embed_query("a")
+
+        self.assertEqual(inner.embed_query.call_count, 3)
+        self.assertEqual(cache.stats()["size"], 1)
+
+    def test_persistent_tier_is_read_before_the_model_and_written_after(self):
+        inner = make_inner()
+        store = MagicMock()
+        stored = {embedding_key("m", QUERY, "known"): np.array([9, 9], dtype=np.float32)}
+        store.get_many.side_effect = lambda keys: {k: stored[k] for k in keys if k in stored}
+        cache = CachedEmbeddings(inner, model="m", store=store)
+
+        self.assertEqual(cache.embed_query("known"), [9.0, 9.0])
+        cache.embed_query("new")
+
+        inner.embed_query.assert_called_once_with("new")
+        model, written = store.put_many.call_args.args
+        self.assertEqual((model, list(written)), ("m", [embedding_key("m", QUERY, "new")]))
+        self.assertEqual(cache.stats()["store_hits"], 1)
+
+class TestCachedEmbeddingsAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_aembed_query_uses_cache(self):
+        inner = MagicMock()
+        inner.aembed_query = AsyncMock(return_value=[0.5, 0.5])
+        cache = CachedEmbeddings(inner, model="m")
+
+        await cache.aembed_query("q")
+        self.assertEqual(await cache.aembed_query("q"), [0.5, 0.5])
+
+        inner.aembed_query.assert_awaited_once_with("q")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import sys
+from pathlib import Path
+# Add src to path so 'api' package is importable
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import asyncio
+import unittest
+from unittest.mock import MagicMock
+from api.genai.embedding_pipeline import EmbeddingPipeline, TokenBucket
+
+class FlakyEmbeddings:
+    """Fails the first `failures` calls, then embeds each text as [len(text)]."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = []
+
+    async def aembed_documents(self, texts):
+        self.calls.append(list(texts))
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("429 quota exceeded")
+        return [[float(len(t))] for t in texts]
+
+class LoopBoundEmbeddings(FlakyEmbeddings):
+    """Like the grpc.aio client: the async API only works on the event loop that first used it."""
+
+    def __init__(self):
+        super().__init__()
+        self.loop = None
+
+    async def aembed_documents(self, texts):
+        loop = asyncio.get_running_loop()
+        self.loop = self.loop or loop
+        if loop is not self.loop:
+            raise RuntimeError("Event loop is closed")
+        return await super().aembed_documents(texts)
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+def make_pipeline(embeddings, **kwargs):
+    return EmbeddingPipeline(embeddings, chunk_size=2, concurrency=2, max_retries=kwargs.pop("max_retries", 3),
+                             rate_limiter=TokenBucket(rate=1000, capacity=1000), base_delay=0, **kwargs)
+
+class TestTokenBucket(unittest.TestCase):
+    def test_reserve_waits_for_the_deficit(self):
+        bucket = TokenBucket(rate=2, capacity=2)
+
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.5, places=2)
+        self.assertAlmostEqual(bucket.reserve(), 1.0, places=2)
+
+class TestEmbeddingPipeline(unittest.IsolatedAsyncioTestCase):
+    async def test_chunks_keep_input_order_and_report_progress(self):
+        embeddings = FlakyEmbeddings()
+        progress = MagicMock()
+
+        vectors = await make_pipeline(embeddings).aembed(["a", "bb", "ccc", "dddd", "e"], progress)
+
+        self.assertEqual(vectors, [[1.0], [2.0], [3.0], [4.0], [1.0]])
+        self.assertEqual(sorted(len(c) for c in embeddings.calls), [1, 2, 2])
+        self.assertEqual(progress.call_args.args, (5, 5))
+
+    async def test_retries_failed_chunks(self):
+        embeddings = FlakyEmbeddings(failures=2)
+
+        vectors = await make_pipeline(embeddings).aembed(["a", "bb"])
+
+        self.assertEqual(vectors, [[1.0], [2.0]])
+        self.assertEqual(len(embeddings.calls), 3)
+
+    async def test_gives_up_after_max_retries(self):
+        embeddings = FlakyEmbeddings(failures=5)
+
+        with self.assertRaises(RuntimeError):
+            await make_pipeline(embeddings, max_retries=1).aembed(["a"])
+        self.assertEqual(len(embeddings.calls), 2)
+
+class TestBlockingEmbed(unittest.TestCase):
+    def test_embed_can_be_called_repeatedly_in_one_process(self):
+        embeddings = LoopBoundEmbeddings()
+        pipeline = make_pipeline(embeddings)
+        asyncio.run(pipeline.aembed(["warm"]))
+        progress = MagicMock()
+
+        first = pipeline.embed(["a", "bb", "ccc"], progress)
+        second = pipeline.embed(["dddd"])
+
+        self.assertEqual((first, second), ([[1.0], [2.0], [3.0]], [[4.0]]))
+        self.assertEqual(progress.call_args.args, (3, 3))
+
+if __name__ == '__main__':
+    unittest.main()
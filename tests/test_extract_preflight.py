@@ -0,0 +1,56 @@
+import sys
+from pathlib import Path
+# Add src to path so 'api' package is importable
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import unittest
+from unittest.mock import MagicMock, patch
+from api.genai.extract import Extract
+from api.repository.models import MailRequest
+
+class TestExtractPreflight(unittest.TestCase):
+    def setUp(self):
+        self.extractor = Extract()
+
+    def test_invalid_subject_short_circuits(self):
+        request = MailRequest(from_address="a@b.com", subject="Hello", content="Jio Mobile")
+
+        result = self.extractor.prepare(request)
+
+        self.assertIn("error", result)
+        self.assertIn("ProcessType not identified", result["error"])
+
+    @patch('api.genai.extract.SessionLocal')
+    @patch('api.genai.extract.ClientRepository')
+    def test_unknown_client_short_circuits(self, MockRepo, MockSession):
+        MockRepo.return_value.find_mentioned_in.return_value = None
+        request = MailRequest(from_address="a@b.com", subject="Placement Processing", content="Unknown Co")
+
+        result = self.extractor.prepare(request)
+
+        self.assertEqual(result, {"error": "Client verification failed: Client not found."})
+        MockSession.return_value.close.assert_called()
+
+    @patch('api.genai.extract.ClientRuleEmbedding')
+    @patch('api.genai.extract.SessionLocal')
+    @patch('api.genai.extract.ClientRepository')
+    def test_context_contains_client_and_rules(self, MockRepo, MockSession, MockRules):
+        client = MagicMock()
+        client.id = 7
+        client.name = "Jio Mobile"
+        MockRepo.return_value.find_mentioned_in.return_value = client
+        MockRules.return_value.search_rules.return_value = {
+            "success": True,
+            "results": [{"rule_id": 1, "client_id": 7, "process_type": "Transaction", "rule_content": "Account number is required", "is_auto_apply": True}]
+        }
+        request = MailRequest(from_address="a@b.com", subject="Transaction file", content="Jio Mobile\nJohn, 1, 2, 3")
+
+        result = self.extractor.prepare(request)
+
+        self.assertEqual(result["process_type"], 2)
+        self.assertEqual(result["client_id"], 7)
+        self.assertEqual(result["rules"], [{"rule_id": 1, "rule_content": "Account number is required", "is_auto_apply": True}])
+        MockRules.return_value.search_rules.assert_called_with(2, return_all=True, k=100, include_embeddings=False)
+
+if __name__ == '__main__':
+    unittest.main()
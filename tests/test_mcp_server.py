@@ -4,18 +4,20 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 import unittest
-from unittest.mock import MagicMock, patch
-from api.mcp_server_1 import get_all_accounts, bulk_create_accounts, get_all_transactions, bulk_create_transactions
+from unittest.mock import AsyncMock, MagicMock, patch
+from api.mcp_server_1 import get_all_accounts, bulk_create_accounts, get_all_transactions, bulk_create_transactions, accounts_urc_check
+from api.repository.final_response import FinalResponse
 from api.repository.models import Account, AccountTransaction
 from decimal import Decimal
 
-class TestMCPServer(unittest.TestCase):
-    @patch('api.mcp_server_1.SessionLocal')
-    @patch('api.mcp_server_1.AccountRepository')
-    def test_get_all_accounts(self, MockRepo, MockSession):
-        mock_db = MagicMock()
+class TestMCPServer(unittest.IsolatedAsyncioTestCase):
+    @patch('api.mcp_server_1.AsyncSessionLocal')
+    @patch('api.mcp_server_1.AsyncAccountRepository')
+    async def test_get_all_accounts(self, MockRepo, MockSession):
+        mock_db = AsyncMock()
         MockSession.return_value = mock_db
         mock_repo = MockRepo.return_value
+        mock_repo.list = AsyncMock()
         
         # Mock return value
         mock_account = MagicMock()
@@ -29,18 +31,20 @@ class TestMCPServer(unittest.TestCase):
         
         mock_repo.list.return_value = [mock_account]
         
-        result = get_all_accounts()
+        result = await get_all_accounts()
         
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0]['account_number'], "12345")
-        mock_repo.list.assert_called_once()
+        mock_repo.list.assert_awaited_once()
+        mock_db.close.assert_awaited_once()
 
-    @patch('api.mcp_server_1.SessionLocal')
-    @patch('api.mcp_server_1.AccountTransactionRepository')
-    def test_get_all_transactions(self, MockRepo, MockSession):
-        mock_db = MagicMock()
+    @patch('api.mcp_server_1.AsyncSessionLocal')
+    @patch('api.mcp_server_1.AsyncAccountTransactionRepository')
+    async def test_get_all_transactions(self, MockRepo, MockSession):
+        mock_db = AsyncMock()
         MockSession.return_value = mock_db
         mock_repo = MockRepo.return_value
+        mock_repo.list = AsyncMock()
         
         mock_tx = MagicMock()
         mock_tx.id = 1
@@ -51,10 +55,29 @@ class TestMCPServer(unittest.TestCase):
         
         mock_repo.list.return_value = [mock_tx]
         
-        result = get_all_transactions()
+        result = await get_all_transactions()
         
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0]['transaction_amount'], Decimal("50.00"))
 
+    @patch('api.mcp_server_1.AsyncSessionLocal')
+    @patch('api.mcp_server_1.AsyncAccountRepository')
+    async def test_urc_check_flags_per_process_type(self, MockRepo, MockSession):
+        MockSession.return_value = AsyncMock()
+        mock_repo = MockRepo.return_value
+        mock_repo.account_exists_flags = AsyncMock(return_value=[True, False])
+
+        def final_response(process_type):
+            records = [{"customer_name": "A", "customer_account": n, "amount_paid": 1, "balance_amount": 2} for n in ("111", "222")]
+            return FinalResponse(client_id=7, client_name="Jio", process_type=process_type, extracted_fields=records)
+
+        placement = await accounts_urc_check(final_response(1))
+        transaction = await accounts_urc_check(final_response(2))
+
+        mock_repo.account_exists_flags.assert_awaited_with(7, ["111", "222"])
+        self.assertEqual([len(r.field_validations) for r in placement.extracted_fields], [1, 0])
+        self.assertEqual(placement.extracted_fields[0].field_validations[0].message, "Account already exists")
+        self.assertEqual([len(r.field_validations) for r in transaction.extracted_fields], [0, 1])
+
 if __name__ == '__main__':
     unittest.main()
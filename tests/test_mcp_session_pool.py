@@ -0,0 +1,68 @@
+import sys
+from pathlib import Path
+# Add src to path so 'api' package is importable
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import asyncio
+import unittest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+from api.genai.mcp_session_pool import MCPSessionPool
+
+class TestCallToolRetry(unittest.IsolatedAsyncioTestCase):
+    def pool_with_failing_first_call(self):
+        pool = MCPSessionPool({"transport": "streamable_http", "url": "http://mcp"}, idempotent_tools={"find_client"})
+        session = AsyncMock()
+        session.call_tool = AsyncMock(side_effect=[ConnectionError("connection reset"), {"ok": True}])
+
+        @asynccontextmanager
+        async def acquire():
+            yield session
+
+        pool.acquire = acquire
+        return pool, session
+
+    async def test_idempotent_tool_is_retried(self):
+        pool, session = self.pool_with_failing_first_call()
+
+        self.assertEqual(await pool.call_tool("find_client", {"name": "ABC"}), {"ok": True})
+        self.assertEqual(session.call_tool.await_count, 2)
+
+    async def test_write_tool_is_not_retried(self):
+        pool, session = self.pool_with_failing_first_call()
+
+        with self.assertRaises(ConnectionError):
+            await pool.call_tool("save_process_log", {"process_log": {}})
+        self.assertEqual(session.call_tool.await_count, 1)
+
+class TestAcquire(unittest.IsolatedAsyncioTestCase):
+    def started_pool(self):
+        pool = MCPSessionPool({"transport": "streamable_http", "url": "http://mcp"})
+        pool._owners = [MagicMock()]
+        pool._available = asyncio.Queue()
+        pool._available.put_nowait("session")
+        pool._drop = MagicMock()
+        return pool
+
+    async def test_cancelled_caller_returns_the_session(self):
+        pool = self.started_pool()
+
+        with self.assertRaises(asyncio.CancelledError):
+            async with pool.acquire():
+                raise asyncio.CancelledError()
+
+        self.assertEqual(pool._available.get_nowait(), "session")
+        pool._drop.assert_not_called()
+
+    async def test_transport_error_drops_the_session(self):
+        pool = self.started_pool()
+
+        with self.assertRaises(ConnectionError):
+            async with pool.acquire():
+                raise ConnectionError("connection reset")
+
+        self.assertTrue(pool._available.empty())
+        pool._drop.assert_called_once_with("session")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import sys
+from pathlib import Path
+# Add src to path so 'api' package is importable
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import asyncio
+import unittest
+from api.genai.extract import Extract
+from api.repository.models import MailRequest
+
+class TestProcessBatch(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.extractor = Extract()
+        self.extractor._slots = asyncio.Semaphore(2)
+        self.running = 0
+        self.max_running = 0
+
+        async def fake_process(request, correlation_id):
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            try:
+                # Later emails finish first
+                await asyncio.sleep(0.01 * (5 - int(request.content)))
+                if request.content == "3":
+                    raise RuntimeError("agent failed")
+                return {"content": request.content}
+            finally:
+                self.running -= 1
+
+        self.extractor._process = fake_process
+
+    async def test_bounded_concurrency_and_per_email_results(self):
+        requests = [MailRequest(from_address="a@b.com", subject="Placement", content=str(i)) for i in range(5)]
+
+        results = [r async for r in self.extractor.process_batch(requests)]
+
+        self.assertEqual(len(results), 5)
+        self.assertLessEqual(self.max_running, 2)
+        self.assertEqual(len({r["correlation_id"] for r in results}), 5)
+        failed = [r for r in results if "error" in r]
+        self.assertEqual(failed, [{"index": 3, "correlation_id": failed[0]["correlation_id"], "error": "agent failed"}])
+        self.assertEqual(sorted(r["index"] for r in results), [0, 1, 2, 3, 4])
+
+if __name__ == '__main__':
+    unittest.main()
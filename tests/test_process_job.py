@@ -0,0 +1,99 @@
+import sys
+from pathlib import Path
+# Add src to path so 'api' package is importable
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import asyncio
+import unittest
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+from api.repository.db_models import ProcessJobTable
+from api.repository.models import MailRequest
+from api.repository.process_job_repository import ProcessJobRepository, QUEUED, DONE, content_hash, _lock_key
+
+EMAIL = MailRequest(from_address="a@b.com", subject="Placement Processing", content="Jio Mobile\n1")
+
+def mock_session(existing=None):
+    """An AsyncSession whose dedup lookup finds `existing` (None when nothing matches within the window)."""
+    db = MagicMock()
+    lookup = MagicMock()
+    lookup.scalars.return_value.first.return_value = existing
+    db.execute = AsyncMock(side_effect=[MagicMock(), lookup])
+    db.commit = AsyncMock()
+    db.refresh = AsyncMock()
+    return db
+
+class TestProcessJobHash(unittest.TestCase):
+    def test_resent_email_has_same_hash(self):
+        first = MailRequest(from_address="a@b.com", subject="Placement Processing", content="Jio Mobile\n1")
+        resent = MailRequest(from_address="a@b.com", subject="Placement Processing", content="Jio Mobile\n1")
+
+        self.assertEqual(content_hash(first), content_hash(resent))
+        self.assertEqual(len(content_hash(first)), 64)
+
+    def test_field_boundaries_are_part_of_the_hash(self):
+        a = MailRequest(from_address="a", subject="bc", content="d")
+        b = MailRequest(from_address="ab", subject="c", content="d")
+
+        self.assertNotEqual(content_hash(a), content_hash(b))
+
+    def test_lock_key_fits_signed_bigint(self):
+        key = _lock_key("f" * 64)
+
+        self.assertGreaterEqual(key, -2**63)
+        self.assertLess(key, 2**63)
+
+class TestEnqueueDedup(unittest.IsolatedAsyncioTestCase):
+    async def test_resent_email_within_window_returns_existing_job(self):
+        existing = ProcessJobTable(id=5, correlation_id="c-1", content_hash=content_hash(EMAIL), status=DONE)
+        db = mock_session(existing)
+
+        job, created = await ProcessJobRepository(db).enqueue(EMAIL, "c-2", dedup_window_seconds=60)
+
+        self.assertIs(job, existing)
+        self.assertFalse(created)
+        db.add.assert_not_called()
+        db.commit.assert_awaited_once()
+
+    async def test_email_outside_window_creates_new_job(self):
+        db = mock_session(None)
+
+        job, created = await ProcessJobRepository(db).enqueue(EMAIL, "c-2", dedup_window_seconds=60)
+
+        self.assertTrue(created)
+        db.add.assert_called_once_with(job)
+        self.assertEqual((job.correlation_id, job.status, job.content_hash), ("c-2", QUEUED, content_hash(EMAIL)))
+        lookup = db.execute.await_args_list[1].args[0].compile()
+        self.assertIn(timedelta(seconds=60), lookup.params.values())
+        self.assertEqual(db.execute.await_args_list[0].args[1], {"key": _lock_key(content_hash(EMAIL))})
+
+    async def test_no_window_skips_lookup(self):
+        db = mock_session()
+
+        job, created = await ProcessJobRepository(db).enqueue(EMAIL, "c-2")
+
+        self.assertTrue(created)
+        db.execute.assert_not_awaited()
+
+class TestJobHeartbeat(unittest.IsolatedAsyncioTestCase):
+    async def test_running_jobs_are_refreshed_until_the_block_ends(self):
+        from api.process_worker import job_heartbeat
+
+        repo = MagicMock()
+        repo.heartbeat = AsyncMock()
+        with patch('api.process_worker.AsyncSessionLocal', MagicMock()), \
+                patch('api.process_worker.ProcessJobRepository', return_value=repo):
+            async with job_heartbeat({7}, interval=0.01):
+                for _ in range(500):
+                    if repo.heartbeat.await_count >= 2:
+                        break
+                    await asyncio.sleep(0.01)
+            beats = repo.heartbeat.await_count
+            await asyncio.sleep(0.03)
+
+        self.assertGreaterEqual(beats, 2)
+        self.assertEqual(repo.heartbeat.await_count, beats)
+        repo.heartbeat.assert_awaited_with([7])
+
+if __name__ == '__main__':
+    unittest.main()
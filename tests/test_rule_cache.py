@@ -0,0 +1,62 @@
+import sys
+from pathlib import Path
+# Add src to path so 'api' package is importable
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import unittest
+from unittest.mock import patch
+from api.repository.rule_cache import RuleSetCache
+from api.repository.process_type import ProcessType
+
+class TestRuleSetCache(unittest.TestCase):
+    def test_hit_and_miss_counters(self):
+        cache = RuleSetCache(maxsize=10, ttl=60)
+        self.assertIsNone(cache.get(1, 1))
+        cache.put(1, ProcessType.Placement, [{"rule_id": 1}])
+
+        self.assertEqual(cache.get(1, 1), [{"rule_id": 1}])
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_lru_eviction(self):
+        cache = RuleSetCache(maxsize=2, ttl=60)
+        cache.put(1, 1, [])
+        cache.put(2, 1, [])
+        cache.get(1, 1)
+        cache.put(3, 1, [])
+
+        self.assertIsNone(cache.get(2, 1))
+        self.assertIsNotNone(cache.get(1, 1))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_ttl_expiry(self):
+        cache = RuleSetCache(maxsize=10, ttl=5)
+        with patch('api.repository.rule_cache.time.monotonic', return_value=100.0):
+            cache.put(1, 1, [])
+        with patch('api.repository.rule_cache.time.monotonic', return_value=106.0):
+            self.assertIsNone(cache.get(1, 1))
+
+    def test_invalidate_drops_all_process_types_and_compiled_sets(self):
+        cache = RuleSetCache(maxsize=10, ttl=60)
+        cache.put(1, 1, [])
+        cache.put(1, 2, [])
+        cache.put(2, 1, [])
+        self.assertEqual(cache.get_compiled(1, 1, lambda: "compiled"), "compiled")
+        self.assertEqual(cache.get_compiled(1, 1, lambda: "rebuilt"), "compiled")
+
+        cache.invalidate(1)
+
+        self.assertIsNone(cache.get(1, 1))
+        self.assertIsNone(cache.get(1, 2))
+        self.assertIsNotNone(cache.get(2, 1))
+
+    def test_put_after_concurrent_invalidation_is_ignored(self):
+        cache = RuleSetCache(maxsize=10, ttl=60)
+        version = cache.version(1)
+        cache.invalidate(1)
+        cache.put(1, 1, [{"rule_id": 1}], version)
+
+        self.assertIsNone(cache.get(1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import sys
+from pathlib import Path
+# Add src to path so 'api' package is importable
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import json
+import unittest
+from api.genai.rule_engine import compact_rules, compile_rules, compile_rule_content, detect_field
+from api.repository.final_response import ExtractedField
+
+def rule(rule_id, content):
+    return {"rule_id": rule_id, "rule_content": content, "is_auto_apply": True}
+
+def record(name, account, paid, balance):
+    return ExtractedField(customer_name=name, customer_account=account, amount_paid=paid, balance_amount=balance)
+
+class TestRuleEngine(unittest.TestCase):
+    def test_detect_field(self):
+        self.assertEqual(detect_field("Account number max length 20"), "customer_account")
+        self.assertEqual(detect_field("Customer name is required"), "customer_name")
+        self.assertEqual(detect_field("Balance amount must not be negative"), "balance_amount")
+        self.assertEqual(detect_field("Minimum amount paid 10"), "amount_paid")
+        self.assertEqual(detect_field("Name is required"), "customer_name")
+
+    def test_detect_field_prefers_phrases_and_refuses_to_guess(self):
+        self.assertEqual(detect_field("Minimum amount paid per account is 50"), "amount_paid")
+        self.assertEqual(detect_field("Balance amount of the account must not be negative"), "balance_amount")
+        self.assertIsNone(detect_field("Amount paid must not exceed balance amount"))
+        self.assertIsNone(detect_field("Account balance is required"))
+
+    def test_uncompilable_rules_are_kept_for_the_llm(self):
+        rule_set = compile_rules([rule(1, "Fee Limit"), rule(2, "Customer name is required")])
+
+        self.assertEqual([r["rule_id"] for r in rule_set.uncompiled], [1])
+        self.assertEqual(len(rule_set.validations), 1)
+
+    def test_transformations_run_before_validations(self):
+        rule_set = compile_rules([
+            rule(1, "Account number max length 11"),
+            rule(2, "Remove spaces and special characters from account number"),
+        ])
+        records = [record("John Doe", "12064& 654654", 50, 150), record("Robert T", "0987654328777", 9, 300)]
+
+        rule_set.apply(records)
+
+        self.assertEqual(records[0].customer_account, "12064654654")
+        self.assertEqual(records[0].transformtion_rules[0].status, "APPLIED")
+        self.assertEqual(records[0].validation_rules[0].status, "PASSED")
+        self.assertEqual(records[0].field_validations, [])
+        self.assertEqual(records[1].validation_rules[0].status, "FAILED")
+        self.assertIn("exceeds max_length 11", records[1].field_validations[0].message)
+
+    def test_amount_validations(self):
+        rule_set = compile_rules([
+            rule(1, "Minimum amount paid 10"),
+            rule(2, "Check negative balance amount"),
+            rule(3, "Customer name is required"),
+        ])
+        records = [record("", "1", 9, 251), record("John", "2", 300, 70)]
+
+        rule_set.apply(records)
+
+        self.assertEqual([r.status for r in records[0].validation_rules], ["FAILED", "PASSED", "FAILED"])
+        self.assertEqual([r.status for r in records[1].validation_rules], ["PASSED", "FAILED", "PASSED"])
+
+    def test_every_clause_of_a_rule_is_compiled(self):
+        operators = compile_rule_content("Account number is required and must not exceed 10 characters")
+
+        self.assertEqual([o.name for o in operators], ["max_length", "required"])
+
+        rule_set = compile_rules([rule(1, "Account number is required and must not exceed 10 characters")])
+        records = [record("John", "", 1, 1), record("Jane", "12345678901", 1, 1)]
+        rule_set.apply(records)
+
+        self.assertEqual([r.status for r in records[0].validation_rules], ["PASSED", "FAILED"])
+        self.assertEqual([r.status for r in records[1].validation_rules], ["FAILED", "PASSED"])
+
+    def test_a_clause_that_does_not_fit_leaves_the_rule_to_the_llm(self):
+        # "remove spaces" only applies to text fields
+        self.assertIsNone(compile_rule_content("Amount paid is required; remove spaces from amount paid"))
+
+    def test_invalid_regex_is_left_to_the_llm(self):
+        rule_set = compile_rules([rule(1, "Account number must match '[A-Z'"), rule(2, "Account number must match '[A-Z]+'")])
+
+        self.assertEqual([r["rule_id"] for r in rule_set.uncompiled], [1])
+        self.assertEqual(len(rule_set.validations), 1)
+
+    def test_must_not_be_and_cannot_be_phrasings(self):
+        for text in ("Balance amount must not be negative", "Balance amount cannot be negative", "Balance amount can't be negative"):
+            self.assertEqual([o.name for o in compile_rule_content(text)], ["non_negative"], text)
+        for text in ("Customer name must not be empty", "Customer name cannot be empty", "Customer name can't be blank"):
+            self.assertEqual([o.name for o in compile_rule_content(text)], ["required"], text)
+
+    def test_limits_with_thousands_separators(self):
+        rule_set = compile_rules([rule(1, "Amount paid must be at least 1,000"), rule(2, "Balance amount maximum 2,500.50, per statement")])
+        records = [record("John", "1", 999, 2500.5), record("Jane", "2", 1000, 2500.51)]
+
+        rule_set.apply(records)
+
+        self.assertEqual([r.status for r in records[0].validation_rules], ["FAILED", "PASSED"])
+        self.assertEqual([r.status for r in records[1].validation_rules], ["PASSED", "FAILED"])
+
+    def test_limits_that_are_not_a_length_or_amount_are_left_to_the_llm(self):
+        for text in ("Maximum 3 payments per account", "Customer name must have at least 2 words",
+                     "Amount paid maximum 2 times per month", "Minimum 1 transaction per account number"):
+            self.assertIsNone(compile_rule_content(text), text)
+        for text in ("Account number maximum 10 digits", "Customer name min length 3", "Balance amount at most 500 USD"):
+            self.assertIsNotNone(compile_rule_content(text), text)
+
+    def test_rules_not_auto_applied_are_left_to_the_llm(self):
+        manual = {**rule(2, "Remove leading zeros from account number"), "is_auto_apply": False}
+        rule_set = compile_rules([rule(1, "Customer name is required"), manual])
+
+        self.assertEqual(rule_set.uncompiled, [manual])
+        self.assertEqual(rule_set.transformations, [])
+
+    def test_compiled_operators_are_cached(self):
+        self.assertIs(compile_rule_content("Customer name is required"), compile_rule_content("Customer name is required"))
+
+class TestCompactRules(unittest.TestCase):
+    def setUp(self):
+        self.rules = [
+            {"rule_id": 1, "client_id": 7, "process_type": "Transaction", "rule_content": "Account number must match the client's account register", "is_auto_apply": True},
+            {"rule_id": 2, "client_id": 7, "process_type": "Transaction", "rule_content": "account number  must match the client's account register", "is_auto_apply": True},
+            {"rule_id": 3, "client_id": 7, "process_type": "Transaction", "rule_content": "Balance amount is rounded per the fee schedule", "is_auto_apply": False},
+            {"rule_id": 4, "client_id": 7, "process_type": "Transaction", "rule_content": "Fee Limit", "is_auto_apply": True},
+        ]
+
+    def test_grouped_by_field_and_deduplicated(self):
+        compact = compact_rules(self.rules)
+
+        self.assertEqual(compact, {
+            "customer_account": [{"id": 1, "rule": "Account number must match the client's account register"}],
+            "balance_amount": [{"id": 3, "rule": "Balance amount is rounded per the fee schedule", "auto": False}],
+            "other": [{"id": 4, "rule": "Fee Limit"}],
+        })
+        self.assertLess(len(json.dumps(compact)), len(json.dumps(self.rules)) / 2)
+
+    def test_only_rules_for_present_fields(self):
+        compact = compact_rules(self.rules, fields={"customer_account", "customer_name"})
+
+        self.assertEqual(sorted(compact), ["customer_account", "other"])
+
+    def test_rules_are_filed_under_the_field_they_name(self):
+        compact = compact_rules([rule(1, "Minimum amount paid per account is 50")], fields={"amount_paid"})
+
+        self.assertEqual(compact, {"amount_paid": [{"id": 1, "rule": "Minimum amount paid per account is 50"}]})
+
+if __name__ == '__main__':
+    unittest.main()
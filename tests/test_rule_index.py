@@ -0,0 +1,75 @@
+import sys
+from pathlib import Path
+# Add src to path so 'api' package is importable
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import base64
+import struct
+import time
+import unittest
+from unittest.mock import patch
+import numpy as np
+from api.repository.rule_cache import rule_cache
+from api.repository.rule_index import RuleVectorIndex, RuleIndexCache, decode_vector, encode_embedding
+
+def make_index(vectors):
+    rules = [{"rule_id": i + 1} for i in range(len(vectors))]
+    return RuleVectorIndex(rules, np.array(vectors, dtype=np.float32))
+
+class TestRuleVectorIndex(unittest.TestCase):
+    def test_search_orders_by_cosine_similarity(self):
+        index = make_index([[1, 0], [0, 1], [1, 1], [-1, 0]])
+
+        hits = index.search([2, 0.1], k=2)
+
+        self.assertEqual([row for row, _ in hits], [0, 2])
+        self.assertAlmostEqual(hits[0][1], 0.99875, places=4)
+
+    def test_k_larger_than_index_and_zero_vectors(self):
+        index = make_index([[0, 0], [0, 3]])
+
+        self.assertEqual([row for row, _ in index.search([0, 1], k=10)], [1, 0])
+        self.assertEqual(index.search([0, 0], k=1), [])
+        self.assertEqual(make_index(np.zeros((0, 2))).search([1, 0], k=3), [])
+
+    def test_decode_vector_reads_pgvector_binary_form(self):
+        data = struct.pack(">HH3f", 3, 0, 0.5, -1, 0.002)
+
+        vector = decode_vector(memoryview(data))
+
+        self.assertEqual(vector.dtype, np.float32)
+        np.testing.assert_array_equal(vector, np.array([0.5, -1, 0.002], dtype=np.float32))
+
+    def test_encode_embedding(self):
+        vector = np.array([0.5, -1, 0.25], dtype=np.float32)
+
+        self.assertEqual(encode_embedding(vector), [0.5, -1.0, 0.25])
+        decoded = np.frombuffer(base64.b64decode(encode_embedding(vector, "base64")), dtype="<f4")
+        np.testing.assert_array_equal(decoded, vector)
+
+class TestRuleIndexCache(unittest.TestCase):
+    def test_rebuilds_after_rule_change(self):
+        cache = RuleIndexCache(maxsize=2)
+        builds = []
+
+        def loader():
+            builds.append(1)
+            return make_index([[1, 0]])
+
+        first = cache.get(9101, 1, loader)
+        self.assertIs(cache.get(9101, 1, loader), first)
+        rule_cache.invalidate(9101)
+        self.assertIsNot(cache.get(9101, 1, loader), first)
+        self.assertEqual(len(builds), 2)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_entries_expire_after_ttl(self):
+        cache = RuleIndexCache(maxsize=2, ttl=60)
+        first = cache.get(9102, 1, lambda: make_index([[1, 0]]))
+
+        with patch('api.repository.rule_index.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertIsNot(cache.get(9102, 1, lambda: make_index([[1, 0]])), first)
+        self.assertEqual(cache.stats()["builds"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import sys
+from pathlib import Path
+# Add src to path so 'api' package is importable
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import unittest
+from unittest.mock import patch
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import StaticPool
+from api.chat_bot.sql_executor import SQLExecutor
+
+def make_engine(rows):
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE account (id INTEGER PRIMARY KEY, account_name TEXT)"))
+        connection.execute(text("INSERT INTO account (id, account_name) VALUES (:id, :name)"),
+                           [{"id": i, "name": f"Account {i}"} for i in range(1, rows + 1)])
+    return engine
+
+class TestSQLExecutor(unittest.TestCase):
+    def setUp(self):
+        patcher = patch('api.chat_bot.sql_executor.get_embeddings')
+        self.mock_embeddings = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def test_rows_are_capped_at_max_rows(self):
+        executor = SQLExecutor(engine=make_engine(25), max_rows=10, fetch_size=4)
+
+        rows = executor.execute_query("SELECT id, account_name FROM account ORDER BY id")
+
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows[0], {"id": 1, "account_name": "Account 1"})
+
+    def test_stream_query_returns_connection_when_closed(self):
+        engine = make_engine(5)
+        checkins = []
+        event.listen(engine, "checkin", lambda *args: checkins.append(1))
+        executor = SQLExecutor(engine=engine, max_rows=100)
+
+        stream = executor.stream_query("SELECT id FROM account ORDER BY id")
+        self.assertEqual(next(stream), {"id": 1})
+        self.assertEqual(checkins, [])
+        stream.close()
+
+        self.assertEqual(checkins, [1])
+
+    def test_rejects_writes(self):
+        executor = SQLExecutor(engine=make_engine(1))
+
+        with self.assertRaises(ValueError):
+            executor.execute_query("DELETE FROM account")
+        with self.assertRaises(ValueError):
+            executor.execute_query("select 1; update account set account_name = 'x'")
+
+    def test_column_names_containing_keywords_are_allowed(self):
+        executor = SQLExecutor(engine=make_engine(1))
+
+        rows = executor.execute_query("SELECT id AS updated_date, account_name AS deleted_flag FROM account")
+
+        self.assertEqual(rows, [{"updated_date": 1, "deleted_flag": "Account 1"}])
+
+    def test_embedding_function_is_substituted(self):
+        self.mock_embeddings.embed_query.return_value = [0.5, 0.25]
+        executor = SQLExecutor(engine=make_engine(1))
+
+        rows = executor.execute_query("SELECT EMBEDDING_FUNCTION('late payers') AS v")
+
+        self.assertEqual(rows, [{"v": "[0.5, 0.25]"}])
+        self.mock_embeddings.embed_query.assert_called_once_with("late payers")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import sys
+from pathlib import Path
+# Add src to path so 'api' package is importable
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import unittest
+from unittest.mock import MagicMock
+from pydantic import ValidationError
+from api.genai.extract import Extract
+from api.genai.structured_output import agent_output
+from api.repository.final_response import FinalResponse
+
+RESPONSE = {"client_id": 7, "client_name": "ABC", "process_type": 2, "extracted_fields": [
+    {"customer_name": "John Doe", "customer_account": "1001", "amount_paid": 50, "balance_amount": 150}
+]}
+
+def text_result(content):
+    message = MagicMock()
+    message.content = content
+    return {"messages": [message]}
+
+class TestAgentOutput(unittest.TestCase):
+    def test_structured_response_is_used_as_is(self):
+        response = FinalResponse(**RESPONSE)
+
+        self.assertIs(agent_output({"messages": [], "structured_response": response}, FinalResponse), response)
+
+    def test_fenced_text_falls_back_to_validation(self):
+        result = text_result([{"type": "text", "text": '```json\n{"client_id": 7, "client_name": "ABC", "process_type": 2, "extracted_fields": []}\n```'}])
+
+        response = agent_output(result, FinalResponse)
+
+        self.assertIsInstance(response, FinalResponse)
+        self.assertEqual(response.client_id, 7)
+
+    def test_error_object_and_invalid_output(self):
+        self.assertEqual(agent_output(text_result('{"error": "No records"}'), FinalResponse), {"error": "No records"})
+        with self.assertRaises(ValidationError):
+            agent_output(text_result('{"client_id": "x"}'), FinalResponse)
+
+    def test_extraction_errors_without_records_become_an_error(self):
+        response = FinalResponse(client_id=7, client_name="ABC", process_type=2, extracted_fields=[], errors=["Unreadable attachment"])
+
+        self.assertEqual(Extract().parse_final_response({"structured_response": response}), {"error": "Unreadable attachment"})
+
+if __name__ == '__main__':
+    unittest.main()
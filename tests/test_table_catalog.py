@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+# Add src to path so 'api' package is importable
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import struct
+import unittest
+from unittest.mock import MagicMock, patch
+from api.chat_bot.table_catalog import TableCatalog
+
+def vector_send(*values):
+    # pgvector binary form: dimensions, reserved, big-endian float32s
+    return struct.pack(f">HH{len(values)}f", len(values), 0, *values)
+
+def make_connection(rows):
+    conn = MagicMock()
+    conn.cursor.return_value.fetchall.return_value = rows
+    return conn
+
+ROWS = [
+    (1, "CREATE TABLE account ...", vector_send(1, 0)),
+    (2, "CREATE TABLE client ...", vector_send(0, 1)),
+    (3, "CREATE TABLE account_transaction ...", vector_send(0.9, 0.2)),
+]
+
+class TestTableCatalog(unittest.TestCase):
+    @patch('api.chat_bot.table_catalog.get_raw_connection')
+    def test_rank_orders_by_l2_distance(self, mock_connection):
+        mock_connection.return_value = make_connection(ROWS)
+        catalog = TableCatalog()
+
+        results = catalog.rank([1, 0.1], limit=2)
+
+        self.assertEqual([r.id for r in results], [1, 3])
+        self.assertIsNone(results[0].embedding)
+        self.assertEqual(catalog.rank([0, 1], limit=1, include_embeddings=True)[0].embedding, [0.0, 1.0])
+        self.assertEqual(catalog.stats()["loads"], 1)
+
+    @patch('api.chat_bot.table_catalog.get_raw_connection')
+    def test_invalidate_reloads_on_next_search(self, mock_connection):
+        mock_connection.return_value = make_connection(ROWS[:1])
+        catalog = TableCatalog()
+        self.assertEqual(len(catalog.rank([1, 0], limit=5)), 1)
+
+        mock_connection.return_value = make_connection(ROWS)
+        self.assertEqual(len(catalog.rank([1, 0], limit=5)), 1)
+        catalog.invalidate()
+
+        self.assertEqual(len(catalog.rank([1, 0], limit=5)), 3)
+        self.assertEqual(catalog.stats()["loads"], 2)
+
+    @patch('api.chat_bot.table_catalog.get_raw_connection')
+    def test_empty_catalog(self, mock_connection):
+        mock_connection.return_value = make_connection([])
+
+        self.assertEqual(TableCatalog().rank([1, 0], limit=5), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,7 +9,7 @@ from api.chat_bot.table_detail_repository import TableDetailsRepository
 from api.chat_bot.models import TableDetails
 
 class TestTableDetailsRepository(unittest.TestCase):
-    @patch('api.chat_bot.table_detail_repository.GoogleGenerativeAIEmbeddings')
+    @patch('api.chat_bot.table_detail_repository.get_embeddings')
     def test_add_and_get(self, MockEmbeddings):
         # Mock DB session
         mock_db = MagicMock()
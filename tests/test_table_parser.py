@@ -0,0 +1,251 @@
+import sys
+from pathlib import Path
+# Add src to path so 'api' package is importable
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+from api.genai.extract import Extract
+from api.genai.rule_engine import compile_rules
+from api.repository.models import MailRequest
+from api.repository.final_response import FinalResponse
+from api.genai.table_parser import detect_table, header_fields, header_mapping, learn_mapping, parse_records, parse_number, split_rows
+
+SAMPLE = (
+    "Please initiate processing of following from ABC Company.\n"
+    "ABC Company\n"
+    "John Doe, 12064654654, 150, 50, 12/12/2025\n"
+    "Robert T, 12064654678, 300, 70, 12/12/2025\n"
+    "David  B, 12064657988, 220, 40, 12/12/2025\n"
+    "3"
+)
+
+MARKDOWN = (
+    "Hi team, payments below.\n\n"
+    "| Account Number | Name | Amount Paid | Balance |\n"
+    "|---|---|---|---|\n"
+    "| 1001 | Jane Roe | $1,200.50 | 300 |\n"
+    "| 1002 | Max Power | 75 | 0 |\n\n"
+    "Thanks"
+)
+
+def llm_records():
+    return [
+        {"customer_name": "John Doe", "customer_account": "12064654654", "amount_paid": 50, "balance_amount": 150},
+        {"customer_name": "Robert T", "customer_account": "12064654678", "amount_paid": 70, "balance_amount": 300},
+        {"customer_name": "David B", "customer_account": "12064657988", "amount_paid": 40, "balance_amount": 220},
+    ]
+
+class TestDetectTable(unittest.TestCase):
+    def test_headerless_csv_block(self):
+        table = detect_table(SAMPLE)
+
+        self.assertEqual(table.kind, "comma")
+        self.assertIsNone(table.header)
+        self.assertEqual(len(table.rows), 3)
+        self.assertEqual(table.signature, "n:comma:5:tnnnt")
+
+    def test_markdown_table_maps_by_header(self):
+        table = detect_table(MARKDOWN)
+        mapping = header_mapping(table.header)
+
+        records = parse_records(table, mapping)
+
+        self.assertEqual(table.kind, "pipe")
+        self.assertEqual([r.customer_account for r in records], ["1001", "1002"])
+        self.assertEqual(records[0].amount_paid, 1200.5)
+        self.assertEqual(records[1].customer_name, "Max Power")
+
+    def test_tab_and_fixed_width(self):
+        tab = detect_table("Name\tAccount\tPaid\tBalance\nAnn\t77\t5\t10\nBob\t78\t6\t11")
+        fixed = detect_table("Ann Lee     77    5.00    10.00\nBob Stone   78    6.00    11.00")
+
+        self.assertEqual((tab.kind, len(tab.rows)), ("tab", 2))
+        self.assertEqual(header_mapping(tab.header), {"customer_name": 0, "customer_account": 1, "amount_paid": 2, "balance_amount": 3})
+        self.assertEqual((fixed.kind, fixed.rows[1]), ("fixed", ["Bob Stone", "78", "6.00", "11.00"]))
+
+    def test_prose_and_two_tables_are_left_to_the_llm(self):
+        self.assertIsNone(detect_table("Hello, please process the attached, thank you.\nRegards"))
+        self.assertIsNone(detect_table("a, 1, 2\nb, 3, 4\n\nnotes\n\nc, 5, 6\nd, 7, 8"))
+
+class TestLearnMapping(unittest.TestCase):
+    def test_learns_columns_from_llm_records(self):
+        table = detect_table(SAMPLE)
+
+        mapping = learn_mapping(table, llm_records())
+        records = parse_records(table, mapping)
+
+        self.assertEqual(mapping, {"customer_name": 0, "customer_account": 1, "amount_paid": 3, "balance_amount": 2})
+        self.assertEqual([r.model_dump(include={"customer_name", "amount_paid"}) for r in records][2],
+                         {"customer_name": "David  B", "amount_paid": 40.0})
+
+    def test_ambiguous_or_mismatched_records_are_not_learned(self):
+        table = detect_table("A, 1, 5, 5\nB, 2, 6, 6")
+        records = [{"customer_name": "A", "customer_account": "1", "amount_paid": 5, "balance_amount": 5},
+                   {"customer_name": "B", "customer_account": "2", "amount_paid": 6, "balance_amount": 6}]
+
+        self.assertIsNone(learn_mapping(table, records))
+        self.assertIsNone(learn_mapping(detect_table(SAMPLE), llm_records()[:2]))
+
+    def test_numeric_field_left_at_zero_is_absent(self):
+        table = detect_table("A, 1, 5\nB, 2, 6")
+        records = [{"customer_name": "A", "customer_account": "1", "amount_paid": 0, "balance_amount": 5},
+                   {"customer_name": "B", "customer_account": "2", "amount_paid": 0, "balance_amount": 6}]
+
+        mapping = learn_mapping(table, records)
+
+        self.assertIsNone(mapping["amount_paid"])
+        self.assertEqual(parse_records(table, mapping)[1].amount_paid, 0.0)
+
+    def test_reordered_headerless_columns_do_not_reuse_a_layout(self):
+        table = detect_table(SAMPLE)
+        mapping = learn_mapping(table, llm_records())
+        reordered = detect_table("12064654654, John Doe, 150, 50, 12/12/2025\n12064654678, Robert T, 300, 70, 12/12/2025")
+
+        self.assertNotEqual(reordered.signature, table.signature)
+        self.assertIsNone(parse_records(reordered, mapping))
+
+    def test_unparseable_amount_falls_back(self):
+        table = detect_table("A, 1, 5, 9\nB, 2, n/a, 6")
+
+        self.assertIsNone(parse_records(table, {"customer_name": 0, "customer_account": 1, "amount_paid": 2, "balance_amount": 3}))
+        self.assertEqual(parse_number("$1,200.50"), 1200.5)
+
+    def test_ambiguous_amounts_are_not_guessed(self):
+        self.assertEqual([parse_number(t) for t in ("75", " -3.5 ", "1,000", "£12064654654")], [75.0, -3.5, 1000.0, 12064654654.0])
+        for text in ("1.234,56", "10,50", "100,00", "(100.00)", "1e3", "1,00,000", "12-3", ""):
+            self.assertIsNone(parse_number(text), text)
+
+    def test_semicolon_table(self):
+        table = detect_table("Payments attached\nName;Account;Paid;Balance\nJane Roe;1001;1,200.50;300\nMax Power;1002;75;0")
+
+        self.assertEqual(table.kind, "semicolon")
+        records = parse_records(table, header_mapping(table.header))
+        self.assertEqual([(r.customer_account, r.amount_paid) for r in records], [("1001", 1200.5), ("1002", 75.0)])
+
+    def test_semicolon_table_with_decimal_commas_falls_back(self):
+        table = detect_table("Name;Account;Paid;Balance\nJane Roe;1001;10,50;100,00\nMax Power;1002;1.234,56;0")
+
+        self.assertEqual(table.kind, "semicolon")
+        self.assertIsNone(parse_records(table, header_mapping(table.header)))
+
+class TestHeaderFields(unittest.TestCase):
+    def test_fields_named_by_the_header(self):
+        content = "Account | Name | Paid\n1001 | Jane Roe | 75\n1002 | Max Power | 20"
+
+        self.assertEqual(header_fields(content), {"customer_account", "customer_name", "amount_paid"})
+        self.assertEqual(header_fields(MARKDOWN), {"customer_account", "customer_name", "amount_paid", "balance_amount"})
+
+    def test_unknown_header_columns_rule_nothing_out(self):
+        content = "Name | Account | Payment Received | Balance\nJane Roe | 1001 | 75 | 300\nMax Power | 1002 | 20 | 0"
+
+        self.assertIsNone(header_fields(content))
+
+    def test_unknown_without_a_header(self):
+        self.assertIsNone(header_fields(SAMPLE))
+        self.assertIsNone(header_fields("Paid 50 on 1001."))
+
+
+class TestSplitRows(unittest.TestCase):
+    def test_chunks_repeat_header_and_surrounding_text(self):
+        chunks = split_rows(MARKDOWN, 1)
+
+        self.assertEqual(len(chunks), 2)
+        for chunk, account in zip(chunks, ["1001", "1002"]):
+            table = detect_table(chunk)
+            self.assertEqual(table.header[0], "Account Number")
+            self.assertEqual([row[0] for row in table.rows], [account])
+            self.assertTrue(chunk.startswith("Hi team") and chunk.endswith("Thanks"))
+
+    def test_small_tables_and_plain_text_are_not_split(self):
+        self.assertEqual(split_rows(SAMPLE, 3), [SAMPLE])
+        self.assertEqual(split_rows("Paid 50 on 1001.\nPaid 20 on 1002.", 1), ["Paid 50 on 1001.\nPaid 20 on 1002."])
+        self.assertEqual(split_rows(SAMPLE, 0), [SAMPLE])
+
+    def test_uneven_last_chunk(self):
+        chunks = split_rows(SAMPLE, 2)
+
+        self.assertEqual(len(chunks), 2)
+        self.assertIn("Robert T", chunks[0])
+        self.assertNotIn("David  B", chunks[0])
+        self.assertIn("David  B", chunks[1])
+        self.assertNotIn("John Doe", chunks[1])
+
+
+class TestExtractTablePath(unittest.IsolatedAsyncioTestCase):
+    async def test_table_with_known_header_skips_the_agent(self):
+        extractor = Extract()
+        extractor.agent = MagicMock()
+        extractor.agent.ainvoke = AsyncMock()
+        extractor.prepare = MagicMock(return_value={"process_type": 2, "client_id": 7, "client_name": "ABC", "rules": []})
+        extractor.finalize = AsyncMock(return_value={"saved": True})
+        request = MailRequest(from_address="a@b.com", subject="Transaction", content=MARKDOWN)
+
+        with patch('api.genai.extract.rule_cache.get_compiled', return_value=compile_rules([])):
+            result = await extractor.process(request, "c-1")
+
+        self.assertEqual(result, {"saved": True})
+        extractor.agent.ainvoke.assert_not_called()
+        final_response, correlation_id = extractor.finalize.call_args.args
+        self.assertEqual(extractor.finalize.call_args.kwargs["extraction"], "table")
+        self.assertEqual([r.customer_account for r in final_response.extracted_fields], ["1001", "1002"])
+
+class TestChunkedExtraction(unittest.IsolatedAsyncioTestCase):
+    def agent_result(self, records):
+        return {"messages": [MagicMock()], "structured_response": FinalResponse(
+            client_id=7, client_name="ABC", process_type=2, extracted_fields=records)}
+
+    async def test_chunks_are_extracted_and_merged_without_duplicates(self):
+        extractor = Extract()
+        records = llm_records()
+        previous = {"customer_name": "Ann Lee", "customer_account": "999", "amount_paid": 10, "balance_amount": 20}
+        content = "Last month Ann Lee (account 999) paid 10, leaving 20.\n" + SAMPLE
+        # Both chunks repeat the opening line, so Ann Lee comes back twice; the second payment
+        # to Robert T's account is a real row and must survive
+        extractor.agent = MagicMock()
+        extractor.agent.ainvoke = AsyncMock(side_effect=[
+            self.agent_result([previous] + records[:2]),
+            self.agent_result([previous, records[2], {**records[1], "amount_paid": 20}]),
+        ])
+        context = {"process_type": 2, "client_id": 7, "client_name": "ABC", "rules": []}
+
+        with patch('api.genai.extract.config') as config:
+            config.extraction_chunk_rows_for.return_value = 2
+            config.extraction_chunk_concurrency = 2
+            merged = await extractor.extract_with_agent(context, [], content, "c-1")
+
+        self.assertEqual(extractor.agent.ainvoke.await_count, 2)
+        self.assertEqual([(r.customer_account, r.amount_paid) for r in merged.extracted_fields],
+                         [("999", 10), ("12064654654", 50), ("12064654678", 70), ("12064657988", 40), ("12064654678", 20)])
+        self.assertEqual(merged.client_id, 7)
+        config.extraction_chunk_rows_for.assert_called_once_with(7)
+
+    def test_identical_table_rows_in_different_chunks_are_kept(self):
+        row = FinalResponse(client_id=7, client_name="ABC", process_type=2, extracted_fields=llm_records()[:1])
+
+        merged = Extract().merge_extractions([row, row.model_copy(deep=True)], "Payments below\n3")
+
+        self.assertEqual(len(merged.extracted_fields), 2)
+
+    async def test_agent_gets_compact_rules_for_the_fields_in_the_table(self):
+        extractor = Extract()
+        extractor.agent = MagicMock()
+        extractor.agent.ainvoke = AsyncMock(return_value=self.agent_result(llm_records()))
+        content = "Account | Name | Paid\n1001 | Jane Roe | 75"
+        rules = [{"rule_id": 1, "rule_content": "Account number must match the register", "is_auto_apply": True},
+                 {"rule_id": 2, "rule_content": "Balance amount is rounded per the fee schedule", "is_auto_apply": True}]
+
+        await extractor.extract_with_agent({"client_id": 7, "rules": rules}, rules, content, "c-1")
+
+        message = extractor.agent.ainvoke.call_args.args[0]["messages"][0]["content"]
+        self.assertIn('"rules": {"customer_account": [{"id": 1, "rule": "Account number must match the register"}]}', message)
+
+    def test_a_failed_chunk_fails_the_merge(self):
+        ok = FinalResponse(client_id=7, client_name="ABC", process_type=2, extracted_fields=llm_records())
+        merged = Extract().merge_extractions([ok, {"error": "quota"}])
+
+        self.assertEqual(merged, {"error": "quota"})
+
+
+if __name__ == '__main__':
+    unittest.main()
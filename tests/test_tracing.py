@@ -0,0 +1,89 @@
+import sys
+from pathlib import Path
+# Add src to path so 'api' package is importable
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import unittest
+from unittest.mock import patch
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from api.tracing import MetricsRegistry, Trace
+
+def registry():
+    metrics = MetricsRegistry()
+    metrics.counter("pipeline_requests_total", "Requests")
+    metrics.histogram("pipeline_request_seconds", "Latency", buckets=(0.5, 1.0))
+    metrics.counter("llm_calls_total", "Model calls")
+    metrics.counter("llm_tokens_total", "Tokens")
+    metrics.histogram("llm_call_seconds", "Model latency")
+    metrics.counter("tool_calls_total", "Tool calls")
+    metrics.histogram("tool_call_seconds", "Tool latency")
+    return metrics
+
+@tool
+def lookup(account: str) -> str:
+    """Look up an account."""
+    return account
+
+@tool
+def broken(account: str) -> str:
+    """Always fails."""
+    raise ValueError("no such account")
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_render_prometheus_text(self):
+        metrics = registry()
+        metrics.inc("pipeline_requests_total", {"pipeline": "process"}, 2)
+        metrics.observe("pipeline_request_seconds", 0.75, {"pipeline": "process"})
+
+        text = metrics.render()
+
+        self.assertIn("# TYPE pipeline_requests_total counter", text)
+        self.assertIn('pipeline_requests_total{pipeline="process"} 2', text)
+        self.assertIn('pipeline_request_seconds_bucket{pipeline="process",le="0.5"} 0', text)
+        self.assertIn('pipeline_request_seconds_bucket{pipeline="process",le="1"} 1', text)
+        self.assertIn('pipeline_request_seconds_bucket{pipeline="process",le="+Inf"} 1', text)
+        self.assertIn('pipeline_request_seconds_count{pipeline="process"} 1', text)
+
+class TestTrace(unittest.IsolatedAsyncioTestCase):
+    async def test_model_and_tool_calls_become_spans(self):
+        metrics = registry()
+        trace = Trace("process", "c-1", registry=metrics)
+        model = FakeMessagesListChatModel(responses=[
+            AIMessage(content="done", usage_metadata={"input_tokens": 120, "output_tokens": 30, "total_tokens": 150})
+        ])
+
+        await model.ainvoke("hello", config={"callbacks": trace.callbacks()})
+        await lookup.ainvoke({"account": "1001"}, config={"callbacks": trace.callbacks()})
+        with self.assertRaises(ValueError):
+            await broken.ainvoke({"account": "1001"}, config={"callbacks": trace.callbacks()})
+        summary = trace.finish()
+
+        self.assertEqual((summary["llm_calls"], summary["tool_calls"]), (1, 2))
+        self.assertEqual((summary["input_tokens"], summary["output_tokens"]), (120, 30))
+        self.assertEqual([s["name"] for s in summary["spans"]][1:], ["lookup", "broken"])
+        self.assertEqual(summary["spans"][2]["error"], "no such account")
+        self.assertEqual(metrics.value("tool_calls_total", {"pipeline": "process", "tool": "broken", "status": "error"}), 1)
+        self.assertEqual(metrics.value("pipeline_requests_total", {"pipeline": "process"}), 1)
+
+    def test_finish_counts_the_request_once(self):
+        metrics = registry()
+        trace = Trace("chat", registry=metrics)
+
+        first = trace.finish()
+
+        self.assertIs(trace.finish(), first)
+        self.assertEqual(metrics.value("pipeline_requests_total", {"pipeline": "chat"}), 1)
+
+class TestMCPToolMetrics(unittest.IsolatedAsyncioTestCase):
+    async def test_tool_calls_served_by_the_mcp_server_are_counted(self):
+        from api.mcp_server_1 import mcp
+
+        with patch('api.mcp_server_1.observe_tool_call') as observe:
+            await mcp.call_tool("get_rule_cache_stats", {})
+
+        self.assertEqual(observe.call_args.args[:2], ("mcp", "get_rule_cache_stats"))
+
+if __name__ == '__main__':
+    unittest.main()